@@ -0,0 +1,96 @@
+"""Multi-bundle allocation vs. best single rule on large carts.
+
+Run with ``python benchmarks/bench_allocation.py``. Carts have 50 lines and the rule set holds
+200 candidate bundles plus a handful of promotions; no database is needed.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+from random import Random
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT / "src"), str(ROOT)]
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from productory_promotions.allocation import AllocationBudget, allocate  # noqa: E402
+from productory_promotions.models import PromotionType  # noqa: E402
+from productory_promotions.pricing import ALLOCATE, BEST_SINGLE, price_lines  # noqa: E402
+from productory_promotions.rules import BundleRule, PromotionRule, build_rule_set  # noqa: E402
+
+CART_LINES = 50
+BUNDLES = 200
+CARTS = 20
+
+
+def _rule_set(rng: Random, products: list[int]):
+    bundles = []
+    for idx in range(BUNDLES):
+        items = tuple((pid, rng.randint(1, 2)) for pid in rng.sample(products, rng.randint(2, 4)))
+        regular = sum(Decimal("10.00") * qty for _, qty in items)
+        bundles.append(
+            BundleRule(
+                id=idx + 1,
+                slug=f"bundle-{idx + 1}",
+                price_amount=regular - Decimal(rng.randint(1, 8)),
+                items=items,
+            )
+        )
+    promotions = [
+        PromotionRule(
+            id=idx + 1,
+            code=f"PROMO-{idx + 1}",
+            promotion_type=PromotionType.PERCENTAGE,
+            value=Decimal(rng.randint(5, 20)),
+            applies_to_all_products=False,
+            product_ids=frozenset(rng.sample(products, 20)),
+        )
+        for idx in range(5)
+    ]
+    return build_rule_set(bundles, promotions)
+
+
+def main() -> None:
+    rng = Random(2026)
+    products = list(range(1, CART_LINES + 1))
+    rules = _rule_set(rng, products)
+    carts = [[(pid, rng.randint(1, 4), Decimal("10.00")) for pid in products] for _ in range(CARTS)]
+
+    print(f"{'max ms':>7} {'single us':>10} {'alloc us':>10} {'gain':>8} {'nodes':>8} {'cut':>5}")
+    for max_ms in (1, 5, 20):
+        budget = AllocationBudget(max_nodes=10**9, max_seconds=max_ms / 1000)
+        single_total = alloc_total = Decimal("0.00")
+        single_seconds = alloc_seconds = 0.0
+        nodes = cut = 0
+        for lines in carts:
+            started = time.perf_counter()
+            single = price_lines(lines, rules, strategy=BEST_SINGLE)
+            single_seconds += time.perf_counter() - started
+            started = time.perf_counter()
+            combined = price_lines(lines, rules, strategy=ALLOCATE, budget=budget)
+            alloc_seconds += time.perf_counter() - started
+            single_total += single.discount_amount
+            alloc_total += combined.discount_amount
+            allocation = allocate(
+                {pid: (qty, price) for pid, qty, price in lines}, rules, budget=budget
+            )
+            nodes += allocation.nodes
+            cut += allocation.exhausted
+        single_us = single_seconds / CARTS * 1e6
+        alloc_us = alloc_seconds / CARTS * 1e6
+        print(
+            f"{max_ms:>7} {single_us:>10.0f} {alloc_us:>10.0f}"
+            f" {alloc_total - single_total:>8} {nodes // CARTS:>8} {cut:>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Bulk product import: batched upserts vs. a per-row ``update_or_create`` loop.
+
+Run with ``python benchmarks/bench_import.py [row_count]`` (default 200,000). Uses the test
+settings' in-memory SQLite database. The feed is imported cold, re-imported unchanged (hash
+skips) and re-imported with every tenth price changed.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT / "src"), str(ROOT)]
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+
+from productory_catalog.importing import import_products  # noqa: E402
+from productory_catalog.models import Category, Product  # noqa: E402
+
+BASELINE_ROWS = 5_000
+
+
+def _feed(count: int, *, repriced: bool = False):
+    for index in range(count):
+        price = 10 + index % 500 + (1 if repriced and index % 10 == 0 else 0)
+        yield (
+            index + 1,
+            {
+                "sku": f"SKU-{index:07d}",
+                "name": f"Product {index}",
+                "category": f"Category {index % 50}",
+                "collections": f"Collection {index % 20}|Collection {index % 7}",
+                "price_amount": f"{price}.00",
+                "currency": "ZAR",
+                "stock_quantity": str(index % 30),
+            },
+        )
+
+
+def _run(label: str, count: int, **kwargs) -> None:
+    report = import_products(_feed(count, **kwargs), batch_size=2000)
+    print(
+        f"{label:<22} {report.seconds:7.2f}s {report.rows_per_second:>10,.0f} rows/s  "
+        f"created={report.created} updated={report.updated} unchanged={report.unchanged}"
+    )
+
+
+def _baseline(count: int) -> None:
+    started = time.perf_counter()
+    for _, row in _feed(count):
+        category, _ = Category.objects.get_or_create(
+            name=row["category"], defaults={"slug": row["category"].lower().replace(" ", "-")}
+        )
+        Product.objects.update_or_create(
+            sku=f"BASE-{row['sku']}",
+            defaults={
+                "name": row["name"],
+                "slug": f"base-{row['sku'].lower()}",
+                "category": category,
+                "price_amount": row["price_amount"],
+                "currency": "ZAR",
+            },
+        )
+    elapsed = time.perf_counter() - started
+    print(f"{'update_or_create loop':<22} {elapsed:7.2f}s {count / elapsed:>10,.0f} rows/s")
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    call_command("migrate", verbosity=0)
+    _run("cold import", count)
+    _run("unchanged re-import", count)
+    _run("10% repriced", count, repriced=True)
+    _baseline(min(count, BASELINE_ROWS))
+
+
+if __name__ == "__main__":
+    main()
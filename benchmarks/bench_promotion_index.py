@@ -0,0 +1,100 @@
+"""Per-cart promotion evaluation: inverted index vs. scanning every rule.
+
+Run with ``python benchmarks/bench_promotion_index.py``. No database is needed; rule sets are
+built in memory with ``build_rule_set``.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+from decimal import Decimal
+from functools import partial
+from pathlib import Path
+from random import Random
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT / "src"), str(ROOT)]
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from productory_promotions.models import PromotionType  # noqa: E402
+from productory_promotions.rules import PromotionRule, build_rule_set  # noqa: E402
+from productory_promotions.services import resolve_line_pricing  # noqa: E402
+
+PRODUCT_COUNT = 10_000
+PRODUCTS_PER_PROMOTION = 2_000
+CART_LINES = 5
+ROUNDS = 200
+
+
+def _promotions(count: int, rng: Random, *, hot_range: range, hot_rules: int):
+    cold_products = [pid for pid in range(1, PRODUCT_COUNT + 1) if pid not in hot_range]
+    rules = []
+    for idx in range(count):
+        # A fixed number of rules touch the "hot" products carts are drawn from.
+        pool = list(hot_range) if idx < hot_rules else cold_products
+        rules.append(
+            PromotionRule(
+                id=idx + 1,
+                code=f"PROMO-{idx + 1}",
+                promotion_type=PromotionType.PERCENTAGE,
+                value=Decimal(rng.randint(1, 30)),
+                applies_to_all_products=False,
+                product_ids=frozenset(rng.sample(pool, min(PRODUCTS_PER_PROMOTION, len(pool)))),
+            )
+        )
+    return rules
+
+
+def _full_scan(lines, promotions):
+    cart = {pid: (qty, price) for pid, qty, price in lines}
+    best = Decimal("0.00")
+    for promo in promotions:
+        eligible = Decimal("0.00")
+        for pid in promo.product_ids:
+            line = cart.get(pid)
+            if line:
+                eligible += line[0] * line[1]
+        if eligible > 0:
+            best = max(best, (eligible * promo.value / Decimal("100")).quantize(Decimal("0.01")))
+    return best
+
+
+def _time_per_cart(fn, carts, rounds: int = ROUNDS) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for lines in carts:
+            fn(lines)
+    return (time.perf_counter() - started) / (rounds * len(carts)) * 1_000_000
+
+
+def main() -> None:
+    rng = Random(2026)
+    hot_range = range(1, 2_001)
+    carts = [
+        [(pid, rng.randint(1, 3), Decimal("19.99")) for pid in rng.sample(hot_range, CART_LINES)]
+        for _ in range(20)
+    ]
+
+    print(f"{'rules':>6} {'candidates':>10} {'indexed us/cart':>16} {'full scan us/cart':>18}")
+    for rule_count in (10, 100, 1_000):
+        promotions = _promotions(rule_count, rng, hot_range=hot_range, hot_rules=10)
+        rules = build_rule_set([], promotions)
+        candidates = {
+            position
+            for lines in carts
+            for pid, _, _ in lines
+            for position in rules.promotions_by_product.get(pid, ())
+        }
+        indexed = _time_per_cart(partial(resolve_line_pricing, rules=rules), carts)
+        scanned = _time_per_cart(partial(_full_scan, promotions=promotions), carts, rounds=1)
+        print(f"{rule_count:>6} {len(candidates):>10} {indexed:>16.1f} {scanned:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Product search: FTS index vs. ``icontains`` scans, plus the autocomplete prefix index.
+
+Run with ``python benchmarks/bench_search.py [product_count]`` (default 200,000). Uses the test
+settings' in-memory SQLite database; on PostgreSQL point DJANGO_SETTINGS_MODULE at a project
+using it and the tsvector/GIN backend is measured instead.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+from pathlib import Path
+from random import Random
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT / "src"), str(ROOT)]
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db.models import Q  # noqa: E402
+
+from productory_catalog.autocomplete import PrefixIndex  # noqa: E402
+from productory_catalog.models import Category, Product  # noqa: E402
+from productory_catalog.search import get_search_backend, search_product_ids  # noqa: E402
+
+WORDS = "coffee tea mug kettle grinder filter espresso cup pot frother scale bean roast".split()
+# Names mix one common word with two of a few thousand rarer ones, closer to a real catalog
+# than a tiny vocabulary where every word matches a large share of products.
+VOCABULARY = [f"{word}{index}" for index in range(400) for word in ("brand", "model", "tone")]
+QUERIES = ["coffee", "brand42 coffee", "model7", "tone311 brand5", "SKU-0012345"]
+ROUNDS = 50
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    call_command("migrate", verbosity=0)
+    rng = Random(2026)
+    category = Category.objects.create(name="Bench", slug="bench")
+    Product.objects.bulk_create(
+        (
+            Product(
+                name=" ".join([rng.choice(WORDS), *rng.sample(VOCABULARY, 2)]),
+                slug=f"bench-{index}",
+                sku=f"SKU-{index:07d}",
+                category=category,
+                price_amount="10.00",
+                currency="ZAR",
+            )
+            for index in range(count)
+        ),
+        batch_size=5000,
+    )
+    started = time.perf_counter()
+    indexed = get_search_backend().rebuild(batch_size=5000)
+    print(f"indexed {indexed} products in {time.perf_counter() - started:.1f}s")
+
+    print(f"{'query':>14} {'index ms':>9} {'icontains ms':>13}")
+    for query in QUERIES:
+        started = time.perf_counter()
+        for _ in range(ROUNDS):
+            ids = search_product_ids(query, limit=20)
+        indexed_ms = (time.perf_counter() - started) / ROUNDS * 1000
+        started = time.perf_counter()
+        for _ in range(ROUNDS // 10 or 1):
+            scan = Q()
+            for term in query.split():
+                scan &= Q(name__icontains=term) | Q(sku__icontains=term) | Q(slug__icontains=term)
+            list(Product.objects.filter(scan).values_list("id", flat=True)[:20])
+        scan_ms = (time.perf_counter() - started) / (ROUNDS // 10 or 1) * 1000
+        print(f"{query:>14} {indexed_ms:>9.2f} {scan_ms:>13.2f}  ({len(ids or [])} hits)")
+
+    started = time.perf_counter()
+    index = PrefixIndex(Product.objects.values_list("id", "name", "sku").iterator())
+    seconds = time.perf_counter() - started
+    print(f"\nprefix index over {len(index)} products built in {seconds:.1f}s")
+    for prefix in ("c", "coff", "brand42", "sku-00123", "zzz"):
+        started = time.perf_counter()
+        for _ in range(ROUNDS * 20):
+            matches = index.search(prefix, 10)
+        micros = (time.perf_counter() - started) / (ROUNDS * 20) * 1e6
+        print(f"{prefix:>14} {micros:>9.1f} us  ({len(matches)} hits)")
+
+
+if __name__ == "__main__":
+    main()
@@ -94,6 +94,9 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": default_authentication_classes,
 }
 
+# The demo runs a single runserver process, so the process-local default cache is fine.
+SILENCED_SYSTEM_CHECKS = ["productory_core.W001"]
+
 PRODUCTORY = {
     "DEFAULT_CURRENCY": "ZAR",
     "DEFAULT_TIMEZONE": "Africa/Johannesburg",
@@ -1,51 +1,24 @@
 from __future__ import annotations
 
-import csv
-
 from django.contrib import admin
-from django.http import HttpResponse
 
+from productory_catalog.exports import CATEGORY_EXPORT, PRODUCT_EXPORT
 from productory_catalog.models import Category, Collection, Product, ProductImage, StockRecord
+from productory_core.exports import export_action
 
-
-@admin.action(description="Export categories as CSV")
-def export_categories_csv(modeladmin, request, queryset):
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = 'attachment; filename="categories.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(["id", "name", "slug", "description"])
-    for category in queryset:
-        writer.writerow([category.id, category.name, category.slug, category.description])
-    return response
-
-
-@admin.action(description="Export products as CSV")
-def export_products_csv(modeladmin, request, queryset):
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = 'attachment; filename="products.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(["id", "name", "sku", "category", "price_amount", "currency", "is_active"])
-    for product in queryset.select_related("category"):
-        writer.writerow(
-            [
-                product.id,
-                product.name,
-                product.sku,
-                product.category.name,
-                product.price_amount,
-                product.currency,
-                product.is_active,
-            ]
-        )
-    return response
+export_categories_csv = export_action(CATEGORY_EXPORT, description="Export categories as CSV")
+export_products_csv = export_action(PRODUCT_EXPORT, description="Export products as CSV")
+export_products_ndjson = export_action(
+    PRODUCT_EXPORT, description="Export products as NDJSON", export_format="ndjson"
+)
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ("name", "slug", "created_at")
+    list_display = ("name", "slug", "parent", "depth", "created_at")
+    list_select_related = ("parent",)
     search_fields = ("name", "slug")
+    readonly_fields = ("path", "depth")
     actions = [export_categories_csv]
 
 
@@ -66,7 +39,7 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = ("is_active", "currency", "category")
     search_fields = ("name", "sku", "slug")
     inlines = [ProductImageInline]
-    actions = [export_products_csv]
+    actions = [export_products_csv, export_products_ndjson]
 
 
 @admin.register(StockRecord)
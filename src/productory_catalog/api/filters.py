@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import django_filters
+from django.db.models import Case, IntegerField, When
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+from productory_catalog.models import Category, Product
+from productory_catalog.search import search_product_ids
+
+
+class ProductFilter(django_filters.FilterSet):
+    # ?category_tree=<id> matches products in that category or any of its descendants.
+    category_tree = django_filters.NumberFilter(method="filter_category_tree")
+
+    class Meta:
+        model = Product
+        fields = ["category", "currency", "is_active"]
+
+    def filter_category_tree(self, queryset, name, value):
+        category = Category.objects.filter(pk=value).only("path").first()
+        if category is None:
+            return queryset.none()
+        return queryset.in_category_tree(category)
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    # Runs after OrderingFilter so relevance wins unless the client asked for an ordering.
+    def filter_queryset(self, request, queryset, view):
+        query = " ".join(self.get_search_terms(request))
+        # The filtered queryset goes into the search, so the result cap counts matching rows only.
+        ids = search_product_ids(query, within=queryset) if query else None
+        if ids is None:
+            return super().filter_queryset(request, queryset, view)
+
+        queryset = queryset.filter(id__in=ids)
+        if request.query_params.get(api_settings.ORDERING_PARAM) or len(ids) < 2:
+            return queryset
+        rank = Case(
+            *[When(id=product_id, then=position) for position, product_id in enumerate(ids)],
+            output_field=IntegerField(),
+        )
+        return queryset.order_by(rank)
@@ -1,15 +1,38 @@
 from __future__ import annotations
 
+from decimal import Decimal
+
+from django.db.models.manager import BaseManager
 from rest_framework import serializers
 
 from productory_catalog.models import Category, Collection, Product, ProductImage, StockRecord
+from productory_catalog.representations import get_representations
+from productory_core.conf import get_setting
 
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
-        fields = ["id", "name", "slug", "description", "created_at", "updated_at"]
-        read_only_fields = ["created_at", "updated_at"]
+        fields = [
+            "id",
+            "name",
+            "slug",
+            "description",
+            "parent",
+            "path",
+            "depth",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = ["path", "depth", "created_at", "updated_at"]
+
+    def validate_parent(self, parent):
+        if self.instance is not None and self.instance.is_moved_under(parent):
+            raise serializers.ValidationError("A category cannot be moved under itself.")
+        # Checked here so the API answers 400; Category.save keeps the same check as a backstop.
+        if (self.instance or Category()).is_too_deep_under(parent):
+            raise serializers.ValidationError("The category tree is too deep.")
+        return parent
 
 
 class CollectionSerializer(serializers.ModelSerializer):
@@ -51,6 +74,21 @@ class ProductListSerializer(serializers.ModelSerializer):
         ]
 
 
+class ProductSummarySerializer(serializers.ModelSerializer):
+    primary_image_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = ["id", "name", "sku", "price_amount", "currency", "primary_image_url"]
+
+    def get_primary_image_url(self, obj: Product) -> str | None:
+        # Prefer the queryset annotation; fall back to a lookup for un-annotated instances.
+        if hasattr(obj, "primary_image_url"):
+            return obj.primary_image_url
+        image = obj.images.order_by("position", "id").first()
+        return image.image_url if image else None
+
+
 class ProductDetailSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     collections = CollectionSerializer(many=True, read_only=True)
@@ -77,6 +115,150 @@ class ProductDetailSerializer(serializers.ModelSerializer):
         ]
 
 
+class CachedRepresentationMixin(serializers.Serializer):
+    # Representations are read through the cache by product id; misses are loaded from
+    # get_representation_queryset() in one query, so callers only need product ids.
+    representation_kind = ""
+
+    def get_representation_queryset(self):
+        return Product.objects.all()
+
+    def _render(self, product_ids: list[int]) -> dict[int, dict]:
+        products = self.get_representation_queryset().in_bulk(product_ids)
+        return {
+            product_id: super(CachedRepresentationMixin, self).to_representation(product)
+            for product_id, product in products.items()
+        }
+
+    def prime(self, products) -> None:
+        self._primed = get_representations(
+            self.representation_kind, [product.pk for product in products], self._render
+        )
+
+    def to_representation(self, instance):
+        data = getattr(self, "_primed", {}).get(instance.pk)
+        if data is None:
+            data = get_representations(self.representation_kind, [instance.pk], self._render).get(
+                instance.pk
+            )
+        # A row deleted since the caller loaded it renders from the instance as before.
+        return data if data is not None else super().to_representation(instance)
+
+
+class CachedRepresentationListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, BaseManager) else data)
+        self.child.prime(items)
+        return super().to_representation(items)
+
+
+class CachedProductListSerializer(CachedRepresentationMixin, ProductListSerializer):
+    representation_kind = "list"
+
+    class Meta(ProductListSerializer.Meta):
+        list_serializer_class = CachedRepresentationListSerializer
+
+    def get_representation_queryset(self):
+        return Product.objects.select_related("category")
+
+
+class CachedProductSummarySerializer(CachedRepresentationMixin, ProductSummarySerializer):
+    representation_kind = "summary"
+
+    class Meta(ProductSummarySerializer.Meta):
+        list_serializer_class = CachedRepresentationListSerializer
+
+    def get_representation_queryset(self):
+        return Product.objects.with_primary_image_url()
+
+
+class CachedProductDetailSerializer(CachedRepresentationMixin, ProductDetailSerializer):
+    representation_kind = "detail"
+
+    class Meta(ProductDetailSerializer.Meta):
+        list_serializer_class = CachedRepresentationListSerializer
+
+    def get_representation_queryset(self):
+        return Product.objects.select_related("category", "stock_record").prefetch_related(
+            "collections", "images"
+        )
+
+
+class PriceUpdateItemSerializer(serializers.Serializer):
+    sku = serializers.CharField(max_length=64)
+    price_amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+
+
+class PriceUpdateSerializer(serializers.Serializer):
+    prices = PriceUpdateItemSerializer(many=True, allow_empty=False)
+
+    def validate_prices(self, value):
+        limit = int(get_setting("PRICE_UPDATE_MAX_ITEMS"))
+        if len(value) > limit:
+            raise serializers.ValidationError(f"At most {limit} prices per request.")
+        skus = [item["sku"] for item in value]
+        if len(set(skus)) != len(skus):
+            raise serializers.ValidationError("Each SKU may appear only once.")
+        return value
+
+
+class StockAdjustmentItemSerializer(serializers.Serializer):
+    sku = serializers.CharField(max_length=64)
+    quantity = serializers.IntegerField(min_value=0, required=False)
+    delta = serializers.IntegerField(required=False)
+    allow_backorder = serializers.BooleanField(required=False)
+
+    def validate(self, attrs):
+        if ("quantity" in attrs) == ("delta" in attrs):
+            raise serializers.ValidationError("Set exactly one of quantity or delta.")
+        return attrs
+
+
+class StockAdjustmentSerializer(serializers.Serializer):
+    adjustments = StockAdjustmentItemSerializer(many=True, allow_empty=False)
+
+    def validate_adjustments(self, value):
+        limit = int(get_setting("STOCK_ADJUSTMENT_MAX_ITEMS"))
+        if len(value) > limit:
+            raise serializers.ValidationError(f"At most {limit} adjustments per request.")
+        return value
+
+
+class ChangeFeedQuerySerializer(serializers.Serializer):
+    since = serializers.CharField(required=False, allow_blank=True, default="")
+    limit = serializers.IntegerField(required=False, default=500, min_value=1, max_value=1000)
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=100, trim_whitespace=True)
+    limit = serializers.IntegerField(required=False, default=10, min_value=1, max_value=50)
+
+
+class EffectivePriceMixin(serializers.Serializer):
+    # Prices come precomputed for the whole page in context["effective_prices"].
+    effective_price = serializers.SerializerMethodField()
+    applied_promotion = serializers.SerializerMethodField()
+
+    def _effective(self, obj: Product) -> tuple[Decimal, str]:
+        return self.context.get("effective_prices", {}).get(obj.id, (obj.price_amount, ""))
+
+    def get_effective_price(self, obj: Product) -> str:
+        return str(self._effective(obj)[0])
+
+    def get_applied_promotion(self, obj: Product) -> str | None:
+        return self._effective(obj)[1] or None
+
+
+class ProductPricedListSerializer(EffectivePriceMixin, ProductListSerializer):
+    class Meta(ProductListSerializer.Meta):
+        fields = [*ProductListSerializer.Meta.fields, "effective_price", "applied_promotion"]
+
+
+class ProductPricedDetailSerializer(EffectivePriceMixin, ProductDetailSerializer):
+    class Meta(ProductDetailSerializer.Meta):
+        fields = [*ProductDetailSerializer.Meta.fields, "effective_price", "applied_promotion"]
+
+
 class ProductWriteSerializer(serializers.ModelSerializer):
     category_id = serializers.PrimaryKeyRelatedField(
         source="category",
@@ -1,10 +1,31 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 
-from productory_catalog.api.views import CategoryViewSet, CollectionViewSet, ProductViewSet
+from productory_catalog.api.views import (
+    CategoryViewSet,
+    CollectionViewSet,
+    ProductChangesView,
+    ProductPriceUpdateView,
+    ProductViewSet,
+    StockAdjustmentView,
+)
 
 router = DefaultRouter()
 router.register("categories", CategoryViewSet, basename="productory-category")
 router.register("collections", CollectionViewSet, basename="productory-collection")
 router.register("products", ProductViewSet, basename="productory-product")
 
-urlpatterns = router.urls
+urlpatterns = [
+    path("changes/", ProductChangesView.as_view(), name="productory-product-changes"),
+    path(
+        "price-updates/",
+        ProductPriceUpdateView.as_view(),
+        name="productory-product-price-updates",
+    ),
+    path(
+        "stock-adjustments/",
+        StockAdjustmentView.as_view(),
+        name="productory-stock-adjustments",
+    ),
+    *router.urls,
+]
@@ -1,26 +1,82 @@
+from __future__ import annotations
+
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, viewsets
-from rest_framework.permissions import AllowAny
+from rest_framework import filters, serializers, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from productory_catalog.api.filters import ProductFilter, ProductSearchFilter
 from productory_catalog.api.serializers import (
+    AutocompleteQuerySerializer,
+    CachedProductDetailSerializer,
+    CachedProductListSerializer,
     CategorySerializer,
+    ChangeFeedQuerySerializer,
     CollectionSerializer,
-    ProductDetailSerializer,
-    ProductListSerializer,
+    PriceUpdateSerializer,
+    ProductPricedDetailSerializer,
+    ProductPricedListSerializer,
     ProductWriteSerializer,
+    StockAdjustmentSerializer,
 )
+from productory_catalog.autocomplete import autocomplete
+from productory_catalog.changes import ChangeCursor, InvalidCursor, product_changes
+from productory_catalog.facets import facet_counts, get_facet_index
+from productory_catalog.generations import CATALOG_GENERATION
 from productory_catalog.models import Category, Collection, Product
+from productory_catalog.representations import get_cached_representation
+from productory_catalog.services import (
+    UnknownProductsError,
+    bulk_update_prices,
+    effective_prices,
+)
+from productory_catalog.stock import StockAdjustment, apply_stock_adjustments
+from productory_core.conditional import ConditionalGetMixin
+
+
+def _expand_values(request) -> set[str]:
+    raw = request.query_params.get("expand", "") if request is not None else ""
+    return {value.strip() for value in raw.split(",") if value.strip()}
+
+
+_BOOLEAN_PARAMS = {"true": True, "1": True, "false": False, "0": False}
+
 
+def _indexed_facet_filters(request) -> dict | None:
+    # Only plain category/currency/is_active filters can be answered from the bitmap index;
+    # anything else (search, unknown or malformed values) takes the grouped-aggregate path.
+    params = request.query_params
+    if set(params) - {"category", "currency", "is_active"}:
+        return None
+    filters_: dict = {}
+    if params.get("category"):
+        if not params["category"].isdigit():
+            return None
+        filters_["category"] = int(params["category"])
+    if params.get("currency"):
+        filters_["currency"] = params["currency"]
+    if params.get("is_active"):
+        value = _BOOLEAN_PARAMS.get(params["is_active"].lower())
+        if value is None:
+            return None
+        filters_["is_active"] = value
+    return filters_
 
-class CategoryViewSet(viewsets.ModelViewSet):
+
+class CategoryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    conditional_generations = (CATALOG_GENERATION,)
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filterset_fields = ["parent", "depth"]
     search_fields = ["name", "slug"]
 
 
-class CollectionViewSet(viewsets.ModelViewSet):
+class CollectionViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    conditional_generations = (CATALOG_GENERATION,)
     queryset = Collection.objects.all()
     serializer_class = CollectionSerializer
     permission_classes = [AllowAny]
@@ -28,18 +84,152 @@ class CollectionViewSet(viewsets.ModelViewSet):
     search_fields = ["name", "slug"]
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    conditional_generations = (CATALOG_GENERATION,)
     queryset = Product.objects.select_related("category").prefetch_related("collections", "images")
     permission_classes = [AllowAny]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ["category", "currency", "is_active"]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ProductSearchFilter]
+    filterset_class = ProductFilter
     search_fields = ["name", "sku", "slug"]
     ordering_fields = ["name", "price_amount", "created_at"]
     ordering = ["name"]
 
+    def get_conditional_generations(self) -> tuple[str, ...]:
+        # Effective prices also move with promotion windows opening and closing, which no
+        # counter records, so those responses are never served as 304.
+        if self._expand_effective_price():
+            return ()
+        return super().get_conditional_generations()
+
+    def _expand_effective_price(self) -> bool:
+        return self.action in {"list", "retrieve"} and "effective_price" in _expand_values(
+            self.request
+        )
+
     def get_serializer_class(self):
         if self.action in {"create", "update", "partial_update"}:
             return ProductWriteSerializer
         if self.action == "list":
-            return ProductListSerializer
-        return ProductDetailSerializer
+            if self._expand_effective_price():
+                return ProductPricedListSerializer
+            return CachedProductListSerializer
+        if self._expand_effective_price():
+            return ProductPricedDetailSerializer
+        return CachedProductDetailSerializer
+
+    def _serves_cached_representations(self) -> bool:
+        return self.action in {"list", "retrieve"} and not self._expand_effective_price()
+
+    def get_queryset(self):
+        if self._serves_cached_representations():
+            # Cached serializers load rows for misses themselves; prefetching here would run
+            # for every request, hit or not.
+            return Product.objects.all()
+        return super().get_queryset()
+
+    def retrieve(self, request, *args, **kwargs):
+        # A cached detail needs no query at all. Query parameters could filter the object
+        # out (e.g. ?category=), so those requests take the regular path.
+        lookup = str(kwargs.get(self.lookup_url_kwarg or self.lookup_field, ""))
+        if self._serves_cached_representations() and not request.query_params and lookup.isdigit():
+            cached = get_cached_representation("detail", int(lookup))
+            if cached is not None:
+                return self._not_modified(request) or Response(cached)
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False, methods=["get"])
+    def autocomplete(self, request):
+        # Served from the per-process prefix index; no database access once it is built.
+        query = AutocompleteQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        matches = autocomplete(query.validated_data["q"], limit=query.validated_data["limit"])
+        return Response(
+            [{"id": product_id, "name": name, "sku": sku} for product_id, name, sku in matches]
+        )
+
+    @action(detail=False, methods=["get"])
+    def facets(self, request):
+        indexed = _indexed_facet_filters(request)
+        if indexed is not None:
+            index = get_facet_index()
+            return Response(index.counts(index.select(**indexed)))
+        return Response(facet_counts(self.filter_queryset(self.get_queryset())))
+
+    def get_serializer(self, *args, **kwargs):
+        if args and self._expand_effective_price():
+            # Price the whole page in one pass against the compiled rule set.
+            products = list(args[0]) if kwargs.get("many") else [args[0]]
+            kwargs["context"] = {
+                **self.get_serializer_context(),
+                "effective_prices": effective_prices(products),
+            }
+            if kwargs.get("many"):
+                args = (products, *args[1:])
+        return super().get_serializer(*args, **kwargs)
+
+
+class ProductPriceUpdateView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = PriceUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            result = bulk_update_prices(
+                [
+                    (item["sku"], item["price_amount"])
+                    for item in serializer.validated_data["prices"]
+                ],
+                actor=request.user,
+            )
+        except UnknownProductsError as exc:
+            raise serializers.ValidationError(
+                {"prices": str(exc), "unknown_skus": exc.skus}
+            ) from exc
+        return Response(result.as_dict())
+
+
+class StockAdjustmentView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = StockAdjustmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = apply_stock_adjustments(
+            [StockAdjustment(**item) for item in serializer.validated_data["adjustments"]],
+            actor=request.user,
+        )
+        return Response({"results": [result.as_dict() for result in results]})
+
+
+class ProductChangesView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        query = ChangeFeedQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        try:
+            cursor = ChangeCursor.decode(query.validated_data["since"])
+        except InvalidCursor as exc:
+            raise serializers.ValidationError({"since": str(exc)}) from exc
+        page = product_changes(cursor, limit=query.validated_data["limit"])
+        products = [change.product for change in page.changes if change.product is not None]
+        representations = {
+            data["id"]: data for data in CachedProductListSerializer(products, many=True).data
+        }
+        return Response(
+            {
+                "results": [
+                    {
+                        "type": "delete" if change.deleted else "upsert",
+                        "id": change.product_id,
+                        "sku": change.sku,
+                        "changed_at": change.changed_at.isoformat(),
+                        "product": None if change.deleted else representations[change.product_id],
+                    }
+                    for change in page.changes
+                ],
+                "next_cursor": page.cursor.encode(),
+                "has_more": page.has_more,
+            }
+        )
@@ -5,3 +5,6 @@ class ProductoryCatalogConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "productory_catalog"
     verbose_name = "Productory Catalog"
+
+    def ready(self):
+        from productory_catalog import signals  # noqa: F401
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import re
+from bisect import bisect_left, insort
+from collections.abc import Iterable
+from threading import Lock
+
+from productory_catalog.models import Product
+from productory_core.generations import generation_changes, get_generation, publish_generation
+
+AUTOCOMPLETE_GENERATION = "catalog-autocomplete"
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+# A logged change is a list of (product_id, name, sku); a None name removes the product.
+_Change = list[tuple[int, str | None, str | None]]
+
+
+def _index_keys(name: str, sku: str) -> list[str]:
+    name = name.lower()
+    keys = {sku.lower(), name, *_TOKEN.findall(name)}
+    keys.discard("")
+    return sorted(keys)
+
+
+class PrefixIndex:
+    # One sorted array of (key, product_id) pairs; a prefix lookup is a bisect plus a short
+    # forward scan. Keys are the lowercased SKU, full name and each name word.
+    def __init__(self, rows: Iterable[tuple[int, str, str]] = ()) -> None:
+        self._display: dict[int, tuple[str, str]] = {}
+        pairs: list[tuple[str, int]] = []
+        for product_id, name, sku in rows:
+            self._display[product_id] = (name, sku)
+            pairs.extend((key, product_id) for key in _index_keys(name, sku))
+        pairs.sort()
+        self._pairs = pairs
+
+    def __len__(self) -> int:
+        return len(self._display)
+
+    def add(self, product_id: int, name: str, sku: str) -> None:
+        self.remove(product_id)
+        self._display[product_id] = (name, sku)
+        for key in _index_keys(name, sku):
+            insort(self._pairs, (key, product_id))
+
+    def remove(self, product_id: int) -> None:
+        entry = self._display.pop(product_id, None)
+        if entry is None:
+            return
+        for key in _index_keys(*entry):
+            position = bisect_left(self._pairs, (key, product_id))
+            if position < len(self._pairs) and self._pairs[position] == (key, product_id):
+                del self._pairs[position]
+
+    def search(self, prefix: str, limit: int = 10) -> list[tuple[int, str, str]]:
+        prefix = prefix.strip().lower()
+        if not prefix or limit < 1:
+            return []
+        results: list[tuple[int, str, str]] = []
+        seen: set[int] = set()
+        pairs = self._pairs
+        position = bisect_left(pairs, (prefix,))
+        while position < len(pairs) and pairs[position][0].startswith(prefix):
+            product_id = pairs[position][1]
+            position += 1
+            if product_id in seen:
+                continue
+            seen.add(product_id)
+            results.append((product_id, *self._display[product_id]))
+            if len(results) >= limit:
+                break
+        return results
+
+
+_index: PrefixIndex | None = None
+_index_generation: int | None = None
+_lock = Lock()
+
+
+def _load_index() -> PrefixIndex:
+    return PrefixIndex(
+        Product.objects.filter(is_active=True)
+        .order_by()
+        .values_list("id", "name", "sku")
+        .iterator(chunk_size=5000)
+    )
+
+
+def _apply(index: PrefixIndex, change: _Change) -> None:
+    for product_id, name, sku in change:
+        if name is None or sku is None:
+            index.remove(product_id)
+        else:
+            index.add(product_id, name, sku)
+
+
+def _catch_up(generation: int) -> bool:
+    # Replays the changes logged since this index was current; False means the log has a gap
+    # and the index must be rebuilt.
+    global _index_generation
+
+    if _index is None or _index_generation is None:
+        return False
+    if _index_generation == generation:
+        return True
+    changes = generation_changes(AUTOCOMPLETE_GENERATION, _index_generation, generation)
+    if changes is None:
+        return False
+    for change in changes:
+        _apply(_index, change)
+    _index_generation = generation
+    return True
+
+
+def autocomplete(prefix: str, *, limit: int = 10) -> list[tuple[int, str, str]]:
+    global _index, _index_generation
+
+    # Built lazily, then patched from the change log as products are saved.
+    generation = get_generation(AUTOCOMPLETE_GENERATION)
+    with _lock:
+        if not _catch_up(generation) or _index is None:
+            _index = _load_index()
+            _index_generation = generation
+        return _index.search(prefix, limit)
+
+
+# Saves and deletes are not applied to the local index directly: the change is logged after
+# commit and every process, this one included, replays it on its next lookup.
+def update_autocomplete(product: Product) -> None:
+    change: _Change = [
+        (product.pk, product.name, product.sku) if product.is_active else (product.pk, None, None)
+    ]
+    publish_generation(AUTOCOMPLETE_GENERATION, change)
+
+
+def remove_from_autocomplete(product_id: int) -> None:
+    publish_generation(AUTOCOMPLETE_GENERATION, [(product_id, None, None)])
+
+
+def reset_autocomplete() -> None:
+    global _index, _index_generation
+
+    with _lock:
+        _index = None
+        _index_generation = None
+
+
+def invalidate_autocomplete() -> None:
+    # For bulk writes: drop the local index and make every process rebuild it.
+    reset_autocomplete()
+    publish_generation(AUTOCOMPLETE_GENERATION)
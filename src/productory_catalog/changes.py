@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from productory_catalog.models import Product, ProductTombstone
+from productory_core.conf import get_setting
+
+# Position in each stream as (timestamp, id); None means "from the beginning".
+_Position = tuple[datetime, int] | None
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class ChangeCursor:
+    products: _Position = None
+    tombstones: _Position = None
+
+    def encode(self) -> str:
+        payload = {
+            key: [position[0].isoformat(), position[1]] if position else None
+            for key, position in (("p", self.products), ("t", self.tombstones))
+        }
+        raw = json.dumps(payload, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> ChangeCursor:
+        if not token:
+            return cls()
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+            positions = []
+            for key in ("p", "t"):
+                value = payload.get(key)
+                positions.append(
+                    (datetime.fromisoformat(value[0]), int(value[1])) if value else None
+                )
+        except (ValueError, TypeError, KeyError, IndexError, AttributeError) as exc:
+            raise InvalidCursor("Invalid change cursor.") from exc
+        if any(position and timezone.is_naive(position[0]) for position in positions):
+            raise InvalidCursor("Invalid change cursor.")
+        return cls(*positions)
+
+
+@dataclass(frozen=True)
+class ProductChange:
+    changed_at: datetime
+    product_id: int
+    sku: str
+    product: Product | None = None
+
+    @property
+    def deleted(self) -> bool:
+        return self.product is None
+
+
+@dataclass(frozen=True)
+class ChangePage:
+    changes: list[ProductChange]
+    cursor: ChangeCursor
+    has_more: bool
+
+
+def _after(field: str, position: _Position) -> Q:
+    if position is None:
+        return Q()
+    timestamp, row_id = position
+    return Q(**{f"{field}__gt": timestamp}) | Q(**{field: timestamp, "id__gt": row_id})
+
+
+def product_changes(cursor: ChangeCursor, *, limit: int = 500) -> ChangePage:
+    # Rows are read in (timestamp, id) keyset order per stream and merged. Rows younger than
+    # the lag are held back: a transaction that commits late must not land behind a cursor.
+    horizon = timezone.now() - timedelta(seconds=float(get_setting("CHANGE_FEED_LAG_SECONDS")))
+    products = list(
+        Product.objects.select_related("category")
+        .filter(_after("updated_at", cursor.products), updated_at__lt=horizon)
+        .order_by("updated_at", "id")[: limit + 1]
+    )
+    tombstones = list(
+        ProductTombstone.objects.filter(
+            _after("deleted_at", cursor.tombstones), deleted_at__lt=horizon
+        ).order_by("deleted_at", "id")[: limit + 1]
+    )
+
+    merged = sorted(
+        [(product.updated_at, 0, product.id, product) for product in products]
+        + [(tombstone.deleted_at, 1, tombstone.id, tombstone) for tombstone in tombstones],
+        key=lambda row: row[:3],
+    )
+    has_more = len(merged) > limit
+    product_position, tombstone_position = cursor.products, cursor.tombstones
+    changes: list[ProductChange] = []
+    for changed_at, kind, row_id, row in merged[:limit]:
+        if kind == 0:
+            product_position = (changed_at, row_id)
+            changes.append(ProductChange(changed_at, row.id, row.sku, row))
+        else:
+            tombstone_position = (changed_at, row_id)
+            changes.append(ProductChange(changed_at, row.product_id, row.sku))
+    return ChangePage(changes, ChangeCursor(product_position, tombstone_position), has_more)
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from productory_catalog.models import Category, Product
+from productory_core.exports import ExportSpec
+
+CATEGORY_EXPORT = ExportSpec(
+    name="categories",
+    columns=(
+        ("id", "id"),
+        ("name", "name"),
+        ("slug", "slug"),
+        ("description", "description"),
+    ),
+    base_queryset=Category.objects.all,
+)
+
+PRODUCT_EXPORT = ExportSpec(
+    name="products",
+    columns=(
+        ("id", "id"),
+        ("name", "name"),
+        ("sku", "sku"),
+        ("category", "category__name"),
+        ("price_amount", "price_amount"),
+        ("currency", "currency"),
+        ("is_active", "is_active"),
+    ),
+    base_queryset=Product.objects.all,
+)
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+from decimal import Decimal
+from threading import Lock
+from typing import Any
+
+from django.db.models import BooleanField, Case, Count, IntegerField, Q, QuerySet, Value, When
+
+from productory_catalog.generations import CATALOG_GENERATION
+from productory_catalog.models import Category, Collection, Product
+from productory_core.conf import get_setting
+from productory_core.generations import get_generation
+
+# (label, lower bound inclusive, upper bound exclusive or None)
+PriceBand = tuple[str, Decimal, Decimal | None]
+
+_IN_STOCK = Q(stock_record__quantity__gt=0) | Q(stock_record__allow_backorder=True)
+
+
+def price_bands() -> list[PriceBand]:
+    bounds = sorted(Decimal(str(value)) for value in get_setting("FACET_PRICE_BANDS"))
+    if not bounds or bounds[0] > 0:
+        bounds.insert(0, Decimal("0"))
+    bands: list[PriceBand] = []
+    for index, low in enumerate(bounds):
+        high = bounds[index + 1] if index + 1 < len(bounds) else None
+        bands.append((f"{low}-{high}" if high is not None else f"{low}+", low, high))
+    return bands
+
+
+def _band_index(price: Decimal, bands: list[PriceBand]) -> int:
+    for index, (_, low, high) in enumerate(bands):
+        if price >= low and (high is None or price < high):
+            return index
+    return 0
+
+
+def _payload(
+    total: int,
+    categories: list[tuple[int, str, int]],
+    collections: list[tuple[int, str, int]],
+    band_counts: list[int],
+    in_stock: int,
+    bands: list[PriceBand],
+) -> dict[str, Any]:
+    return {
+        "count": total,
+        "categories": [
+            {"id": group_id, "name": name, "count": count}
+            for group_id, name, count in sorted(categories, key=lambda row: (row[1], row[0]))
+            if count
+        ],
+        "collections": [
+            {"id": group_id, "name": name, "count": count}
+            for group_id, name, count in sorted(collections, key=lambda row: (row[1], row[0]))
+            if count
+        ],
+        "price_bands": [
+            {
+                "label": label,
+                "min": str(low),
+                "max": str(high) if high is not None else None,
+                "count": band_counts[index],
+            }
+            for index, (label, low, high) in enumerate(bands)
+        ],
+        "in_stock": {"true": in_stock, "false": total - in_stock},
+    }
+
+
+def facet_counts(queryset: QuerySet[Product]) -> dict[str, Any]:
+    # Grouped aggregates over an arbitrary filtered queryset: a fixed handful of queries.
+    bands = price_bands()
+    queryset = queryset.order_by()
+    band_case = Case(
+        *[
+            When(
+                Q(price_amount__gte=low) & (Q(price_amount__lt=high) if high is not None else Q()),
+                then=Value(index),
+            )
+            for index, (_, low, high) in enumerate(bands)
+        ],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    band_counts = [0] * len(bands)
+    for band, count in (
+        queryset.annotate(band=band_case)
+        .values("band")
+        .annotate(count=Count("id"))
+        .values_list("band", "count")
+    ):
+        band_counts[band] += count
+
+    stock = dict(
+        queryset.annotate(
+            in_stock=Case(
+                When(_IN_STOCK, then=Value(True)), default=Value(False), output_field=BooleanField()
+            )
+        )
+        .values("in_stock")
+        .annotate(count=Count("id"))
+        .values_list("in_stock", "count")
+    )
+    categories = list(
+        queryset.values("category_id", "category__name")
+        .annotate(count=Count("id"))
+        .values_list("category_id", "category__name", "count")
+    )
+    collections = list(
+        Product.collections.through.objects.filter(product_id__in=queryset.values("id"))
+        .values("collection_id", "collection__name")
+        .annotate(count=Count("product_id"))
+        .order_by()
+        .values_list("collection_id", "collection__name", "count")
+    )
+    return _payload(
+        sum(band_counts),
+        categories,
+        collections,
+        band_counts,
+        stock.get(True, 0),
+        bands,
+    )
+
+
+def _bitmap(positions: list[int], size: int) -> int:
+    buffer = bytearray((size + 7) // 8)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, "little")
+
+
+class FacetIndex:
+    # One Python int per facet value used as a bitmap over product positions; counts for a
+    # filter are popcounts of ANDed bitmaps, so no query runs once the index is built.
+    def __init__(self, generation: int = 0) -> None:
+        self.generation = generation
+        self.bands = price_bands()
+        self.all = 0
+        self.categories: dict[int, int] = {}
+        self.collections: dict[int, int] = {}
+        self.currencies: dict[str, int] = {}
+        self.active: dict[bool, int] = {True: 0, False: 0}
+        self.price_bands = [0] * len(self.bands)
+        self.in_stock = 0
+        self.category_names: dict[int, str] = {}
+        self.collection_names: dict[int, str] = {}
+
+    @classmethod
+    def build(cls, generation: int = 0) -> FacetIndex:
+        index = cls(generation)
+        # Positions are collected first and packed once; OR-ing bits into growing ints one
+        # product at a time would be quadratic.
+        positions: dict[int, int] = {}
+        categories: dict[int, list[int]] = {}
+        currencies: dict[str, list[int]] = {}
+        active: dict[bool, list[int]] = {True: [], False: []}
+        bands: list[list[int]] = [[] for _ in index.bands]
+        in_stock: list[int] = []
+        rows = (
+            Product.objects.order_by("id")
+            .annotate(
+                in_stock=Case(
+                    When(_IN_STOCK, then=Value(True)),
+                    default=Value(False),
+                    output_field=BooleanField(),
+                )
+            )
+            .values_list("id", "category_id", "currency", "is_active", "price_amount", "in_stock")
+        )
+        for position, (product_id, category_id, currency, is_active, price, stocked) in enumerate(
+            rows.iterator(chunk_size=5000)
+        ):
+            positions[product_id] = position
+            categories.setdefault(category_id, []).append(position)
+            currencies.setdefault(currency, []).append(position)
+            active[bool(is_active)].append(position)
+            bands[_band_index(price, index.bands)].append(position)
+            if stocked:
+                in_stock.append(position)
+        collections: dict[int, list[int]] = {}
+        for product_id, collection_id in Product.collections.through.objects.values_list(
+            "product_id", "collection_id"
+        ).iterator(chunk_size=5000):
+            slot = positions.get(product_id)
+            if slot is not None:
+                collections.setdefault(collection_id, []).append(slot)
+
+        size = len(positions)
+        index.all = (1 << size) - 1
+        index.categories = {key: _bitmap(value, size) for key, value in categories.items()}
+        index.collections = {key: _bitmap(value, size) for key, value in collections.items()}
+        index.currencies = {key: _bitmap(value, size) for key, value in currencies.items()}
+        index.active = {key: _bitmap(value, size) for key, value in active.items()}
+        index.price_bands = [_bitmap(value, size) for value in bands]
+        index.in_stock = _bitmap(in_stock, size)
+        index.category_names = dict(Category.objects.values_list("id", "name"))
+        index.collection_names = dict(Collection.objects.values_list("id", "name"))
+        return index
+
+    def select(
+        self,
+        *,
+        category: int | None = None,
+        currency: str | None = None,
+        is_active: bool | None = None,
+    ) -> int:
+        selection = self.all
+        if category is not None:
+            selection &= self.categories.get(category, 0)
+        if currency is not None:
+            selection &= self.currencies.get(currency, 0)
+        if is_active is not None:
+            selection &= self.active[is_active]
+        return selection
+
+    def counts(self, selection: int) -> dict[str, Any]:
+        return _payload(
+            selection.bit_count(),
+            [
+                (
+                    category_id,
+                    self.category_names.get(category_id, ""),
+                    (bits & selection).bit_count(),
+                )
+                for category_id, bits in self.categories.items()
+            ],
+            [
+                (
+                    collection_id,
+                    self.collection_names.get(collection_id, ""),
+                    (bits & selection).bit_count(),
+                )
+                for collection_id, bits in self.collections.items()
+            ],
+            [(bits & selection).bit_count() for bits in self.price_bands],
+            (self.in_stock & selection).bit_count(),
+            self.bands,
+        )
+
+
+_index: FacetIndex | None = None
+_lock = Lock()
+
+
+def get_facet_index() -> FacetIndex:
+    global _index
+
+    generation = get_generation(CATALOG_GENERATION)
+    bands = price_bands()
+    index = _index
+    if index is not None and index.generation == generation and index.bands == bands:
+        return index
+    with _lock:
+        index = _index
+        if index is None or index.generation != generation or index.bands != bands:
+            index = FacetIndex.build(generation)
+            _index = index
+    return index
@@ -0,0 +1,10 @@
+from __future__ import annotations
+
+from productory_core.generations import publish_generation
+
+# Bumped on any product, category, collection, image or stock change.
+CATALOG_GENERATION = "catalog"
+
+
+def invalidate_catalog() -> None:
+    publish_generation(CATALOG_GENERATION)
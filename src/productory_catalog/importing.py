@@ -0,0 +1,393 @@
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import time
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import IO, Any
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.text import slugify
+
+from productory_catalog.models import Category, Collection, Product, StockRecord
+from productory_catalog.services import refresh_product_caches, touch_products
+from productory_core.currency import default_currency_code
+from productory_core.validators import validate_active_currency_code
+
+IMPORT_FORMATS = ("csv", "jsonl")
+IMPORT_COLUMNS = (
+    "sku",
+    "name",
+    "slug",
+    "description",
+    "category",
+    "collections",
+    "price_amount",
+    "currency",
+    "is_active",
+    "stock_quantity",
+    "allow_backorder",
+)
+_PRODUCT_UPDATE_FIELDS = [
+    "name",
+    "slug",
+    "description",
+    "category",
+    "price_amount",
+    "currency",
+    "is_active",
+    "content_hash",
+    "updated_at",
+]
+_BOOLEANS = {"true": True, "1": True, "yes": True, "false": False, "0": False, "no": False}
+_MAX_REPORTED_ERRORS = 50
+_MAX_PRICE = Decimal("100000000")
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+@dataclass
+class ImportRow:
+    line: int
+    sku: str
+    name: str
+    slug: str
+    description: str
+    category_id: int
+    collection_ids: tuple[int, ...] | None
+    price_amount: Decimal
+    currency: str
+    is_active: bool
+    stock: tuple[int, bool] | None
+
+    def digest(self) -> str:
+        payload = [
+            self.name,
+            self.slug,
+            self.description,
+            self.category_id,
+            self.collection_ids,
+            str(self.price_amount),
+            self.currency,
+            self.is_active,
+            self.stock,
+        ]
+        return hashlib.sha1(json.dumps(payload).encode()).hexdigest()
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    duplicates: int = 0
+    errors: list[str] = field(default_factory=list)
+    error_count: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "duplicates": self.duplicates,
+            "errors": self.error_count,
+            "error_samples": self.errors,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+    def add_error(self, line: int, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < _MAX_REPORTED_ERRORS:
+            self.errors.append(f"line {line}: {message}")
+
+
+def read_rows(handle: IO[str], fmt: str) -> Iterator[tuple[int, Mapping[str, Any]]]:
+    # Streams (line number, raw row) pairs; nothing beyond the current row is held.
+    if fmt == "csv":
+        reader = csv.DictReader(handle)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(handle, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_number, {"__error__": f"invalid JSON: {exc}"}
+            continue
+        yield line_number, row if isinstance(row, dict) else {"__error__": "not an object"}
+
+
+def _text(raw: Mapping[str, Any], key: str) -> str:
+    value = raw.get(key)
+    return "" if value is None else str(value).strip()
+
+
+def _boolean(raw: Mapping[str, Any], key: str, default: bool) -> bool:
+    value = raw.get(key)
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    parsed = _BOOLEANS.get(str(value).strip().lower())
+    if parsed is None:
+        raise ImportRowError(f"{key} must be a boolean.")
+    return parsed
+
+
+class _GroupResolver:
+    # Slug and name -> id maps loaded once per import; unknown groups are created on first use.
+    def __init__(self, model: type[Category] | type[Collection]) -> None:
+        self.model = model
+        self.ids: dict[str, int] = {}
+        for group_id, slug, name in model.objects.values_list("id", "slug", "name"):
+            self.ids[name.lower()] = group_id
+            self.ids[slug] = group_id
+
+    def resolve(self, value: str) -> int:
+        key = value.strip()
+        group_id = self.ids.get(key) or self.ids.get(key.lower())
+        if group_id is None:
+            slug = slugify(key)
+            if not slug:
+                raise ImportRowError(f"Invalid {self.model._meta.model_name} {value!r}.")
+            group, _ = self.model.objects.get_or_create(slug=slug, defaults={"name": key})
+            group_id = self.ids[key] = self.ids[key.lower()] = self.ids[slug] = group.pk
+        return group_id
+
+
+class ProductImporter:
+    def __init__(self, *, batch_size: int = 1000, force: bool = False) -> None:
+        self.batch_size = max(int(batch_size), 1)
+        self.force = force
+        self.categories = _GroupResolver(Category)
+        self.collections = _GroupResolver(Collection)
+        self.default_currency = default_currency_code()
+        self._currencies: dict[str, str | None] = {}
+
+    def _currency(self, raw: Mapping[str, Any]) -> str:
+        code = (_text(raw, "currency") or self.default_currency).upper()
+        if code not in self._currencies:
+            try:
+                validate_active_currency_code(code)
+                self._currencies[code] = None
+            except ValidationError as exc:
+                self._currencies[code] = exc.messages[0]
+        error = self._currencies[code]
+        if error:
+            raise ImportRowError(error)
+        return code
+
+    def parse(self, line: int, raw: Mapping[str, Any]) -> ImportRow:
+        if "__error__" in raw:
+            raise ImportRowError(str(raw["__error__"]))
+        sku = _text(raw, "sku")
+        name = _text(raw, "name")
+        category = _text(raw, "category")
+        if not sku or not name or not category:
+            raise ImportRowError("sku, name and category are required.")
+        if len(sku) > 64 or len(name) > 255:
+            raise ImportRowError("sku or name is too long.")
+        try:
+            price = Decimal(_text(raw, "price_amount"))
+        except InvalidOperation:
+            raise ImportRowError("price_amount must be a decimal.") from None
+        if not price.is_finite() or not 0 <= price < _MAX_PRICE:
+            raise ImportRowError(f"price_amount must be between 0 and {_MAX_PRICE}.")
+        price = price.quantize(Decimal("0.01"))
+
+        collection_ids = None
+        if "collections" in raw and raw["collections"] is not None:
+            values = raw["collections"]
+            if isinstance(values, str):
+                values = values.split("|")
+            names = [str(value) for value in values if str(value).strip()]
+            collection_ids = tuple(sorted({self.collections.resolve(name) for name in names}))
+
+        stock = None
+        if _text(raw, "stock_quantity"):
+            try:
+                quantity = int(_text(raw, "stock_quantity"))
+            except ValueError:
+                raise ImportRowError("stock_quantity must be an integer.") from None
+            if quantity < 0:
+                raise ImportRowError("stock_quantity must be >= 0.")
+            stock = (quantity, _boolean(raw, "allow_backorder", False))
+
+        return ImportRow(
+            line=line,
+            sku=sku,
+            name=name,
+            slug=_text(raw, "slug"),
+            description=_text(raw, "description"),
+            category_id=self.categories.resolve(category),
+            collection_ids=collection_ids,
+            price_amount=price,
+            currency=self._currency(raw),
+            is_active=_boolean(raw, "is_active", True),
+            stock=stock,
+        )
+
+    def run(self, rows: Iterable[tuple[int, Mapping[str, Any]]]) -> ImportReport:
+        report = ImportReport()
+        started = time.perf_counter()
+        batch: list[ImportRow] = []
+        for line, raw in rows:
+            report.rows += 1
+            try:
+                batch.append(self.parse(line, raw))
+            except ImportRowError as exc:
+                report.add_error(line, str(exc))
+                continue
+            if len(batch) >= self.batch_size:
+                self._import_batch(batch, report)
+                batch = []
+        if batch:
+            self._import_batch(batch, report)
+        report.seconds = time.perf_counter() - started
+        return report
+
+    def _import_batch(self, batch: list[ImportRow], report: ImportReport) -> None:
+        # A repeated SKU within a batch keeps its last row.
+        by_sku = {row.sku: row for row in batch}
+        report.duplicates += len(batch) - len(by_sku)
+        existing = {
+            sku: (product_id, content_hash, slug)
+            for sku, product_id, content_hash, slug in Product.objects.filter(
+                sku__in=list(by_sku)
+            ).values_list("sku", "id", "content_hash", "slug")
+        }
+
+        changed: list[tuple[ImportRow, str]] = []
+        for row in by_sku.values():
+            if not row.slug:
+                current = existing.get(row.sku)
+                row.slug = current[2] if current else slugify(f"{row.name} {row.sku}")[:255]
+            digest = row.digest()
+            if not self.force and row.sku in existing and existing[row.sku][1] == digest:
+                report.unchanged += 1
+                continue
+            changed.append((row, digest))
+        if not changed:
+            return
+
+        # Slugs are unique too; a clash would abort the whole batch, so reject those rows here.
+        owners = dict(
+            Product.objects.filter(slug__in=[row.slug for row, _ in changed]).values_list(
+                "slug", "sku"
+            )
+        )
+        accepted: list[tuple[ImportRow, str]] = []
+        for row, digest in changed:
+            owner = owners.setdefault(row.slug, row.sku)
+            if owner != row.sku:
+                report.add_error(row.line, f"slug {row.slug!r} already belongs to SKU {owner}.")
+                continue
+            accepted.append((row, digest))
+        if not accepted:
+            return
+
+        with transaction.atomic():
+            Product.objects.bulk_create(
+                [
+                    Product(
+                        sku=row.sku,
+                        name=row.name,
+                        slug=row.slug,
+                        description=row.description,
+                        category_id=row.category_id,
+                        price_amount=row.price_amount,
+                        currency=row.currency,
+                        is_active=row.is_active,
+                        content_hash=digest,
+                    )
+                    for row, digest in accepted
+                ],
+                update_conflicts=True,
+                unique_fields=["sku"],
+                update_fields=_PRODUCT_UPDATE_FIELDS,
+            )
+            # Upserts do not return ids on every backend, so read them back by SKU.
+            ids = dict(
+                Product.objects.filter(sku__in=[row.sku for row, _ in accepted]).values_list(
+                    "sku", "id"
+                )
+            )
+            stocked = [row for row, _ in accepted if row.stock is not None]
+            if stocked:
+                StockRecord.objects.bulk_create(
+                    [
+                        StockRecord(
+                            product_id=ids[row.sku],
+                            quantity=row.stock[0],
+                            allow_backorder=row.stock[1],
+                        )
+                        for row in stocked
+                        if row.stock is not None
+                    ],
+                    update_conflicts=True,
+                    unique_fields=["product"],
+                    update_fields=["quantity", "allow_backorder", "updated_at"],
+                )
+            self._sync_collections(
+                {
+                    ids[row.sku]: set(row.collection_ids)
+                    for row, _ in accepted
+                    if row.collection_ids is not None
+                }
+            )
+            refresh_product_caches(list(ids.values()))
+            touch_products(ids.values())
+
+        created = sum(1 for row, _ in accepted if row.sku not in existing)
+        report.created += created
+        report.updated += len(accepted) - created
+
+    def _sync_collections(self, wanted: dict[int, set[int]]) -> None:
+        if not wanted:
+            return
+        through = Product.collections.through
+        stale: list[int] = []
+        present: set[tuple[int, int]] = set()
+        for link_id, product_id, collection_id in through.objects.filter(
+            product_id__in=list(wanted)
+        ).values_list("id", "product_id", "collection_id"):
+            if collection_id in wanted[product_id]:
+                present.add((product_id, collection_id))
+            else:
+                stale.append(link_id)
+        if stale:
+            through.objects.filter(id__in=stale).delete()
+        through.objects.bulk_create(
+            [
+                through(product_id=product_id, collection_id=collection_id)
+                for product_id, collection_ids in wanted.items()
+                for collection_id in collection_ids
+                if (product_id, collection_id) not in present
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def import_products(
+    rows: Iterable[tuple[int, Mapping[str, Any]]],
+    *,
+    batch_size: int = 1000,
+    force: bool = False,
+) -> ImportReport:
+    return ProductImporter(batch_size=batch_size, force=force).run(rows)
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from productory_catalog.snapshot import build_catalog_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the active catalog to sharded, gzip-compressed JSON files plus a manifest for "
+        "static hosting. Unchanged shards from the previous build are reused."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("output_dir", help="Directory holding manifest.json and the shards.")
+        parser.add_argument(
+            "--shard-size",
+            type=int,
+            default=1000,
+            help="Width of each shard's product id range.",
+        )
+        parser.add_argument(
+            "--no-effective-prices",
+            action="store_true",
+            help="Skip promotion pricing; products carry list prices only.",
+        )
+        parser.add_argument(
+            "--no-prune",
+            action="store_true",
+            help="Keep shard files that the new manifest no longer references.",
+        )
+        parser.add_argument(
+            "--prune-grace-seconds",
+            type=float,
+            default=None,
+            help="How long files dropped from the manifest are kept before pruning "
+            "(default: PRODUCTORY['SNAPSHOT_PRUNE_GRACE_SECONDS']).",
+        )
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        report = build_catalog_snapshot(
+            options["output_dir"],
+            shard_size=options["shard_size"],
+            with_prices=not options["no_effective_prices"],
+            prune=not options["no_prune"],
+            prune_grace_seconds=options["prune_grace_seconds"],
+        )
+        if options["json"]:
+            self.stdout.write(json.dumps(report.as_dict(), indent=2))
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Snapshot of {report.products} products in {report.shards} shards built in "
+                f"{report.seconds:.2f}s: {report.files_written} files written "
+                f"({report.bytes_written} bytes), {report.files_reused} reused, "
+                f"{report.files_pruned} pruned, {report.files_retired} retired."
+            )
+        )
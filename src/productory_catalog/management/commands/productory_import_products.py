@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from productory_catalog.importing import IMPORT_COLUMNS, IMPORT_FORMATS, import_products, read_rows
+
+
+def _detect_format(path: str) -> str:
+    suffix = Path(path).suffix.lower()
+    if suffix == ".csv":
+        return "csv"
+    if suffix in {".jsonl", ".ndjson"}:
+        return "jsonl"
+    raise CommandError("Cannot infer the format from the file name; pass --format.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream products from a CSV or JSONL feed and upsert them by SKU in batches. "
+        f"Columns: {', '.join(IMPORT_COLUMNS)}."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help='Feed file, or "-" for stdin.')
+        parser.add_argument("--format", choices=IMPORT_FORMATS)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows upserted per transaction.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Rewrite rows even when their content hash is unchanged.",
+        )
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or _detect_format(path)
+        try:
+            handle = sys.stdin if path == "-" else open(path, encoding="utf-8-sig", newline="")
+        except OSError as exc:
+            raise CommandError(f"Cannot read feed: {exc}") from exc
+        try:
+            report = import_products(
+                read_rows(handle, fmt),
+                batch_size=options["batch_size"],
+                force=options["force"],
+            )
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report.as_dict(), indent=2))
+            return
+        style = self.style.SUCCESS if not report.error_count else self.style.WARNING
+        self.stdout.write(
+            style(
+                f"Imported {report.rows} rows in {report.seconds:.2f}s "
+                f"({report.rows_per_second:.0f} rows/s): {report.created} created, "
+                f"{report.updated} updated, {report.unchanged} unchanged, "
+                f"{report.duplicates} duplicates, {report.error_count} errors."
+            )
+        )
+        for error in report.errors:
+            self.stdout.write(f"  {error}")
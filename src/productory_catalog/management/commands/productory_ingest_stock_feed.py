@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from productory_catalog.stock import STOCK_OK, apply_stock_adjustments, read_feed_batches
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply a JSONL stock feed of {sku, quantity | delta, allow_backorder} lines in batched "
+        "conditional updates, optionally following the file as it grows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="JSONL feed file.")
+        parser.add_argument(
+            "--follow",
+            action="store_true",
+            help="Keep polling for appended lines instead of stopping at the end of the file.",
+        )
+        parser.add_argument(
+            "--offset-file",
+            help="Read the starting byte offset from this file and store progress in it.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of feed lines coalesced and applied together.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Number of SKUs per UPDATE statement.",
+        )
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+        parser.add_argument(
+            "--json",
+            action="store_true",
+            help="Print every per-SKU result as a JSON line.",
+        )
+
+    def handle(self, *args, **options):
+        offset_file = Path(options["offset_file"]) if options["offset_file"] else None
+        offset = 0
+        if offset_file is not None and offset_file.exists():
+            try:
+                offset = int(offset_file.read_text().strip() or 0)
+            except ValueError as exc:
+                raise CommandError(f"Invalid offset file: {exc}") from exc
+        try:
+            handle = open(options["path"], "rb")
+        except OSError as exc:
+            raise CommandError(f"Cannot read feed: {exc}") from exc
+
+        with handle:
+            handle.seek(offset)
+            batches = read_feed_batches(
+                handle,
+                batch_size=max(options["batch_size"], 1),
+                follow=options["follow"],
+                poll_interval=options["poll_interval"],
+            )
+            try:
+                for batch in batches:
+                    self._apply(batch, options)
+                    if offset_file is not None:
+                        offset_file.write_text(str(batch.offset))
+            except KeyboardInterrupt:
+                return
+
+    def _apply(self, batch, options) -> None:
+        started = time.perf_counter()
+        results = apply_stock_adjustments(
+            batch.adjustments, chunk_size=options["chunk_size"], source="feed"
+        )
+        elapsed = time.perf_counter() - started
+        for error in batch.errors:
+            self.stderr.write(f"Skipped line at {error}")
+        if options["json"]:
+            for result in results:
+                self.stdout.write(json.dumps(result.as_dict()))
+            return
+        rejected = [result for result in results if result.status != STOCK_OK]
+        self.stdout.write(
+            f"Applied {len(batch.adjustments)} lines to {len(results) - len(rejected)} SKUs in "
+            f"{elapsed:.2f}s ({len(rejected)} rejected, {len(batch.errors)} invalid lines)."
+        )
+        for result in rejected:
+            self.stdout.write(f"  {result.sku}: {result.status}")
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from productory_catalog.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product full-text search index."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of products indexed per statement.",
+        )
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        started = time.perf_counter()
+        indexed = backend.rebuild(batch_size=max(options["batch_size"], 1))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Indexed {indexed} products with {type(backend).__name__} "
+                f"in {time.perf_counter() - started:.2f}s."
+            )
+        )
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from typing import NamedTuple
+
+from django.core.cache import cache
+
+from productory_catalog.models import Product
+from productory_core.generations import (
+    bump_generation,
+    bump_generations,
+    get_generation,
+    get_generations,
+)
+
+MEMBERSHIP_GENERATION = "catalog-memberships"
+_TTL_SECONDS = 24 * 60 * 60
+
+
+class ProductMembership(NamedTuple):
+    category_id: int
+    collection_ids: frozenset[int]
+    # Ancestor category ids from the materialized path, root first and ending with category_id;
+    # rules targeting any of them match, like ``?category_tree=``.
+    category_path: tuple[int, ...] = ()
+
+
+def category_path_ids(path: str, category_id: int) -> tuple[int, ...]:
+    return tuple(int(part) for part in path.split("/") if part) or (category_id,)
+
+
+def _version(product_id: int) -> str:
+    return f"product-membership:{product_id}"
+
+
+def _keys(product_ids: Iterable[int]) -> dict[str, int]:
+    # Versioned per product like representations, so a read racing a write's commit cannot
+    # write the pre-commit membership back after the writer invalidated it.
+    product_ids = list(product_ids)
+    generation = get_generation(MEMBERSHIP_GENERATION)
+    versions = get_generations(_version(product_id) for product_id in product_ids)
+    return {
+        f"productory:membership:{generation}:{versions[_version(product_id)]}:{product_id}": (
+            product_id
+        )
+        for product_id in product_ids
+    }
+
+
+def get_product_memberships(product_ids: Iterable[int]) -> dict[int, ProductMembership]:
+    product_ids = set(product_ids)
+    if not product_ids:
+        return {}
+
+    keys = _keys(product_ids)
+    memberships = {
+        keys[key]: ProductMembership(category_id, frozenset(collection_ids), category_path)
+        for key, (category_id, category_path, collection_ids) in cache.get_many(keys).items()
+    }
+
+    missing = product_ids - memberships.keys()
+    if missing:
+        collections: dict[int, set[int]] = {product_id: set() for product_id in missing}
+        for product_id, collection_id in Product.collections.through.objects.filter(
+            product_id__in=missing
+        ).values_list("product_id", "collection_id"):
+            collections[product_id].add(collection_id)
+        loaded = {
+            product_id: ProductMembership(
+                category_id,
+                frozenset(collections[product_id]),
+                category_path_ids(category_path, category_id),
+            )
+            for product_id, category_id, category_path in Product.objects.filter(
+                id__in=missing
+            ).values_list("id", "category_id", "category__path")
+        }
+        cache.set_many(
+            {
+                key: (
+                    loaded[product_id].category_id,
+                    loaded[product_id].category_path,
+                    tuple(loaded[product_id].collection_ids),
+                )
+                for key, product_id in keys.items()
+                if product_id in loaded
+            },
+            _TTL_SECONDS,
+        )
+        memberships.update(loaded)
+    return memberships
+
+
+def forget_product_memberships(product_ids: Iterable[int]) -> None:
+    bump_generations(_version(product_id) for product_id in product_ids)
+
+
+def reset_product_memberships() -> None:
+    bump_generation(MEMBERSHIP_GENERATION)
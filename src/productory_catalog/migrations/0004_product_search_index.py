@@ -0,0 +1,63 @@
+from django.db import migrations
+
+SEARCH_TABLE = "productory_catalog_product_search"
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    product_table = apps.get_model("productory_catalog", "Product")._meta.db_table
+    if connection.vendor == "postgresql":
+        schema_editor.execute(
+            f"""
+            CREATE TABLE {SEARCH_TABLE} (
+                product_id bigint PRIMARY KEY
+                    REFERENCES {product_table} (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+                document tsvector NOT NULL
+            )
+            """
+        )
+        schema_editor.execute(
+            f"CREATE INDEX {SEARCH_TABLE}_gin ON {SEARCH_TABLE} USING GIN (document)"
+        )
+        schema_editor.execute(
+            f"""
+            INSERT INTO {SEARCH_TABLE} (product_id, document)
+            SELECT id,
+                setweight(to_tsvector('simple', sku), 'A')
+                || setweight(to_tsvector('simple', name), 'A')
+                || setweight(to_tsvector('simple', slug), 'B')
+                || setweight(to_tsvector('simple', description), 'C')
+            FROM {product_table}
+            """
+        )
+    elif connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA compile_options")
+            if "ENABLE_FTS5" not in {row[0] for row in cursor.fetchall()}:
+                # Search falls back to icontains filtering.
+                return
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(sku, name, slug, description)"
+        )
+        schema_editor.execute(
+            f"""
+            INSERT INTO {SEARCH_TABLE} (rowid, sku, name, slug, description)
+            SELECT id, sku, name, slug, description FROM {product_table}
+            """
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in {"postgresql", "sqlite"}:
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productory_catalog', '0003_alter_product_currency'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
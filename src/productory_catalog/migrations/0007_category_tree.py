@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat
+
+
+def backfill_category_paths(apps, schema_editor):
+    # Every existing category becomes a root.
+    Category = apps.get_model("productory_catalog", "Category")
+    Category.objects.update(path=Concat(Cast("id", CharField()), Value("/")), depth=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productory_catalog', '0006_product_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='children', to='productory_catalog.category'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_category_paths, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,11 @@
 from decimal import Decimal
 
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Concat, Length, Substr
+from django.utils import timezone
 
 from productory_core.currency import default_currency_code
 from productory_core.models import TimeStampedModel
@@ -12,6 +16,17 @@ class Category(TimeStampedModel):
     name = models.CharField(max_length=255, unique=True)
     slug = models.SlugField(max_length=255, unique=True)
     description = models.TextField(blank=True)
+    parent = models.ForeignKey(
+        "self",
+        on_delete=models.PROTECT,
+        related_name="children",
+        null=True,
+        blank=True,
+    )
+    # Materialized path of ancestor ids including this one, e.g. "3/17/42/"; a subtree is every
+    # row whose path starts with its root's path.
+    path = models.CharField(max_length=255, db_index=True, editable=False, default="")
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ["name"]
@@ -19,6 +34,79 @@ class Category(TimeStampedModel):
     def __str__(self) -> str:
         return self.name
 
+    def clean(self):
+        super().clean()
+        if self.is_moved_under(self.parent):
+            raise ValidationError({"parent": "A category cannot be moved under itself."})
+
+    def is_moved_under(self, parent: "Category | None") -> bool:
+        return bool(parent and self.path and parent.path.startswith(self.path))
+
+    def is_too_deep_under(self, parent: "Category | None") -> bool:
+        # A new row's id is not known yet; the next one is used as a stand-in for its length.
+        own_id = self.pk or (Category.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+        path = f"{parent.path if parent else ''}{own_id}/"
+        return self._longest_subtree_path(path, self.path or None) > self._max_path_length()
+
+    def get_descendants(self, *, include_self: bool = False):
+        descendants = Category.objects.filter(path__startswith=self.path)
+        return descendants if include_self else descendants.exclude(pk=self.pk)
+
+    def save(self, *args, **kwargs):
+        parent_path, parent_depth = "", -1
+        if self.parent_id is not None:
+            parent_path, parent_depth = Category.objects.values_list("path", "depth").get(
+                pk=self.parent_id
+            )
+        previous = None
+        if not self._state.adding:
+            previous = Category.objects.filter(pk=self.pk).values_list("path", "depth").first()
+        if previous and previous[0] and parent_path.startswith(previous[0]):
+            raise ValidationError({"parent": "A category cannot be moved under itself."})
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "path", "depth"}
+        self.depth = parent_depth + 1
+
+        with transaction.atomic():
+            if self.pk is None:
+                # The path ends with the row's own id, which only exists after the insert.
+                self.path = parent_path
+                super().save(*args, **kwargs)
+                self.path = f"{parent_path}{self.pk}/"
+                self._check_path_length(None)
+                Category.objects.filter(pk=self.pk).update(path=self.path)
+                return
+            self.path = f"{parent_path}{self.pk}/"
+            self._check_path_length(previous)
+            super().save(*args, **kwargs)
+            if previous and previous[0] and previous[0] != self.path:
+                self._move_descendants(*previous)
+
+    def _check_path_length(self, previous: tuple[str, int] | None) -> None:
+        old_path = previous[0] if previous else None
+        if self._longest_subtree_path(self.path, old_path) > self._max_path_length():
+            raise ValidationError({"parent": "The category tree is too deep."})
+
+    def _longest_subtree_path(self, path: str, old_path: str | None) -> int:
+        longest = len(path)
+        if old_path and len(path) > len(old_path):
+            deepest = Category.objects.filter(path__startswith=old_path).aggregate(
+                longest=Max(Length("path"))
+            )["longest"]
+            longest += (deepest or 0) - len(old_path)
+        return longest
+
+    def _max_path_length(self) -> int:
+        return self._meta.get_field("path").max_length or 0
+
+    def _move_descendants(self, old_path: str, old_depth: int) -> None:
+        # One UPDATE swaps the old prefix for the new one across the whole subtree.
+        Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+            path=Concat(Value(self.path), Substr("path", len(old_path) + 1)),
+            depth=F("depth") + (self.depth - old_depth),
+            updated_at=timezone.now(),
+        )
+
 
 class Collection(TimeStampedModel):
     name = models.CharField(max_length=255, unique=True)
@@ -32,6 +120,18 @@ class Collection(TimeStampedModel):
         return self.name
 
 
+class ProductQuerySet(models.QuerySet):
+    def in_category_tree(self, category: Category):
+        # A prefix match on the indexed category path: one query however deep the tree is.
+        return self.filter(category__path__startswith=category.path)
+
+    def with_primary_image_url(self):
+        primary_image = ProductImage.objects.filter(product_id=OuterRef("pk")).order_by(
+            "position", "id"
+        )
+        return self.annotate(primary_image_url=Subquery(primary_image.values("image_url")[:1]))
+
+
 class Product(TimeStampedModel):
     name = models.CharField(max_length=255)
     slug = models.SlugField(max_length=255, unique=True)
@@ -50,15 +150,25 @@ class Product(TimeStampedModel):
         validators=[validate_active_currency_code],
     )
     is_active = models.BooleanField(default=True)
+    # Digest of the last imported feed row; lets bulk imports skip unchanged rows.
+    content_hash = models.CharField(max_length=40, blank=True, editable=False)
+
+    objects = ProductQuerySet.as_manager()
 
     class Meta:
         ordering = ["name"]
+        indexes = [
+            # Keyset order of the change feed.
+            models.Index(fields=["updated_at", "id"], name="productory_product_changes_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.name} ({self.sku})"
 
     def save(self, *args, **kwargs):
         self.currency = self.currency.upper()
+        # Any edit outside the importer makes the next import rewrite the row.
+        self.content_hash = ""
         return super().save(*args, **kwargs)
 
 
@@ -73,6 +183,22 @@ class ProductImage(TimeStampedModel):
         unique_together = ("product", "position")
 
 
+class ProductTombstone(models.Model):
+    # Left behind by deleted products so the change feed can report deletions.
+    product_id = models.BigIntegerField()
+    sku = models.CharField(max_length=64)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["deleted_at", "id"]
+        indexes = [
+            models.Index(fields=["deleted_at", "id"], name="productory_tombstone_feed_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.sku} (deleted)"
+
+
 class StockRecord(TimeStampedModel):
     product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name="stock_record")
     quantity = models.PositiveIntegerField(default=0)
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from django.core.cache import cache
+
+from productory_core.generations import (
+    bump_generation,
+    bump_generations,
+    get_generation,
+    get_generations,
+)
+
+# Bumped when a category or collection changes, since those are embedded in many products.
+REPRESENTATION_GENERATION = "catalog-representations"
+_TTL_SECONDS = 24 * 60 * 60
+
+
+def _version(product_id: int) -> str:
+    return f"product-repr:{product_id}"
+
+
+def _keys(kind: str, product_ids: Iterable[int]) -> dict[str, int]:
+    # Keys carry a per-product version that writers bump instead of deleting entries. A reader
+    # that rendered rows before a writer committed stores them under the old version, which
+    # nobody reads again, so it cannot put stale data back after the writer's invalidation.
+    product_ids = list(product_ids)
+    generation = get_generation(REPRESENTATION_GENERATION)
+    versions = get_generations(_version(product_id) for product_id in product_ids)
+    return {
+        f"productory:product-repr:{kind}:{generation}:{versions[_version(product_id)]}:"
+        f"{product_id}": product_id
+        for product_id in product_ids
+    }
+
+
+def get_cached_representation(kind: str, product_id: int) -> dict[str, Any] | None:
+    (key,) = _keys(kind, [product_id])
+    return cache.get(key)
+
+
+def get_representations(
+    kind: str,
+    product_ids: Iterable[int],
+    render: Callable[[list[int]], dict[int, dict[str, Any]]],
+) -> dict[int, dict[str, Any]]:
+    # One get_many for the batch; only misses are rendered and written back with set_many.
+    product_ids = set(product_ids)
+    if not product_ids:
+        return {}
+
+    keys = _keys(kind, product_ids)
+    representations = {keys[key]: data for key, data in cache.get_many(keys).items()}
+
+    missing = product_ids - representations.keys()
+    if missing:
+        rendered = render(sorted(missing))
+        cache.set_many(
+            {
+                key: rendered[product_id]
+                for key, product_id in keys.items()
+                if product_id in rendered
+            },
+            _TTL_SECONDS,
+        )
+        representations.update(rendered)
+    return representations
+
+
+def forget_product_representations(product_ids: Iterable[int]) -> None:
+    bump_generations(_version(product_id) for product_id in product_ids)
+
+
+def reset_product_representations() -> None:
+    bump_generation(REPRESENTATION_GENERATION)
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import re
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator, Sequence
+
+from django.db import connection
+from django.db.models import QuerySet
+from django.utils.module_loading import import_string
+
+from productory_catalog.models import Product
+from productory_core.conf import get_setting
+
+SEARCH_TABLE = "productory_catalog_product_search"
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_BATCH = 500
+
+
+def search_tokens(query: str) -> list[str]:
+    # Only word characters reach the engines, so user input can never inject query syntax.
+    return _TOKEN.findall(query.lower())
+
+
+def _chunked(values: Iterable[int], size: int) -> Iterator[list[int]]:
+    chunk: list[int] = []
+    for value in values:
+        chunk.append(value)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BaseSearchBackend:
+    # ``None`` from search_ids means "not handled": callers fall back to icontains filtering.
+    # ``within`` restricts matches to a product queryset before ``limit`` is applied.
+    def search_ids(
+        self, query: str, *, limit: int, within: QuerySet[Product] | None = None
+    ) -> list[int] | None:
+        return None
+
+    def index_products(self, product_ids: Sequence[int]) -> None:
+        pass
+
+    def remove_products(self, product_ids: Sequence[int]) -> None:
+        pass
+
+    def rebuild(self, *, batch_size: int = 1000) -> int:
+        return 0
+
+
+class BasicSearchBackend(BaseSearchBackend):
+    pass
+
+
+class _IndexedSearchBackend(BaseSearchBackend, ABC):
+    key_column = "product_id"
+
+    @abstractmethod
+    def _upsert(self, cursor, product_ids: list[int]) -> None: ...
+
+    @abstractmethod
+    def search_ids(
+        self, query: str, *, limit: int, within: QuerySet[Product] | None = None
+    ) -> list[int] | None: ...
+
+    def _within(self, within: QuerySet[Product] | None) -> tuple[str, list]:
+        if within is None:
+            return "", []
+        sql, params = within.order_by().values("id").query.sql_with_params()
+        return f" AND {self.key_column} IN ({sql})", list(params)
+
+    def index_products(self, product_ids: Sequence[int]) -> None:
+        with connection.cursor() as cursor:
+            for chunk in _chunked(product_ids, _BATCH):
+                self._upsert(cursor, chunk)
+
+    def remove_products(self, product_ids: Sequence[int]) -> None:
+        with connection.cursor() as cursor:
+            for chunk in _chunked(product_ids, _BATCH):
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(
+                    f"DELETE FROM {SEARCH_TABLE} WHERE {self.key_column} IN ({placeholders})",
+                    chunk,
+                )
+
+    def rebuild(self, *, batch_size: int = 1000) -> int:
+        indexed = 0
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+            ids = Product.objects.order_by("id").values_list("id", flat=True)
+            for chunk in _chunked(ids.iterator(chunk_size=batch_size), batch_size):
+                self._upsert(cursor, chunk)
+                indexed += len(chunk)
+        return indexed
+
+
+class PostgresSearchBackend(_IndexedSearchBackend):
+    # tsvector column with a GIN index; the "simple" config keeps SKUs and names verbatim.
+    def _upsert(self, cursor, product_ids: list[int]) -> None:
+        cursor.execute(
+            f"""
+            INSERT INTO {SEARCH_TABLE} (product_id, document)
+            SELECT id,
+                setweight(to_tsvector('simple', sku), 'A')
+                || setweight(to_tsvector('simple', name), 'A')
+                || setweight(to_tsvector('simple', slug), 'B')
+                || setweight(to_tsvector('simple', description), 'C')
+            FROM {Product._meta.db_table}
+            WHERE id = ANY(%s)
+            ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document
+            """,
+            [product_ids],
+        )
+
+    def search_ids(
+        self, query: str, *, limit: int, within: QuerySet[Product] | None = None
+    ) -> list[int] | None:
+        tokens = search_tokens(query)
+        if not tokens:
+            return []
+        within_sql, within_params = self._within(within)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT product_id FROM {SEARCH_TABLE}, to_tsquery('simple', %s) AS query
+                WHERE document @@ query{within_sql}
+                ORDER BY ts_rank(document, query) DESC, product_id
+                LIMIT %s
+                """,
+                [" & ".join(f"{token}:*" for token in tokens), *within_params, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class SqliteFtsSearchBackend(_IndexedSearchBackend):
+    # FTS5 virtual table keyed by rowid = product id, ranked with weighted bm25.
+    key_column = "rowid"
+
+    def _upsert(self, cursor, product_ids: list[int]) -> None:
+        placeholders = ", ".join(["%s"] * len(product_ids))
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})", product_ids)
+        cursor.execute(
+            f"""
+            INSERT INTO {SEARCH_TABLE} (rowid, sku, name, slug, description)
+            SELECT id, sku, name, slug, description FROM {Product._meta.db_table}
+            WHERE id IN ({placeholders})
+            """,
+            product_ids,
+        )
+
+    def search_ids(
+        self, query: str, *, limit: int, within: QuerySet[Product] | None = None
+    ) -> list[int] | None:
+        tokens = search_tokens(query)
+        if not tokens:
+            return []
+        within_sql, within_params = self._within(within)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s{within_sql}
+                ORDER BY bm25({SEARCH_TABLE}, 10.0, 5.0, 2.0, 1.0), rowid
+                LIMIT %s
+                """,
+                [" ".join(f'"{token}"*' for token in tokens), *within_params, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+_BACKENDS = {
+    "basic": BasicSearchBackend,
+    "postgres": PostgresSearchBackend,
+    "sqlite_fts": SqliteFtsSearchBackend,
+}
+_resolved: dict[tuple[str, str], BaseSearchBackend] = {}
+
+
+def _auto_backend_name() -> str:
+    if connection.vendor == "postgresql":
+        name = "postgres"
+    elif connection.vendor == "sqlite":
+        name = "sqlite_fts"
+    else:
+        return "basic"
+    # The migration skips the table where the engine lacks support (e.g. SQLite without FTS5).
+    with connection.cursor() as cursor:
+        tables = connection.introspection.table_names(cursor)
+    return name if SEARCH_TABLE in tables else "basic"
+
+
+def get_search_backend() -> BaseSearchBackend:
+    configured = str(get_setting("SEARCH_BACKEND"))
+    key = (configured, connection.vendor)
+    backend = _resolved.get(key)
+    if backend is None:
+        name = _auto_backend_name() if configured == "auto" else configured
+        backend_class = _BACKENDS.get(name) or import_string(name)
+        backend = backend_class()
+        _resolved[key] = backend
+    return backend
+
+
+def search_product_ids(
+    query: str, *, limit: int | None = None, within: QuerySet[Product] | None = None
+) -> list[int] | None:
+    query = query.strip()
+    if not query:
+        return None
+    # An exact SKU is answered from the unique index without touching the text index.
+    skus = {query, query.upper()}
+    candidates = Product.objects.all() if within is None else within.order_by()
+    exact = list(candidates.filter(sku__in=skus).values_list("id", flat=True)[:1])
+    if exact:
+        return exact
+    if limit is None:
+        limit = int(get_setting("SEARCH_MAX_RESULTS"))
+    return get_search_backend().search_ids(query, limit=limit, within=within)
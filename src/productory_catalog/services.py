@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import TypeVar
+
+from django.db import transaction
+from django.utils import timezone
+
+from productory_catalog.autocomplete import invalidate_autocomplete
+from productory_catalog.generations import invalidate_catalog
+from productory_catalog.memberships import forget_product_memberships
+from productory_catalog.models import Product
+from productory_catalog.representations import forget_product_representations
+from productory_catalog.search import get_search_backend
+from productory_core.audit_signals import record_audit_event
+from productory_core.conf import get_setting
+from productory_core.hooks import emit_webhook_event, product_prices_changed
+
+_T = TypeVar("_T")
+
+
+class UnknownProductsError(ValueError):
+    def __init__(self, skus: Sequence[str]) -> None:
+        super().__init__(f"Unknown SKUs: {', '.join(skus)}")
+        self.skus = list(skus)
+
+
+@dataclass(frozen=True)
+class PriceUpdateResult:
+    updated: int
+    unchanged: int
+    seconds: float
+    changes: dict[str, tuple[str, str]] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "seconds": round(self.seconds, 3),
+        }
+
+
+def _forget(product_ids: list[int]) -> None:
+    forget_product_memberships(product_ids)
+    forget_product_representations(product_ids)
+
+
+def refresh_product_caches(product_ids: Sequence[int], *, search: bool = True) -> None:
+    # Bulk writes skip model signals; this does what the signals would have done per row.
+    product_ids = list(product_ids)
+    if not product_ids:
+        return
+    _forget(product_ids)
+    transaction.on_commit(lambda: _forget(product_ids))
+    if search:
+        get_search_backend().index_products(product_ids)
+        invalidate_autocomplete()
+    invalidate_catalog()
+
+
+def touch_products(product_ids: Iterable[int], *, chunk_size: int = 1000) -> None:
+    # The change feed pages by updated_at, so writers call this last in their transaction:
+    # stamped this close to the commit, the CHANGE_FEED_LAG_SECONDS horizon covers the gap.
+    stamp = timezone.now()
+    for chunk in _chunked(list(product_ids), max(int(chunk_size), 1)):
+        Product.objects.filter(id__in=chunk).update(updated_at=stamp)
+
+
+def effective_prices(products: Sequence[Product]) -> dict[int, tuple[Decimal, str]]:
+    if not get_setting("ENABLE_PROMOTIONS", True):
+        return {}
+    try:
+        from productory_promotions.services import resolve_product_prices
+    except ImportError:
+        return {}
+    return resolve_product_prices(products)
+
+
+def _chunked(values: Sequence[_T], size: int) -> Iterator[Sequence[_T]]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def _announce_price_changes(product_ids: list[int], changes: dict[str, tuple[str, str]]) -> None:
+    product_prices_changed.send(sender=Product, product_ids=product_ids, changes=changes)
+    emit_webhook_event(
+        "catalog.prices_changed",
+        {
+            "product_ids": product_ids,
+            "changes": {sku: {"old": old, "new": new} for sku, (old, new) in changes.items()},
+        },
+    )
+
+
+def bulk_update_prices(
+    prices: Sequence[tuple[str, Decimal]],
+    *,
+    actor=None,
+    chunk_size: int = 1000,
+) -> PriceUpdateResult:
+    # All-or-nothing: unknown SKUs reject the whole list before anything is written.
+    started = time.perf_counter()
+    chunk_size = max(int(chunk_size), 1)
+    wanted = dict(prices)
+    skus = list(wanted)
+
+    with transaction.atomic():
+        products: list[Product] = []
+        for chunk in _chunked(skus, chunk_size):
+            products.extend(
+                Product.objects.select_for_update()
+                .filter(sku__in=chunk)
+                .only("id", "sku", "price_amount")
+            )
+        unknown = set(skus) - {product.sku for product in products}
+        if unknown:
+            raise UnknownProductsError(sorted(unknown))
+
+        changed: list[Product] = []
+        changes: dict[str, tuple[str, str]] = {}
+        for product in products:
+            price = wanted[product.sku]
+            if product.price_amount == price:
+                continue
+            changes[product.sku] = (str(product.price_amount), str(price))
+            product.price_amount = price
+            # Manual price changes invalidate the importer's row hash, as Product.save() does.
+            product.content_hash = ""
+            changed.append(product)
+
+        if changed:
+            Product.objects.bulk_update(
+                changed, ["price_amount", "content_hash"], batch_size=chunk_size
+            )
+            product_ids = [product.id for product in changed]
+            # Prices are not part of the search document.
+            refresh_product_caches(product_ids, search=False)
+            record_audit_event(
+                model_label="productory_catalog.Product",
+                object_pk="bulk",
+                action="bulk_updated",
+                changes={"price_amount": {sku: list(pair) for sku, pair in changes.items()}},
+                actor=actor,
+            )
+            transaction.on_commit(lambda: _announce_price_changes(product_ids, changes))
+            # Stamped after the locks and the chunked writes, not when the call started.
+            touch_products(product_ids, chunk_size=chunk_size)
+
+    return PriceUpdateResult(
+        updated=len(changed),
+        unchanged=len(products) - len(changed),
+        seconds=time.perf_counter() - started,
+        changes=changes,
+    )
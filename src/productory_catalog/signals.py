@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from productory_catalog.autocomplete import remove_from_autocomplete, update_autocomplete
+from productory_catalog.generations import invalidate_catalog
+from productory_catalog.memberships import forget_product_memberships, reset_product_memberships
+from productory_catalog.models import (
+    Category,
+    Collection,
+    Product,
+    ProductImage,
+    ProductTombstone,
+    StockRecord,
+)
+from productory_catalog.representations import (
+    forget_product_representations,
+    reset_product_representations,
+)
+from productory_catalog.search import get_search_backend
+from productory_catalog.services import touch_products
+
+
+def _forget(product_ids: list[int]) -> None:
+    # Forget now and after commit so no process re-caches pre-commit memberships.
+    forget_product_memberships(product_ids)
+    transaction.on_commit(lambda: forget_product_memberships(product_ids))
+
+
+def _reset() -> None:
+    reset_product_memberships()
+    transaction.on_commit(reset_product_memberships)
+
+
+def _forget_representations(product_ids: list[int]) -> None:
+    forget_product_representations(product_ids)
+    transaction.on_commit(lambda: forget_product_representations(product_ids))
+
+
+def _reset_representations() -> None:
+    reset_product_representations()
+    transaction.on_commit(reset_product_representations)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def forget_membership_on_product_change(sender, instance, **kwargs):
+    _forget([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Collection)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=StockRecord)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Collection)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_delete, sender=StockRecord)
+def invalidate_catalog_on_change(sender, **kwargs):
+    invalidate_catalog()
+
+
+@receiver(m2m_changed, sender=Product.collections.through)
+def invalidate_catalog_on_collection_change(sender, action, **kwargs):
+    if action in {"post_add", "post_remove", "post_clear"}:
+        invalidate_catalog()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def forget_representation_on_product_change(sender, instance, **kwargs):
+    _forget_representations([instance.pk])
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=StockRecord)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_delete, sender=StockRecord)
+def forget_representation_on_related_change(sender, instance, **kwargs):
+    _forget_representations([instance.product_id])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Collection)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Collection)
+def reset_representations_on_group_change(sender, **kwargs):
+    # Category and collection fields are embedded in every member's representation.
+    _reset_representations()
+
+
+# Related writes bump Product.updated_at so the change feed reports them; update() skips signals.
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=StockRecord)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_delete, sender=StockRecord)
+def touch_product_on_related_change(sender, instance, **kwargs):
+    touch_products([instance.product_id])
+
+
+@receiver(post_save, sender=Category)
+def touch_products_on_category_change(sender, instance, created, **kwargs):
+    if not created:
+        touch_products(instance.products.values_list("id", flat=True))
+
+
+@receiver(m2m_changed, sender=Product.collections.through)
+def touch_products_on_collection_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse and action in {"post_add", "post_remove", "post_clear"}:
+        touch_products([instance.pk])
+    elif reverse and action in {"post_add", "post_remove"} and pk_set:
+        touch_products(pk_set)
+    elif reverse and action == "pre_clear":
+        # Clearing from the collection side reports no pk_set, so read the members first.
+        touch_products(instance.products.values_list("id", flat=True))
+
+
+@receiver(pre_delete, sender=Collection)
+def touch_products_on_collection_delete(sender, instance, **kwargs):
+    touch_products(instance.products.values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=Product)
+def record_product_tombstone(sender, instance, **kwargs):
+    ProductTombstone.objects.create(product_id=instance.pk, sku=instance.sku)
+
+
+@receiver(post_save, sender=Product)
+def index_product_for_search(sender, instance, **kwargs):
+    get_search_backend().index_products([instance.pk])
+    update_autocomplete(instance)
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_from_search(sender, instance, **kwargs):
+    get_search_backend().remove_products([instance.pk])
+    remove_from_autocomplete(instance.pk)
+
+
+@receiver(m2m_changed, sender=Product.collections.through)
+def forget_membership_on_collection_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in {"post_add", "post_remove", "post_clear"}:
+        return
+    if not reverse:
+        _forget([instance.pk])
+        _forget_representations([instance.pk])
+    elif pk_set:
+        _forget(list(pk_set))
+        _forget_representations(list(pk_set))
+    else:
+        # Clearing a collection from its side does not report the affected products.
+        _reset()
+        _reset_representations()
+
+
+@receiver(post_delete, sender=Collection)
+def reset_memberships_on_collection_delete(sender, **kwargs):
+    _reset()
+
+
+@receiver(post_save, sender=Category)
+def reset_memberships_on_category_change(sender, created, **kwargs):
+    # Moving a category rewrites the paths of its whole subtree with one update().
+    if not created:
+        _reset()
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from django.db.models import Min
+from django.utils import timezone
+
+from productory_catalog.api.serializers import (
+    CategorySerializer,
+    CollectionSerializer,
+    ProductDetailSerializer,
+    ProductPricedDetailSerializer,
+)
+from productory_catalog.models import Category, Collection, Product
+from productory_catalog.services import effective_prices
+from productory_core.conf import get_setting
+
+MANIFEST_NAME = "manifest.json"
+SNAPSHOT_VERSION = 1
+# Only files matching this are ever pruned from the output directory.
+_SNAPSHOT_FILE = re.compile(r"^(products-\d+|categories|collections)-[0-9a-f]{16}\.json\.gz$")
+
+
+@dataclass(frozen=True)
+class SnapshotReport:
+    products: int
+    shards: int
+    files_written: int
+    files_reused: int
+    bytes_written: int
+    files_pruned: int
+    files_retired: int
+    seconds: float
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "products": self.products,
+            "shards": self.shards,
+            "files_written": self.files_written,
+            "files_reused": self.files_reused,
+            "bytes_written": self.bytes_written,
+            "files_pruned": self.files_pruned,
+            "files_retired": self.files_retired,
+            "seconds": round(self.seconds, 3),
+        }
+
+
+def _encode(payload: Any) -> tuple[bytes, str]:
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+    return raw, hashlib.sha256(raw).hexdigest()
+
+
+def _shard_ranges(shard_size: int) -> Iterator[tuple[int, int, int]]:
+    # Shards cover fixed id ranges, so an edit only changes the shard holding that id and new
+    # products land in the last shards; empty ranges are skipped with one MIN() per shard.
+    active = Product.objects.filter(is_active=True)
+    start = 0
+    while True:
+        first_id = active.filter(id__gte=start).aggregate(first=Min("id"))["first"]
+        if first_id is None:
+            return
+        shard = first_id // shard_size
+        start = (shard + 1) * shard_size
+        yield shard, shard * shard_size, start
+
+
+def _shard_products(low: int, high: int, with_prices: bool) -> list[dict[str, Any]]:
+    products = list(
+        Product.objects.filter(is_active=True, id__gte=low, id__lt=high)
+        .select_related("category", "stock_record")
+        .prefetch_related("collections", "images")
+        .order_by("id")
+    )
+    if not with_prices:
+        return list(ProductDetailSerializer(products, many=True).data)
+    context = {"effective_prices": effective_prices(products)}
+    return list(ProductPricedDetailSerializer(products, many=True, context=context).data)
+
+
+class _SnapshotWriter:
+    def __init__(self, output_dir: Path, previous: dict[str, Any]) -> None:
+        self.output_dir = output_dir
+        self.previous_files = {
+            entry["sha256"]: entry["file"]
+            for entry in [*previous.get("shards", []), *previous.get("files", {}).values()]
+        }
+        self.written = self.reused = self.bytes_written = 0
+
+    def write(self, stem: str, payload: Any) -> dict[str, Any]:
+        raw, digest = _encode(payload)
+        name = f"{stem}-{digest[:16]}.json.gz"
+        path = self.output_dir / name
+        # Content-addressed names: an unchanged shard keeps its file and its CDN cache entry.
+        if self.previous_files.get(digest) == name and path.exists():
+            self.reused += 1
+        else:
+            compressed = gzip.compress(raw, compresslevel=9, mtime=0)
+            temporary = path.with_suffix(".tmp")
+            temporary.write_bytes(compressed)
+            os.replace(temporary, path)
+            self.written += 1
+            self.bytes_written += len(compressed)
+        return {"file": name, "sha256": digest, "bytes": path.stat().st_size}
+
+
+def _read_manifest(output_dir: Path) -> dict[str, Any]:
+    try:
+        manifest = json.loads((output_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return manifest if manifest.get("version") == SNAPSHOT_VERSION else {}
+
+
+def _manifest_files(manifest: dict[str, Any]) -> set[str]:
+    return {
+        entry["file"]
+        for entry in [*manifest.get("shards", []), *manifest.get("files", {}).values()]
+    }
+
+
+def _retired_at(value: Any) -> datetime | None:
+    try:
+        retired_at = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    return retired_at if timezone.is_aware(retired_at) else None
+
+
+def build_catalog_snapshot(
+    output_dir: str | Path,
+    *,
+    shard_size: int = 1000,
+    with_prices: bool = True,
+    prune: bool = True,
+    prune_grace_seconds: float | None = None,
+) -> SnapshotReport:
+    started = time.perf_counter()
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    shard_size = max(int(shard_size), 1)
+    if prune_grace_seconds is None:
+        prune_grace_seconds = float(get_setting("SNAPSHOT_PRUNE_GRACE_SECONDS"))
+    previous = _read_manifest(output_dir)
+    # A new shard size changes every file name, so nothing is reused; retirement still applies.
+    writer = _SnapshotWriter(
+        output_dir, previous if previous.get("shard_size") == shard_size else {}
+    )
+
+    files = {
+        "categories": writer.write(
+            "categories", CategorySerializer(Category.objects.order_by("id"), many=True).data
+        ),
+        "collections": writer.write(
+            "collections", CollectionSerializer(Collection.objects.order_by("id"), many=True).data
+        ),
+    }
+    shards: list[dict[str, Any]] = []
+    total = 0
+    # One shard in memory at a time.
+    for shard, low, high in _shard_ranges(shard_size):
+        products = _shard_products(low, high, with_prices)
+        entry = writer.write(f"products-{shard:06d}", products)
+        shards.append(
+            {"shard": shard, "min_id": low, "max_id": high - 1, "count": len(products), **entry}
+        )
+        total += len(products)
+
+    now = timezone.now()
+    referenced = _manifest_files({"shards": shards, "files": files})
+    # Files dropped from the manifest are retired, not deleted: clients and CDN edges holding the
+    # previous manifest can still fetch them. A retired file is pruned on a later build once it
+    # has been retired for prune_grace_seconds, so it always outlives at least one build.
+    retired: dict[str, datetime] = {}
+    for name, value in previous.get("retired", {}).items():
+        retired_at = _retired_at(value)
+        if name in referenced or retired_at is None:
+            continue
+        if not prune or (now - retired_at).total_seconds() < prune_grace_seconds:
+            retired[name] = retired_at
+    for name in _manifest_files(previous) - referenced:
+        retired.setdefault(name, now)
+
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "generated_at": now.isoformat(),
+        "shard_size": shard_size,
+        "effective_prices": with_prices,
+        "products": total,
+        "files": files,
+        "shards": shards,
+        "retired": {name: retired_at.isoformat() for name, retired_at in sorted(retired.items())},
+    }
+    # The manifest is swapped in after every file it lists has been written.
+    temporary = output_dir / f"{MANIFEST_NAME}.tmp"
+    temporary.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(temporary, output_dir / MANIFEST_NAME)
+
+    pruned = 0
+    if prune:
+        # Deletes expired retirees and strays no manifest listed, e.g. from an interrupted build.
+        kept = referenced | set(retired)
+        for path in output_dir.iterdir():
+            if _SNAPSHOT_FILE.match(path.name) and path.name not in kept:
+                path.unlink()
+                pruned += 1
+
+    return SnapshotReport(
+        products=total,
+        shards=len(shards),
+        files_written=writer.written,
+        files_reused=writer.reused,
+        bytes_written=writer.bytes_written,
+        files_pruned=pruned,
+        files_retired=len(retired),
+        seconds=time.perf_counter() - started,
+    )
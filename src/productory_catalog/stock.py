@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from typing import IO, Any
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from productory_catalog.models import Product, StockRecord
+from productory_catalog.services import refresh_product_caches, touch_products
+from productory_core.audit_signals import record_audit_event
+
+STOCK_OK = "ok"
+STOCK_UNKNOWN_SKU = "unknown_sku"
+STOCK_INSUFFICIENT = "insufficient_stock"
+
+
+@dataclass(frozen=True)
+class StockAdjustment:
+    # Exactly one of quantity (absolute) or delta (relative) is set.
+    sku: str
+    quantity: int | None = None
+    delta: int | None = None
+    allow_backorder: bool | None = None
+
+
+@dataclass(frozen=True)
+class StockResult:
+    sku: str
+    status: str
+    quantity: int | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"sku": self.sku, "status": self.status, "quantity": self.quantity}
+
+
+# Per SKU: (absolute base or None, summed delta, allow_backorder or None).
+_Plan = tuple[int | None, int, bool | None]
+
+
+class _ConcurrentChange(Exception):
+    pass
+
+
+def coalesce_adjustments(adjustments: Iterable[StockAdjustment]) -> dict[str, _Plan]:
+    # Repeated SKUs collapse to one write: an absolute value resets the running delta.
+    plans: dict[str, _Plan] = {}
+    for adjustment in adjustments:
+        base, delta, backorder = plans.get(adjustment.sku, (None, 0, None))
+        if adjustment.quantity is not None:
+            base, delta = adjustment.quantity, 0
+        if adjustment.delta is not None:
+            delta += adjustment.delta
+        if adjustment.allow_backorder is not None:
+            backorder = adjustment.allow_backorder
+        plans[adjustment.sku] = (base, delta, backorder)
+    return plans
+
+
+def _chunked(plans: dict[str, _Plan], size: int) -> Iterator[dict[str, _Plan]]:
+    chunk: dict[str, _Plan] = {}
+    for sku, plan in plans.items():
+        chunk[sku] = plan
+        if len(chunk) >= size:
+            yield chunk
+            chunk = {}
+    if chunk:
+        yield chunk
+
+
+def _grouped(pairs: Iterable[tuple[int, Any]]) -> dict[Any, list[int]]:
+    groups: dict[Any, list[int]] = {}
+    for product_id, value in pairs:
+        groups.setdefault(value, []).append(product_id)
+    return groups
+
+
+def _update(plans: dict[int, _Plan], now) -> int:
+    # One UPDATE for the whole chunk: absolute values are literals, deltas are F() arithmetic,
+    # and a row only matches while its current quantity can absorb its decrement. SKUs sharing
+    # a value share one WHEN, which keeps the statement small for typical feeds (-1, -2, ...).
+    targets = _grouped(
+        (product_id, ("set", base + delta) if base is not None else ("add", delta))
+        for product_id, (base, delta, _) in plans.items()
+    )
+    quantity = Case(
+        *[
+            When(
+                product_id__in=product_ids,
+                then=Value(amount) if kind == "set" else F("quantity") + amount,
+            )
+            for (kind, amount), product_ids in targets.items()
+        ],
+        default=F("quantity"),
+        output_field=IntegerField(),
+    )
+    floors = _grouped(
+        (product_id, -delta)
+        for product_id, (base, delta, _) in plans.items()
+        if base is None and delta < 0
+    )
+    floor = Case(
+        *[
+            When(product_id__in=product_ids, then=Value(amount))
+            for amount, product_ids in floors.items()
+        ],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    values: dict[str, Any] = {"quantity": quantity, "updated_at": now}
+    backorders = _grouped(
+        (product_id, backorder)
+        for product_id, (_, _, backorder) in plans.items()
+        if backorder is not None
+    )
+    if backorders:
+        values["allow_backorder"] = Case(
+            *[
+                When(product_id__in=product_ids, then=Value(backorder))
+                for backorder, product_ids in backorders.items()
+            ],
+            default=F("allow_backorder"),
+        )
+    return StockRecord.objects.filter(product_id__in=list(plans), quantity__gte=floor).update(
+        **values
+    )
+
+
+def _apply_chunk(plans: dict[str, _Plan], now) -> tuple[dict[str, StockResult], set[int]]:
+    results: dict[str, StockResult] = {}
+    rows = Product.objects.filter(sku__in=list(plans)).values_list(
+        "sku", "id", "stock_record__quantity"
+    )
+    product_ids: dict[str, int] = {}
+    current: dict[str, int] = {}
+    missing_records: list[int] = []
+    for sku, product_id, quantity in rows:
+        product_ids[sku] = product_id
+        current[sku] = quantity or 0
+        if quantity is None:
+            missing_records.append(product_id)
+
+    planned: dict[int, _Plan] = {}
+    for sku, (base, delta, backorder) in plans.items():
+        if sku not in product_ids:
+            results[sku] = StockResult(sku, STOCK_UNKNOWN_SKU)
+        elif (base if base is not None else current[sku]) + delta < 0:
+            results[sku] = StockResult(sku, STOCK_INSUFFICIENT, current[sku])
+        else:
+            planned[product_ids[sku]] = (base, delta, backorder)
+    if not planned:
+        return results, set()
+
+    applied: set[int] = set(planned)
+    with transaction.atomic():
+        if missing_records:
+            StockRecord.objects.bulk_create(
+                [StockRecord(product_id=product_id) for product_id in missing_records],
+                ignore_conflicts=True,
+            )
+        try:
+            with transaction.atomic():
+                if _update(planned, now) != len(planned):
+                    raise _ConcurrentChange
+        except _ConcurrentChange:
+            # Another writer moved a quantity since it was read; retry row by row so each SKU
+            # gets its own verdict.
+            applied = {
+                product_id
+                for product_id, plan in planned.items()
+                if _update({product_id: plan}, now)
+            }
+        quantities = dict(
+            StockRecord.objects.filter(product_id__in=list(planned)).values_list(
+                "product_id", "quantity"
+            )
+        )
+        # Stock is part of the product detail, so the change feed reports stock moves too.
+        touch_products(applied)
+
+    for sku, product_id in product_ids.items():
+        if product_id in planned:
+            status = STOCK_OK if product_id in applied else STOCK_INSUFFICIENT
+            results[sku] = StockResult(sku, status, quantities.get(product_id))
+    return results, applied
+
+
+def apply_stock_adjustments(
+    adjustments: Iterable[StockAdjustment],
+    *,
+    chunk_size: int = 500,
+    actor=None,
+    source: str = "api",
+) -> list[StockResult]:
+    plans = coalesce_adjustments(adjustments)
+    now = timezone.now()
+    results: dict[str, StockResult] = {}
+    product_ids: list[int] = []
+    for chunk in _chunked(plans, max(int(chunk_size), 1)):
+        chunk_results, applied_ids = _apply_chunk(chunk, now)
+        results.update(chunk_results)
+        product_ids.extend(applied_ids)
+
+    if product_ids:
+        refresh_product_caches(product_ids, search=False)
+        applied = {
+            sku: result.quantity for sku, result in results.items() if result.status == STOCK_OK
+        }
+        # One summary event instead of a pre-read and an audit row per stock record.
+        record_audit_event(
+            model_label="productory_catalog.StockRecord",
+            object_pk="bulk",
+            action="bulk_updated",
+            changes={"source": source, "quantity": applied},
+            actor=actor,
+        )
+    return [results[sku] for sku in plans]
+
+
+def adjustment_from_dict(data: Any) -> StockAdjustment:
+    # Lightweight validation for feed lines, mirroring StockAdjustmentItemSerializer.
+    if not isinstance(data, dict) or not isinstance(data.get("sku"), str) or not data["sku"]:
+        raise ValueError("sku is required.")
+    quantity, delta = data.get("quantity"), data.get("delta")
+    if (quantity is None) == (delta is None):
+        raise ValueError("Set exactly one of quantity or delta.")
+    for value in (quantity, delta):
+        if value is not None and (isinstance(value, bool) or not isinstance(value, int)):
+            raise ValueError("quantity and delta must be integers.")
+    if quantity is not None and quantity < 0:
+        raise ValueError("quantity must be >= 0.")
+    backorder = data.get("allow_backorder")
+    if backorder is not None and not isinstance(backorder, bool):
+        raise ValueError("allow_backorder must be a boolean.")
+    return StockAdjustment(data["sku"], quantity, delta, backorder)
+
+
+@dataclass
+class FeedBatch:
+    adjustments: list[StockAdjustment]
+    errors: list[str]
+    offset: int
+
+
+def read_feed_batches(
+    handle: IO[bytes],
+    *,
+    batch_size: int = 5000,
+    follow: bool = False,
+    poll_interval: float = 1.0,
+) -> Iterator[FeedBatch]:
+    # Yields complete-line batches with the byte offset just past them, so a caller can persist
+    # the offset and resume. With follow=True it keeps polling for appended lines like tail -f;
+    # a trailing line without a newline is held back until it is completed.
+    offset = handle.tell()
+    partial = b""
+    adjustments: list[StockAdjustment] = []
+    errors: list[str] = []
+    while True:
+        line = handle.readline()
+        if line.endswith(b"\n") or (line and not follow):
+            line, partial = partial + line, b""
+            offset += len(line)
+            if line.strip():
+                try:
+                    adjustments.append(adjustment_from_dict(json.loads(line)))
+                except ValueError as exc:
+                    errors.append(f"offset {offset - len(line)}: {exc}")
+            if len(adjustments) >= batch_size:
+                yield FeedBatch(adjustments, errors, offset)
+                adjustments, errors = [], []
+            continue
+        partial += line
+        if adjustments or errors:
+            yield FeedBatch(adjustments, errors, offset)
+            adjustments, errors = [], []
+        if not follow:
+            return
+        time.sleep(poll_interval)
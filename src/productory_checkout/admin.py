@@ -1,51 +1,22 @@
 from __future__ import annotations
 
-import csv
-
 from django.contrib import admin
-from django.http import HttpResponse
 
+from productory_checkout.exports import ORDER_EXPORT, ORDER_ITEM_EXPORT
 from productory_checkout.models import Address, Cart, CartItem, Order, OrderItem
+from productory_core.exports import export_action
 
-
-@admin.action(description="Export orders as CSV")
-def export_orders_csv(modeladmin, request, queryset):
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = 'attachment; filename="orders.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(
-        [
-            "id",
-            "number",
-            "status",
-            "email",
-            "currency",
-            "price_includes_vat",
-            "vat_rate_percent",
-            "subtotal_amount",
-            "discount_amount",
-            "tax_amount",
-            "total_amount",
-        ]
-    )
-    for order in queryset:
-        writer.writerow(
-            [
-                order.id,
-                order.number,
-                order.status,
-                order.email,
-                order.currency,
-                order.price_includes_vat,
-                order.vat_rate_percent,
-                order.subtotal_amount,
-                order.discount_amount,
-                order.tax_amount,
-                order.total_amount,
-            ]
-        )
-    return response
+export_orders_csv = export_action(ORDER_EXPORT, description="Export orders as CSV")
+export_orders_ndjson = export_action(
+    ORDER_EXPORT, description="Export orders as NDJSON", export_format="ndjson"
+)
+export_order_items_csv = export_action(
+    ORDER_ITEM_EXPORT,
+    description="Export order line items as CSV",
+    related_queryset=lambda orders: OrderItem.objects.filter(order__in=orders).order_by(
+        "order_id", "id"
+    ),
+)
 
 
 class CartItemInline(admin.TabularInline):
@@ -99,4 +70,4 @@ class OrderAdmin(admin.ModelAdmin):
     list_filter = ("status", "currency")
     search_fields = ("number", "email", "full_name")
     inlines = [OrderItemInline]
-    actions = [export_orders_csv]
+    actions = [export_orders_csv, export_orders_ndjson, export_order_items_csv]
@@ -1,9 +1,23 @@
 from __future__ import annotations
 
+from django.db.models.manager import BaseManager
 from rest_framework import serializers
 
-from productory_catalog.api.serializers import ProductDetailSerializer, ProductListSerializer
+from productory_catalog.api.serializers import (
+    CachedProductDetailSerializer,
+    CachedProductSummarySerializer,
+    ProductListSerializer,
+)
 from productory_catalog.models import Product
+from productory_checkout.guest_carts import (
+    GuestCart,
+    GuestCartBusy,
+    GuestCartNotFound,
+    get_guest_cart,
+    get_persisted_cart_id,
+    guest_carts_enabled,
+    persist_guest_cart,
+)
 from productory_checkout.models import Address, Cart, CartItem, Order, OrderItem, OrderStatus
 from productory_checkout.services import (
     create_order_from_cart,
@@ -31,12 +45,25 @@ class AddressSerializer(serializers.ModelSerializer):
         read_only_fields = ["created_at", "updated_at"]
 
 
+class CartItemListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # All line products come from the representation cache in one batched lookup.
+        items = list(data.all() if isinstance(data, BaseManager) else data)
+        self.child.fields["product"].prime([item.product for item in items])
+        return super().to_representation(items)
+
+
 class CartItemReadSerializer(serializers.ModelSerializer):
-    product = ProductDetailSerializer(read_only=True)
+    product = CachedProductSummarySerializer(read_only=True)
 
     class Meta:
         model = CartItem
         fields = ["id", "product", "quantity", "unit_price_snapshot", "created_at", "updated_at"]
+        list_serializer_class = CartItemListSerializer
+
+
+class CartItemExpandedReadSerializer(CartItemReadSerializer):
+    product = CachedProductDetailSerializer(read_only=True)
 
 
 class CartItemWriteSerializer(serializers.Serializer):
@@ -65,19 +92,25 @@ class CartListSerializer(serializers.ModelSerializer):
             "price_includes_vat",
             "vat_rate_percent",
             "status",
+            "promotion_code",
             "subtotal_amount",
             "subtotal_excl_vat_amount",
             "subtotal_incl_vat_amount",
             "discount_amount",
+            "applied_rule_type",
+            "applied_rule_id",
             "tax_amount",
             "total_amount",
             "total_excl_vat_amount",
             "total_incl_vat_amount",
+            "item_count",
+            "line_count",
             "created_at",
             "updated_at",
         ]
         read_only_fields = [
             "status",
+            "promotion_code",
             "currency",
             "price_includes_vat",
             "vat_rate_percent",
@@ -85,10 +118,14 @@ class CartListSerializer(serializers.ModelSerializer):
             "subtotal_excl_vat_amount",
             "subtotal_incl_vat_amount",
             "discount_amount",
+            "applied_rule_type",
+            "applied_rule_id",
             "tax_amount",
             "total_amount",
             "total_excl_vat_amount",
             "total_incl_vat_amount",
+            "item_count",
+            "line_count",
         ]
 
 
@@ -99,6 +136,71 @@ class CartDetailSerializer(CartListSerializer):
         fields = CartListSerializer.Meta.fields + ["items"]
 
 
+class CartExpandedDetailSerializer(CartDetailSerializer):
+    items = CartItemExpandedReadSerializer(many=True, read_only=True)
+
+
+class PromotionCodeSerializer(serializers.Serializer):
+    code = serializers.CharField(max_length=64)
+
+
+class GuestCartSerializer(serializers.Serializer):
+    token = serializers.CharField(read_only=True)
+    email = serializers.EmailField(required=False, allow_blank=True, default="")
+    currency = serializers.CharField(read_only=True)
+    price_includes_vat = serializers.BooleanField(read_only=True)
+    vat_rate_percent = serializers.DecimalField(max_digits=5, decimal_places=2, read_only=True)
+    status = serializers.SerializerMethodField()
+    subtotal_amount = serializers.DecimalField(
+        max_digits=10, decimal_places=2, read_only=True, source="totals.subtotal_amount"
+    )
+    subtotal_excl_vat_amount = serializers.DecimalField(
+        max_digits=10, decimal_places=2, read_only=True, source="totals.subtotal_excl_vat_amount"
+    )
+    subtotal_incl_vat_amount = serializers.DecimalField(
+        max_digits=10, decimal_places=2, read_only=True, source="totals.subtotal_incl_vat_amount"
+    )
+    discount_amount = serializers.DecimalField(
+        max_digits=10, decimal_places=2, read_only=True, source="totals.discount_amount"
+    )
+    tax_amount = serializers.DecimalField(
+        max_digits=10, decimal_places=2, read_only=True, source="totals.tax_amount"
+    )
+    total_amount = serializers.DecimalField(
+        max_digits=10, decimal_places=2, read_only=True, source="totals.total_amount"
+    )
+    total_excl_vat_amount = serializers.DecimalField(
+        max_digits=10, decimal_places=2, read_only=True, source="totals.total_excl_vat_amount"
+    )
+    total_incl_vat_amount = serializers.DecimalField(
+        max_digits=10, decimal_places=2, read_only=True, source="totals.total_incl_vat_amount"
+    )
+    item_count = serializers.IntegerField(read_only=True, source="totals.item_count")
+    line_count = serializers.IntegerField(read_only=True, source="totals.line_count")
+    items = serializers.SerializerMethodField()
+
+    def get_status(self, obj: GuestCart) -> str:
+        return "open"
+
+    def get_items(self, obj: GuestCart) -> list[dict]:
+        return [
+            {
+                "product_id": product_id,
+                "quantity": quantity,
+                "unit_price_snapshot": str(unit_price),
+            }
+            for product_id, quantity, unit_price in obj.lines()
+        ]
+
+
+class GuestCartItemWriteSerializer(serializers.Serializer):
+    product_id = serializers.PrimaryKeyRelatedField(
+        queryset=Product.objects.all(),
+        source="product",
+    )
+    quantity = serializers.IntegerField(min_value=0)
+
+
 class OrderItemReadSerializer(serializers.ModelSerializer):
     product = ProductListSerializer(read_only=True)
 
@@ -131,6 +233,8 @@ class OrderListSerializer(serializers.ModelSerializer):
             "subtotal_excl_vat_amount",
             "subtotal_incl_vat_amount",
             "discount_amount",
+            "applied_rule_type",
+            "applied_rule_id",
             "tax_amount",
             "total_amount",
             "total_excl_vat_amount",
@@ -148,7 +252,12 @@ class OrderDetailSerializer(OrderListSerializer):
 
 
 class CheckoutSerializer(serializers.Serializer):
-    cart_id = serializers.PrimaryKeyRelatedField(queryset=Cart.objects.all(), source="cart")
+    cart_id = serializers.PrimaryKeyRelatedField(
+        queryset=Cart.objects.all(),
+        source="cart",
+        required=False,
+    )
+    guest_cart_token = serializers.CharField(required=False, max_length=128)
     email = serializers.EmailField(required=False, allow_blank=True)
     full_name = serializers.CharField(required=False, allow_blank=True, max_length=255)
     shipping_address_id = serializers.PrimaryKeyRelatedField(
@@ -164,9 +273,44 @@ class CheckoutSerializer(serializers.Serializer):
         allow_null=True,
     )
 
+    def validate_guest_cart_token(self, value: str) -> str:
+        if not guest_carts_enabled():
+            raise serializers.ValidationError("Guest cart storage is not enabled.")
+        if get_persisted_cart_id(value) is None:
+            try:
+                get_guest_cart(value)
+            except GuestCartNotFound as exc:
+                raise serializers.ValidationError("Unknown or expired guest cart.") from exc
+        return value
+
+    def validate(self, attrs):
+        if ("cart" in attrs) == ("guest_cart_token" in attrs):
+            raise serializers.ValidationError(
+                "Provide exactly one of `cart_id` or `guest_cart_token`."
+            )
+        return attrs
+
     def create(self, validated_data):
+        cart = validated_data.get("cart")
+        if cart is None:
+            request = self.context.get("request")
+            user = getattr(request, "user", None)
+            try:
+                cart = persist_guest_cart(
+                    validated_data["guest_cart_token"],
+                    customer=user if getattr(user, "is_authenticated", False) else None,
+                    email=validated_data.get("email", ""),
+                )
+            except GuestCartNotFound as exc:
+                raise serializers.ValidationError(
+                    {"guest_cart_token": "Unknown or expired guest cart."}
+                ) from exc
+            except GuestCartBusy as exc:
+                raise serializers.ValidationError(
+                    {"guest_cart_token": "Guest cart is busy; retry."}
+                ) from exc
         return create_order_from_cart(
-            cart=validated_data["cart"],
+            cart=cart,
             email=validated_data.get("email", ""),
             full_name=validated_data.get("full_name", ""),
             shipping_address_id=getattr(validated_data.get("shipping_address"), "id", None),
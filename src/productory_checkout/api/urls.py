@@ -5,6 +5,7 @@ from productory_checkout.api.views import (
     CartItemViewSet,
     CartViewSet,
     CheckoutViewSet,
+    GuestCartViewSet,
     OrderViewSet,
 )
 
@@ -12,6 +13,7 @@ router = DefaultRouter()
 router.register("addresses", AddressViewSet, basename="productory-address")
 router.register("carts", CartViewSet, basename="productory-cart")
 router.register("cart-items", CartItemViewSet, basename="productory-cart-item")
+router.register("guest-carts", GuestCartViewSet, basename="productory-guest-cart")
 router.register("checkout", CheckoutViewSet, basename="productory-checkout")
 router.register("orders", OrderViewSet, basename="productory-order")
 
@@ -1,22 +1,43 @@
 from __future__ import annotations
 
+from django.db.models import Prefetch
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
+from productory_catalog.models import Product
 from productory_checkout.api.serializers import (
     AddressSerializer,
     CartDetailSerializer,
+    CartExpandedDetailSerializer,
     CartItemWriteSerializer,
     CartListSerializer,
     CheckoutSerializer,
+    GuestCartItemWriteSerializer,
+    GuestCartSerializer,
     OrderDetailSerializer,
     OrderListSerializer,
     OrderStatusTransitionSerializer,
+    PromotionCodeSerializer,
+)
+from productory_checkout.guest_carts import (
+    GUEST_CART_SESSION_KEY,
+    GuestCartBusy,
+    GuestCartNotFound,
+    create_guest_cart,
+    get_guest_cart,
+    guest_carts_enabled,
+    set_guest_cart_item,
 )
 from productory_checkout.models import Address, Cart, CartItem, Order
+from productory_checkout.services import apply_promotion_code, recompute_cart_totals
+
+
+def _expand_values(request) -> set[str]:
+    raw = request.query_params.get("expand", "") if request is not None else ""
+    return {value.strip() for value in raw.split(",") if value.strip()}
 
 
 class AddressViewSet(viewsets.ModelViewSet):
@@ -26,20 +47,100 @@ class AddressViewSet(viewsets.ModelViewSet):
 
 
 class CartViewSet(viewsets.ModelViewSet):
-    queryset = Cart.objects.prefetch_related("items__product")
+    queryset = Cart.objects.all()
     permission_classes = [AllowAny]
 
+    def _expand_product(self) -> bool:
+        return "product" in _expand_values(self.request)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "list":
+            return queryset
+        # Cart, items and product ids in a fixed three queries; line products are rendered
+        # from the representation cache, which loads only the misses.
+        return queryset.prefetch_related(
+            Prefetch("items", queryset=CartItem.objects.order_by("id")),
+            Prefetch("items__product", queryset=Product.objects.only("id")),
+        )
+
     def get_serializer_class(self):
         if self.action == "list":
             return CartListSerializer
+        if self._expand_product():
+            return CartExpandedDetailSerializer
         return CartDetailSerializer
 
+    @action(detail=True, methods=["post", "delete"], url_path="promotion-code")
+    def promotion_code(self, request, pk=None):
+        cart = self.get_object()
+        code = ""
+        if request.method == "POST":
+            serializer = PromotionCodeSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            code = serializer.validated_data["code"]
+        try:
+            apply_promotion_code(cart, code)
+        except ValueError as exc:
+            raise ValidationError({"code": str(exc)}) from exc
+        return Response(CartDetailSerializer(self.get_object()).data)
+
 
 class CartItemViewSet(mixins.CreateModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet):
-    queryset = CartItem.objects.all()
+    queryset = CartItem.objects.select_related("cart")
     serializer_class = CartItemWriteSerializer
     permission_classes = [AllowAny]
 
+    def perform_destroy(self, instance):
+        cart = instance.cart
+        instance.delete()
+        recompute_cart_totals(cart)
+
+
+class GuestCartViewSet(viewsets.ViewSet):
+    permission_classes = [AllowAny]
+    lookup_field = "token"
+    lookup_value_regex = r"[0-9a-f]+\.[A-Za-z0-9_-]+"
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not guest_carts_enabled():
+            raise NotFound("Guest cart storage is not enabled.")
+
+    def _get_cart(self, token: str):
+        try:
+            return get_guest_cart(token)
+        except GuestCartNotFound as exc:
+            raise NotFound("Unknown or expired guest cart.") from exc
+
+    def create(self, request):
+        serializer = GuestCartSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cart = create_guest_cart(email=serializer.validated_data.get("email", ""))
+        session = getattr(request, "session", None)
+        if session is not None:
+            session[GUEST_CART_SESSION_KEY] = cart.token
+        return Response(GuestCartSerializer(cart).data, status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, token=None):
+        return Response(GuestCartSerializer(self._get_cart(token)).data)
+
+    @action(detail=True, methods=["post"])
+    def items(self, request, token=None):
+        serializer = GuestCartItemWriteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            cart = set_guest_cart_item(
+                token,
+                serializer.validated_data["product"].id,
+                serializer.validated_data["quantity"],
+            )
+        except GuestCartNotFound as exc:
+            raise NotFound("Unknown or expired guest cart.") from exc
+        except GuestCartBusy as exc:
+            raise ValidationError({"detail": "Guest cart is busy; retry."}) from exc
+        return Response(GuestCartSerializer(cart).data)
+
 
 class CheckoutViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
     serializer_class = CheckoutSerializer
@@ -48,7 +149,10 @@ class CheckoutViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        order = serializer.save()
+        try:
+            order = serializer.save()
+        except ValueError as exc:
+            raise ValidationError({"detail": str(exc)}) from exc
         read_serializer = OrderDetailSerializer(order)
         return Response(read_serializer.data, status=status.HTTP_201_CREATED)
 
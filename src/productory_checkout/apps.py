@@ -5,3 +5,6 @@ class ProductoryCheckoutConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "productory_checkout"
     verbose_name = "Productory Checkout"
+
+    def ready(self):
+        from productory_checkout import signals  # noqa: F401
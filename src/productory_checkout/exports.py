@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from productory_checkout.models import Order, OrderItem
+from productory_core.exports import ExportSpec
+
+ORDER_EXPORT = ExportSpec(
+    name="orders",
+    columns=(
+        ("id", "id"),
+        ("number", "number"),
+        ("status", "status"),
+        ("email", "email"),
+        ("currency", "currency"),
+        ("price_includes_vat", "price_includes_vat"),
+        ("vat_rate_percent", "vat_rate_percent"),
+        ("subtotal_amount", "subtotal_amount"),
+        ("discount_amount", "discount_amount"),
+        ("tax_amount", "tax_amount"),
+        ("total_amount", "total_amount"),
+    ),
+    base_queryset=Order.objects.all,
+)
+
+ORDER_ITEM_EXPORT = ExportSpec(
+    name="order-items",
+    columns=(
+        ("order_id", "order_id"),
+        ("order_number", "order__number"),
+        ("order_status", "order__status"),
+        ("order_created_at", "order__created_at"),
+        ("currency", "order__currency"),
+        ("item_id", "id"),
+        ("product_id", "product_id"),
+        ("sku", "sku_snapshot"),
+        ("product_name", "product_name_snapshot"),
+        ("quantity", "quantity"),
+        ("unit_price", "unit_price_snapshot"),
+        ("line_total", "line_total"),
+    ),
+    base_queryset=lambda: OrderItem.objects.order_by("order_id", "id"),
+)
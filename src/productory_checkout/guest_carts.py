@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import secrets
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.db import transaction
+
+from productory_catalog.models import Product
+from productory_checkout.models import Cart, CartItem
+from productory_checkout.services import CartTotals, compute_line_totals, recompute_cart_totals
+from productory_core.conf import get_setting
+from productory_core.store import get_store_pricing_policy
+
+GUEST_CART_SESSION_KEY = "productory_guest_cart_token"
+CART_SESSION_KEY = "productory_cart_id"
+
+_KEY_PREFIX = "productory:guest-cart:v1"
+_SEQUENCE_KEY = f"{_KEY_PREFIX}:seq"
+_LOW_WATER_KEY = f"{_KEY_PREFIX}:low-water"
+_FLUSH_BATCH_SIZE = 500
+# A lock outlives its holder only if the process dies; waiters give up well before that.
+_LOCK_TIMEOUT_SECONDS = 30
+_LOCK_WAIT_SECONDS = 5.0
+_LOCK_POLL_SECONDS = 0.02
+
+
+@dataclass
+class GuestCart:
+    token: str
+    email: str
+    currency: str
+    price_includes_vat: bool
+    vat_rate_percent: Decimal
+    totals: CartTotals
+    quantities: dict[int, int] = field(default_factory=dict)
+    unit_prices: dict[int, Decimal] = field(default_factory=dict)
+    created_at: float = 0.0
+    touched_at: float = 0.0
+
+    def lines(self) -> list[tuple[int, int, Decimal]]:
+        return [
+            (product_id, quantity, self.unit_prices[product_id])
+            for product_id, quantity in sorted(self.quantities.items())
+        ]
+
+
+class GuestCartNotFound(LookupError):
+    pass
+
+
+class GuestCartBusy(RuntimeError):
+    pass
+
+
+def guest_carts_enabled() -> bool:
+    return str(get_setting("CART_STORAGE", "db")).lower() == "cache"
+
+
+def _cache():
+    return caches[get_setting("GUEST_CART_CACHE_ALIAS", "default")]
+
+
+def _ttl_seconds() -> int:
+    return int(get_setting("GUEST_CART_TTL_SECONDS", 604800))
+
+
+def _cart_key(token: str) -> str:
+    return f"{_KEY_PREFIX}:cart:{token}"
+
+
+def _slot_key(slot: int) -> str:
+    return f"{_KEY_PREFIX}:slot:{slot}"
+
+
+def _next_slot() -> int:
+    cache = _cache()
+    try:
+        return int(cache.incr(_SEQUENCE_KEY))
+    except ValueError:
+        # Missing or evicted: restart above the flusher's low-water mark, never below it, or
+        # new slots would be skipped by every later flush.
+        cache.add(_SEQUENCE_KEY, int(cache.get(_LOW_WATER_KEY) or 0), timeout=None)
+        return int(cache.incr(_SEQUENCE_KEY))
+
+
+def _lock_key(token: str) -> str:
+    return f"{_KEY_PREFIX}:lock:{token}"
+
+
+def _acquire_lock(token: str) -> str:
+    cache = _cache()
+    owner = secrets.token_hex(8)
+    deadline = time.monotonic() + _LOCK_WAIT_SECONDS
+    while not cache.add(_lock_key(token), owner, timeout=_LOCK_TIMEOUT_SECONDS):
+        if time.monotonic() >= deadline:
+            raise GuestCartBusy(token)
+        time.sleep(_LOCK_POLL_SECONDS)
+    return owner
+
+
+def _release_lock(token: str, owner: str) -> None:
+    # Only the holder releases; an expired lock may already belong to someone else.
+    cache = _cache()
+    if cache.get(_lock_key(token)) == owner:
+        cache.delete(_lock_key(token))
+
+
+@contextmanager
+def _locked(token: str) -> Iterator[None]:
+    owner = _acquire_lock(token)
+    try:
+        yield
+    finally:
+        _release_lock(token, owner)
+
+
+def _store(cart: GuestCart) -> GuestCart:
+    _cache().set(_cart_key(cart.token), cart, timeout=_ttl_seconds())
+    return cart
+
+
+def create_guest_cart(*, email: str = "") -> GuestCart:
+    policy = get_store_pricing_policy()
+    slot = _next_slot()
+    token = f"{slot:x}.{secrets.token_urlsafe(16)}"
+    now = time.time()
+    cart = GuestCart(
+        token=token,
+        email=email,
+        currency=policy.currency_code,
+        price_includes_vat=policy.price_includes_vat,
+        vat_rate_percent=policy.vat_rate_percent,
+        totals=compute_line_totals(
+            [],
+            vat_rate_percent=policy.vat_rate_percent,
+            price_includes_vat=policy.price_includes_vat,
+        ),
+        created_at=now,
+        touched_at=now,
+    )
+    # The slot lets the idle flusher enumerate carts without scanning the cache keyspace.
+    _cache().set(_slot_key(slot), token, timeout=_ttl_seconds())
+    return _store(cart)
+
+
+def get_guest_cart(token: str) -> GuestCart:
+    cached = _cache().get(_cart_key(token))
+    if not isinstance(cached, GuestCart):
+        raise GuestCartNotFound(token)
+    return cached
+
+
+def set_guest_cart_item(token: str, product_id: int, quantity: int) -> GuestCart:
+    # Read-modify-write of the cached cart; the lock keeps concurrent adds from losing lines.
+    with _locked(token):
+        return _set_item(token, product_id, quantity)
+
+
+def _set_item(token: str, product_id: int, quantity: int) -> GuestCart:
+    cart = get_guest_cart(token)
+    if quantity > 0:
+        cart.quantities[product_id] = quantity
+    else:
+        cart.quantities.pop(product_id, None)
+
+    # Re-snapshot unit prices for every line, mirroring recompute_cart_totals.
+    prices = dict(
+        Product.objects.filter(id__in=cart.quantities.keys()).values_list("id", "price_amount")
+    )
+    cart.quantities = {pid: qty for pid, qty in cart.quantities.items() if pid in prices}
+    cart.unit_prices = {pid: prices[pid] for pid in cart.quantities}
+    cart.totals = compute_line_totals(
+        cart.lines(),
+        vat_rate_percent=cart.vat_rate_percent,
+        price_includes_vat=cart.price_includes_vat,
+    )
+    cart.touched_at = time.time()
+    return _store(cart)
+
+
+def persist_guest_cart(token: str, *, customer=None, email: str = "") -> Cart:
+    # The token stays locked until the "already persisted" pointer is published after commit,
+    # so a login racing a checkout (or a double submit) cannot persist the cart twice. If an
+    # enclosing transaction rolls back, the lock simply expires.
+    owner = _acquire_lock(token)
+    try:
+        with transaction.atomic():
+            cart = _persist(token, customer, email)
+
+            def publish() -> None:
+                _cache().set(_cart_key(token), cart.pk, timeout=_ttl_seconds())
+                _release_lock(token, owner)
+
+            transaction.on_commit(publish)
+    except BaseException:
+        _release_lock(token, owner)
+        raise
+    return cart
+
+
+def _persist(token: str, customer, email: str) -> Cart:
+    cached = _cache().get(_cart_key(token))
+    if isinstance(cached, int):
+        # Already persisted (double submit, login followed by checkout, ...).
+        cart = Cart.objects.get(pk=cached)
+        if customer is not None and cart.customer_id is None:
+            cart.customer = customer
+            cart.save(update_fields=["customer", "updated_at"])
+        return cart
+    if not isinstance(cached, GuestCart):
+        raise GuestCartNotFound(token)
+
+    cart = Cart.objects.create(
+        customer=customer,
+        email=email or cached.email or getattr(customer, "email", "") or "",
+    )
+    CartItem.objects.bulk_create(
+        [
+            CartItem(
+                cart=cart,
+                product_id=product_id,
+                quantity=quantity,
+                unit_price_snapshot=unit_price,
+            )
+            for product_id, quantity, unit_price in cached.lines()
+        ]
+    )
+    recompute_cart_totals(cart)
+    return cart
+
+
+def get_persisted_cart_id(token: str) -> int | None:
+    cached = _cache().get(_cart_key(token))
+    return cached if isinstance(cached, int) else None
+
+
+def _flush_cart(token: str, cached: GuestCart, cutoff: float) -> tuple[bool, bool]:
+    # Returns (flushed, persisted).
+    if cached.quantities:
+        persist_guest_cart(token)
+        return True, True
+    # Empty idle carts (typically bots) are dropped instead of persisted, under the lock so an
+    # item added meanwhile is not lost with them.
+    with _locked(token):
+        current = _cache().get(_cart_key(token))
+        if not isinstance(current, GuestCart):
+            return True, False
+        if current.quantities or current.touched_at > cutoff:
+            return False, False
+        _cache().delete(_cart_key(token))
+    return True, False
+
+
+def flush_idle_guest_carts(*, idle_seconds: int | None = None) -> int:
+    cache = _cache()
+    if idle_seconds is None:
+        idle_seconds = int(get_setting("GUEST_CART_IDLE_SECONDS", 1800))
+    cutoff = time.time() - idle_seconds
+    high_water = int(cache.get(_SEQUENCE_KEY) or 0)
+    low_water = int(cache.get(_LOW_WATER_KEY) or 0)
+
+    persisted = 0
+    can_advance = True
+    slot = low_water + 1
+    while slot <= high_water:
+        batch = range(slot, min(slot + _FLUSH_BATCH_SIZE, high_water + 1))
+        tokens = cache.get_many([_slot_key(value) for value in batch])
+        carts = cache.get_many([_cart_key(token) for token in tokens.values()])
+        for value in batch:
+            token = tokens.get(_slot_key(value))
+            cached = carts.get(_cart_key(token)) if token else None
+            if isinstance(cached, GuestCart):
+                flushed = False
+                if cached.touched_at <= cutoff:
+                    try:
+                        flushed, was_persisted = _flush_cart(token, cached, cutoff)
+                    except GuestCartBusy:
+                        # A shopper holds the cart; leave the slot for a later run.
+                        flushed = was_persisted = False
+                    persisted += was_persisted
+                if flushed:
+                    cache.delete(_slot_key(value))
+                else:
+                    can_advance = False
+            elif token:
+                cache.delete(_slot_key(value))
+            if can_advance:
+                low_water = value
+        slot = batch.stop
+
+    cache.set(_LOW_WATER_KEY, low_water, timeout=None)
+    return persisted
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from productory_checkout.models import Cart
+from productory_checkout.services import refresh_cart_aggregates
+
+
+class Command(BaseCommand):
+    help = "Populate item_count, line_count and pricing_fingerprint on existing carts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of carts refreshed per batch.",
+        )
+        parser.add_argument(
+            "--status",
+            default="",
+            help="Only refresh carts with this status (default: all carts).",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = max(int(options["chunk_size"]), 1)
+        queryset = Cart.objects.order_by("id")
+        if options["status"]:
+            queryset = queryset.filter(status=options["status"])
+
+        refreshed = 0
+        chunk: list[int] = []
+        for cart_id in queryset.values_list("id", flat=True).iterator(chunk_size=chunk_size):
+            chunk.append(cart_id)
+            if len(chunk) >= chunk_size:
+                refreshed += refresh_cart_aggregates(chunk)
+                chunk = []
+        if chunk:
+            refreshed += refresh_cart_aggregates(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f"Refreshed aggregates for {refreshed} carts."))
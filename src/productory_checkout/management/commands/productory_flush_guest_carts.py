@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from productory_checkout.guest_carts import flush_idle_guest_carts, guest_carts_enabled
+
+
+class Command(BaseCommand):
+    help = "Persist idle cache-backed guest carts to the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--idle-seconds",
+            type=int,
+            default=None,
+            help="Override PRODUCTORY['GUEST_CART_IDLE_SECONDS'].",
+        )
+
+    def handle(self, *args, **options):
+        if not guest_carts_enabled():
+            raise CommandError("PRODUCTORY['CART_STORAGE'] is not set to 'cache'.")
+
+        persisted = flush_idle_guest_carts(idle_seconds=options["idle_seconds"])
+        self.stdout.write(self.style.SUCCESS(f"Persisted {persisted} idle guest carts."))
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from productory_checkout.repricing import reprice_open_carts
+
+
+class Command(BaseCommand):
+    help = "Reprice open carts after product price, promotion or VAT changes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--product",
+            dest="product_ids",
+            action="append",
+            type=int,
+            default=[],
+            help="Reprice carts containing this product id (repeatable).",
+        )
+        parser.add_argument(
+            "--promotion",
+            dest="promotion_ids",
+            action="append",
+            type=int,
+            default=[],
+            help="Reprice carts affected by this promotion id (repeatable).",
+        )
+        parser.add_argument(
+            "--bundle",
+            dest="bundle_ids",
+            action="append",
+            type=int,
+            default=[],
+            help="Reprice carts affected by this bundle id (repeatable).",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Reprice every open cart.",
+        )
+        parser.add_argument(
+            "--refresh-tax-policy",
+            action="store_true",
+            help="Apply the current store VAT policy to the repriced carts.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of carts repriced per batch.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=0,
+            help="Fan chunks out to this many worker processes.",
+        )
+
+    def handle(self, *args, **options):
+        selected = set(options["product_ids"])
+        product_ids: set[int] | None = selected
+        if options["all"]:
+            product_ids = None
+        elif options["promotion_ids"] or options["bundle_ids"]:
+            from productory_promotions.services import rule_product_ids
+
+            rule_products = rule_product_ids(
+                promotion_ids=options["promotion_ids"], bundle_ids=options["bundle_ids"]
+            )
+            product_ids = None if rule_products is None else selected | rule_products
+        elif not selected:
+            raise CommandError("Pass --product, --promotion, --bundle or --all.")
+
+        report = reprice_open_carts(
+            product_ids=product_ids,
+            refresh_tax_policy=options["refresh_tax_policy"],
+            chunk_size=options["chunk_size"],
+            workers=options["workers"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Repriced {report.carts_scanned} carts ({report.carts_updated} changed, "
+                f"{report.items_updated} items) in {report.seconds:.2f}s "
+                f"({report.carts_per_second:.0f} carts/s)."
+            )
+        )
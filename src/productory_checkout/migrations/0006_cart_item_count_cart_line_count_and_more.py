@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productory_checkout', '0005_alter_cart_currency_alter_order_currency_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='line_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='pricing_fingerprint',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['created_at', 'status', 'item_count', 'total_amount'], name='prod_cart_kpi_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productory_checkout', '0006_cart_item_count_cart_line_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='promotion_code',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productory_checkout', '0007_cart_promotion_code'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='applied_rule_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='applied_rule_type',
+            field=models.CharField(blank=True, choices=[('', 'None'), ('promotion', 'Promotion'), ('bundle', 'Bundle'), ('combined', 'Combined allocation')], default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='applied_rule_components',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='applied_rule_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='applied_rule_type',
+            field=models.CharField(blank=True, choices=[('', 'None'), ('promotion', 'Promotion'), ('bundle', 'Bundle'), ('combined', 'Combined allocation')], default='', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['applied_rule_type', 'applied_rule_id'], name='prod_cart_rule_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['applied_rule_type', 'applied_rule_id', 'created_at'], name='prod_order_rule_idx'),
+        ),
+        migrations.CreateModel(
+            name='OrderRuleComponent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rule_type', models.CharField(choices=[('', 'None'), ('promotion', 'Promotion'), ('bundle', 'Bundle'), ('combined', 'Combined allocation')], max_length=20)),
+                ('rule_id', models.PositiveBigIntegerField()),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rule_components', to='productory_checkout.order')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['rule_type', 'rule_id'], name='prod_order_rule_comp_idx')],
+                'constraints': [models.UniqueConstraint(fields=('order', 'rule_type', 'rule_id'), name='prod_order_rule_component_uniq')],
+            },
+        ),
+    ]
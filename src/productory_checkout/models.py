@@ -22,6 +22,13 @@ class CartStatus(models.TextChoices):
     ABANDONED = "abandoned", "Abandoned"
 
 
+class AppliedRuleType(models.TextChoices):
+    NONE = "", "None"
+    PROMOTION = "promotion", "Promotion"
+    BUNDLE = "bundle", "Bundle"
+    COMBINED = "combined", "Combined allocation"
+
+
 class OrderStatus(models.TextChoices):
     DRAFT = "draft", "Draft"
     SUBMITTED = "submitted", "Submitted"
@@ -66,6 +73,7 @@ class Cart(TimeStampedModel):
         validators=[MinValueValidator(Decimal("0.00"))],
     )
     status = models.CharField(max_length=20, choices=CartStatus.choices, default=CartStatus.OPEN)
+    promotion_code = models.CharField(max_length=64, blank=True)
     subtotal_amount = models.DecimalField(
         max_digits=10,
         decimal_places=2,
@@ -90,6 +98,11 @@ class Cart(TimeStampedModel):
         default=Decimal("0.00"),
         validators=[MinValueValidator(Decimal("0.00"))],
     )
+    applied_rule_type = models.CharField(
+        max_length=20, choices=AppliedRuleType.choices, default=AppliedRuleType.NONE, blank=True
+    )
+    applied_rule_id = models.PositiveBigIntegerField(null=True, blank=True)
+    applied_rule_components = models.JSONField(default=list, blank=True)
     tax_amount = models.DecimalField(
         max_digits=10,
         decimal_places=2,
@@ -114,9 +127,21 @@ class Cart(TimeStampedModel):
         default=Decimal("0.00"),
         validators=[MinValueValidator(Decimal("0.00"))],
     )
+    item_count = models.PositiveIntegerField(default=0)
+    line_count = models.PositiveIntegerField(default=0)
+    pricing_fingerprint = models.CharField(max_length=64, blank=True)
 
     class Meta:
-        indexes = [models.Index(fields=["status", "-updated_at"], name="prod_cart_status_upd_idx")]
+        indexes = [
+            models.Index(fields=["status", "-updated_at"], name="prod_cart_status_upd_idx"),
+            models.Index(
+                fields=["created_at", "status", "item_count", "total_amount"],
+                name="prod_cart_kpi_idx",
+            ),
+            models.Index(
+                fields=["applied_rule_type", "applied_rule_id"], name="prod_cart_rule_idx"
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"Cart #{self.pk}"
@@ -207,6 +232,10 @@ class Order(TimeStampedModel):
         default=Decimal("0.00"),
         validators=[MinValueValidator(Decimal("0.00"))],
     )
+    applied_rule_type = models.CharField(
+        max_length=20, choices=AppliedRuleType.choices, default=AppliedRuleType.NONE, blank=True
+    )
+    applied_rule_id = models.PositiveBigIntegerField(null=True, blank=True)
     tax_amount = models.DecimalField(
         max_digits=10,
         decimal_places=2,
@@ -248,7 +277,13 @@ class Order(TimeStampedModel):
 
     class Meta:
         ordering = ["-created_at"]
-        indexes = [models.Index(fields=["status", "-created_at"], name="prod_order_status_cre_idx")]
+        indexes = [
+            models.Index(fields=["status", "-created_at"], name="prod_order_status_cre_idx"),
+            models.Index(
+                fields=["applied_rule_type", "applied_rule_id", "created_at"],
+                name="prod_order_rule_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"Order #{self.number}"
@@ -258,6 +293,23 @@ class Order(TimeStampedModel):
         return super().save(*args, **kwargs)
 
 
+class OrderRuleComponent(models.Model):
+    # One row per rule taking part in a combined allocation, so reports can group by rule in SQL.
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="rule_components")
+    rule_type = models.CharField(max_length=20, choices=AppliedRuleType.choices)
+    rule_id = models.PositiveBigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["order", "rule_type", "rule_id"], name="prod_order_rule_component_uniq"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["rule_type", "rule_id"], name="prod_order_rule_comp_idx"),
+        ]
+
+
 class OrderItem(TimeStampedModel):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
     product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True)
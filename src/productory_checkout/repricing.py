@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from productory_checkout.models import Cart, CartItem, CartStatus
+from productory_checkout.services import _CART_TOTAL_FIELDS, compute_line_totals
+from productory_core.conf import get_setting
+from productory_core.store import get_store_pricing_policy
+from productory_core.workers import process_pool
+
+_CART_UPDATE_FIELDS = ["price_includes_vat", "vat_rate_percent", *_CART_TOTAL_FIELDS, "updated_at"]
+
+
+@dataclass(frozen=True)
+class RepricingReport:
+    carts_scanned: int
+    carts_updated: int
+    items_updated: int
+    seconds: float
+
+    @property
+    def carts_per_second(self) -> float:
+        if self.seconds <= 0:
+            return float(self.carts_scanned)
+        return self.carts_scanned / self.seconds
+
+
+def open_cart_ids(*, product_ids: Iterable[int] | None = None) -> Iterator[int]:
+    queryset = Cart.objects.filter(status=CartStatus.OPEN)
+    if product_ids is not None:
+        queryset = queryset.filter(
+            id__in=CartItem.objects.filter(product_id__in=list(product_ids)).values("cart_id")
+        )
+    return queryset.order_by("id").values_list("id", flat=True).iterator(chunk_size=2000)
+
+
+def _chunked(ids: Iterable[int], size: int) -> Iterator[list[int]]:
+    chunk: list[int] = []
+    for value in ids:
+        chunk.append(value)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _resolve_promotions(
+    lines_per_cart: Sequence[list[tuple[int, int, Decimal]]], promotion_codes: Sequence[str]
+) -> list | None:
+    if not get_setting("ENABLE_PROMOTIONS", True):
+        return None
+    try:
+        from productory_promotions.services import resolve_many
+    except ImportError:
+        return None
+    return resolve_many(lines_per_cart, promotion_codes=promotion_codes)
+
+
+@transaction.atomic
+def reprice_cart_chunk(
+    cart_ids: Sequence[int], *, refresh_tax_policy: bool = False
+) -> tuple[int, int]:
+    carts = list(
+        Cart.objects.select_for_update()
+        .filter(id__in=list(cart_ids), status=CartStatus.OPEN)
+        .order_by("id")
+        .only("id", "price_includes_vat", "vat_rate_percent", "promotion_code", *_CART_TOTAL_FIELDS)
+    )
+    if not carts:
+        return 0, 0
+
+    now = timezone.now()
+    lines_by_cart: dict[int, list[tuple[int, int, Decimal]]] = {cart.id: [] for cart in carts}
+    stale_items: list[CartItem] = []
+    item_rows = CartItem.objects.filter(cart_id__in=lines_by_cart.keys()).values_list(
+        "id", "cart_id", "product_id", "quantity", "unit_price_snapshot", "product__price_amount"
+    )
+    for item_id, cart_id, product_id, quantity, snapshot, price_amount in item_rows:
+        lines_by_cart[cart_id].append((product_id, quantity, price_amount))
+        if snapshot != price_amount:
+            stale_items.append(
+                CartItem(id=item_id, unit_price_snapshot=price_amount, updated_at=now)
+            )
+
+    if refresh_tax_policy:
+        policy = get_store_pricing_policy()
+        for cart in carts:
+            cart.price_includes_vat = policy.price_includes_vat
+            cart.vat_rate_percent = policy.vat_rate_percent
+
+    lines_per_cart = [lines_by_cart[cart.id] for cart in carts]
+    resolutions = _resolve_promotions(lines_per_cart, [cart.promotion_code for cart in carts])
+
+    changed_carts: list[Cart] = []
+    for index, cart in enumerate(carts):
+        totals = compute_line_totals(
+            lines_per_cart[index],
+            vat_rate_percent=cart.vat_rate_percent,
+            price_includes_vat=cart.price_includes_vat,
+            promotion_code=cart.promotion_code,
+            pricing=resolutions[index] if resolutions is not None else None,
+        )
+        changed = refresh_tax_policy
+        for name in _CART_TOTAL_FIELDS:
+            value = getattr(totals, name)
+            if getattr(cart, name) != value:
+                setattr(cart, name, value)
+                changed = True
+        if changed:
+            cart.updated_at = now
+            changed_carts.append(cart)
+
+    if stale_items:
+        CartItem.objects.bulk_update(
+            stale_items, ["unit_price_snapshot", "updated_at"], batch_size=1000
+        )
+    if changed_carts:
+        Cart.objects.bulk_update(changed_carts, _CART_UPDATE_FIELDS, batch_size=1000)
+    return len(changed_carts), len(stale_items)
+
+
+def _reprice_in_worker(cart_ids: list[int], refresh_tax_policy: bool) -> tuple[int, int, int]:
+    updated_carts, updated_items = reprice_cart_chunk(
+        cart_ids, refresh_tax_policy=refresh_tax_policy
+    )
+    return len(cart_ids), updated_carts, updated_items
+
+
+def reprice_open_carts(
+    *,
+    product_ids: Iterable[int] | None = None,
+    refresh_tax_policy: bool = False,
+    chunk_size: int = 1000,
+    workers: int = 0,
+) -> RepricingReport:
+    started = time.perf_counter()
+    chunk_size = max(int(chunk_size), 1)
+    # Materialise ids up front so the cursor is not held across forked workers.
+    chunks = list(_chunked(open_cart_ids(product_ids=product_ids), chunk_size))
+
+    scanned = updated_carts = updated_items = 0
+    if workers > 1 and len(chunks) > 1:
+        with process_pool(workers) as pool:
+            futures = [
+                pool.submit(_reprice_in_worker, chunk, refresh_tax_policy) for chunk in chunks
+            ]
+            for future in futures:
+                chunk_scanned, chunk_carts, chunk_items = future.result()
+                scanned += chunk_scanned
+                updated_carts += chunk_carts
+                updated_items += chunk_items
+    else:
+        for chunk in chunks:
+            chunk_scanned, chunk_carts, chunk_items = _reprice_in_worker(chunk, refresh_tax_policy)
+            scanned += chunk_scanned
+            updated_carts += chunk_carts
+            updated_items += chunk_items
+
+    return RepricingReport(
+        carts_scanned=scanned,
+        carts_updated=updated_carts,
+        items_updated=updated_items,
+        seconds=time.perf_counter() - started,
+    )
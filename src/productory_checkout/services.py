@@ -1,14 +1,29 @@
 from __future__ import annotations
 
+import hashlib
+from collections.abc import Iterable
+from dataclasses import dataclass, field, fields
 from decimal import Decimal
+from typing import TYPE_CHECKING
 
 from django.db import transaction
 
-from productory_checkout.models import Cart, CartItem, CartStatus, Order, OrderItem, OrderStatus
+from productory_checkout.models import (
+    Cart,
+    CartItem,
+    CartStatus,
+    Order,
+    OrderItem,
+    OrderRuleComponent,
+    OrderStatus,
+)
 from productory_core.conf import get_setting
 from productory_core.hooks import emit_webhook_event, order_created, order_status_changed
 from productory_core.store import compute_tax_breakdown
 
+if TYPE_CHECKING:
+    from productory_promotions.pricing import PricingResolution
+
 _ALLOWED_TRANSITIONS = {
     OrderStatus.DRAFT: {OrderStatus.SUBMITTED, OrderStatus.CANCELED},
     OrderStatus.SUBMITTED: {OrderStatus.PAID, OrderStatus.CANCELED},
@@ -18,74 +33,172 @@ _ALLOWED_TRANSITIONS = {
 }
 
 
-def _resolve_promotional_total(cart: Cart, base_subtotal: Decimal) -> tuple[Decimal, Decimal]:
+def compute_pricing_fingerprint(
+    lines: Iterable[tuple[int, int, Decimal]],
+    *,
+    vat_rate_percent: Decimal,
+    price_includes_vat: bool,
+    promotion_code: str = "",
+) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{vat_rate_percent}|{int(price_includes_vat)}".encode())
+    if promotion_code:
+        digest.update(f"|code:{promotion_code}".encode())
+    for product_id, quantity, unit_price in sorted(lines):
+        digest.update(f"|{product_id}:{quantity}:{unit_price}".encode())
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class CartTotals:
+    subtotal_amount: Decimal
+    subtotal_excl_vat_amount: Decimal
+    subtotal_incl_vat_amount: Decimal
+    discount_amount: Decimal
+    tax_amount: Decimal
+    total_amount: Decimal
+    total_excl_vat_amount: Decimal
+    total_incl_vat_amount: Decimal
+    item_count: int
+    line_count: int
+    pricing_fingerprint: str
+    applied_rule_type: str = ""
+    applied_rule_id: int | None = None
+    # [type, id] pairs; only set for "combined" allocations. A list, as read back from JSON.
+    applied_rule_components: list[list] = field(default_factory=list)
+
+
+_CART_TOTAL_FIELDS = [field.name for field in fields(CartTotals)]
+
+
+def _resolve_promotional_total(
+    lines: list[tuple[int, int, Decimal]], base_subtotal: Decimal, promotion_code: str = ""
+) -> PricingResolution | None:
     if not get_setting("ENABLE_PROMOTIONS", True):
-        return Decimal("0.00"), base_subtotal
+        return None
 
     try:
-        from productory_promotions.services import resolve_cart_pricing
+        from productory_promotions.services import resolve_line_pricing
     except ImportError:
-        return Decimal("0.00"), base_subtotal
+        return None
 
-    resolution = resolve_cart_pricing(cart, base_subtotal=base_subtotal)
-    return resolution.discount_amount, resolution.final_total
+    return resolve_line_pricing(lines, base_subtotal=base_subtotal, promotion_code=promotion_code)
 
 
-@transaction.atomic
-def recompute_cart_totals(cart: Cart) -> Cart:
-    subtotal_base = Decimal("0.00")
-    items = cart.items.select_related("product")
-
-    for item in items:
-        item.unit_price_snapshot = item.product.price_amount
-        item.save(update_fields=["unit_price_snapshot", "updated_at"])
-        subtotal_base += item.unit_price_snapshot * item.quantity
-
-    subtotal_base = subtotal_base.quantize(Decimal("0.01"))
-    discount_base, total_base = _resolve_promotional_total(cart, subtotal_base)
+def compute_line_totals(
+    lines: list[tuple[int, int, Decimal]],
+    *,
+    vat_rate_percent: Decimal,
+    price_includes_vat: bool,
+    promotion_code: str = "",
+    pricing: PricingResolution | None = None,
+) -> CartTotals:
+    subtotal_base = sum(
+        (unit_price * quantity for _, quantity, unit_price in lines), Decimal("0.00")
+    ).quantize(Decimal("0.01"))
+    if pricing is None:
+        # Callers pricing many carts at once (e.g. repricing) pass resolve_many results.
+        pricing = _resolve_promotional_total(lines, subtotal_base, promotion_code)
+    discount_base, total_base = Decimal("0.00"), subtotal_base
+    rule_type, rule_id, components = "", None, []
+    if pricing is not None:
+        discount_base, total_base = pricing.discount_amount, pricing.final_total
+        rule_type, rule_id = pricing.rule_type, pricing.rule_id
+        components = [list(component) for component in pricing.components]
     if discount_base > subtotal_base:
         discount_base = subtotal_base
         total_base = Decimal("0.00")
 
     subtotal_breakdown = compute_tax_breakdown(
         subtotal_base,
-        vat_rate_percent=cart.vat_rate_percent,
-        price_includes_vat=cart.price_includes_vat,
+        vat_rate_percent=vat_rate_percent,
+        price_includes_vat=price_includes_vat,
     )
     total_breakdown = compute_tax_breakdown(
         total_base,
-        vat_rate_percent=cart.vat_rate_percent,
-        price_includes_vat=cart.price_includes_vat,
+        vat_rate_percent=vat_rate_percent,
+        price_includes_vat=price_includes_vat,
     )
-    cart.subtotal_excl_vat_amount = subtotal_breakdown.amount_excl_vat
-    cart.subtotal_incl_vat_amount = subtotal_breakdown.amount_incl_vat
-    cart.total_excl_vat_amount = total_breakdown.amount_excl_vat
-    cart.total_incl_vat_amount = total_breakdown.amount_incl_vat
-    cart.tax_amount = total_breakdown.vat_amount
 
     # Keep canonical totals in VAT-inclusive terms.
-    cart.subtotal_amount = cart.subtotal_incl_vat_amount
-    cart.total_amount = cart.total_incl_vat_amount
-    cart.discount_amount = (cart.subtotal_amount - cart.total_amount).quantize(Decimal("0.01"))
+    subtotal_amount = subtotal_breakdown.amount_incl_vat
+    total_amount = total_breakdown.amount_incl_vat
+    return CartTotals(
+        subtotal_amount=subtotal_amount,
+        subtotal_excl_vat_amount=subtotal_breakdown.amount_excl_vat,
+        subtotal_incl_vat_amount=subtotal_breakdown.amount_incl_vat,
+        discount_amount=(subtotal_amount - total_amount).quantize(Decimal("0.01")),
+        tax_amount=total_breakdown.vat_amount,
+        total_amount=total_amount,
+        total_excl_vat_amount=total_breakdown.amount_excl_vat,
+        total_incl_vat_amount=total_breakdown.amount_incl_vat,
+        item_count=sum(quantity for _, quantity, _ in lines),
+        line_count=len(lines),
+        pricing_fingerprint=compute_pricing_fingerprint(
+            lines,
+            vat_rate_percent=vat_rate_percent,
+            price_includes_vat=price_includes_vat,
+            promotion_code=promotion_code,
+        ),
+        applied_rule_type=rule_type,
+        applied_rule_id=rule_id,
+        applied_rule_components=components,
+    )
+
+
+def apply_cart_totals(cart: Cart, totals: CartTotals) -> Cart:
+    for name in _CART_TOTAL_FIELDS:
+        setattr(cart, name, getattr(totals, name))
+    return cart
+
+
+@transaction.atomic
+def recompute_cart_totals(cart: Cart) -> Cart:
+    items = cart.items.select_related("product")
+    lines: list[tuple[int, int, Decimal]] = []
+
+    for item in items:
+        item.unit_price_snapshot = item.product.price_amount
+        item.save(update_fields=["unit_price_snapshot", "updated_at"])
+        lines.append((item.product_id, item.quantity, item.unit_price_snapshot))
 
+    totals = compute_line_totals(
+        lines,
+        vat_rate_percent=cart.vat_rate_percent,
+        price_includes_vat=cart.price_includes_vat,
+        promotion_code=cart.promotion_code,
+    )
+    apply_cart_totals(cart, totals)
     cart.save(
-        update_fields=[
-            "price_includes_vat",
-            "vat_rate_percent",
-            "subtotal_amount",
-            "subtotal_excl_vat_amount",
-            "subtotal_incl_vat_amount",
-            "discount_amount",
-            "tax_amount",
-            "total_amount",
-            "total_excl_vat_amount",
-            "total_incl_vat_amount",
-            "updated_at",
-        ]
+        update_fields=["price_includes_vat", "vat_rate_percent", *_CART_TOTAL_FIELDS, "updated_at"]
     )
     return cart
 
 
+def _promotion_codes_module():
+    if not get_setting("ENABLE_PROMOTIONS", True):
+        return None
+    try:
+        from productory_promotions import redemptions
+    except ImportError:
+        return None
+    return redemptions
+
+
+@transaction.atomic
+def apply_promotion_code(cart: Cart, code: str) -> Cart:
+    code = code.strip()
+    if code:
+        redemptions = _promotion_codes_module()
+        if redemptions is None:
+            raise ValueError("Promotion codes are not available.")
+        customer = redemptions.customer_key(customer_id=cart.customer_id, email=cart.email)
+        code = redemptions.validate_promotion_code(code, customer=customer).code
+    cart.promotion_code = code
+    cart.save(update_fields=["promotion_code", "updated_at"])
+    return recompute_cart_totals(cart)
+
+
 @transaction.atomic
 def upsert_cart_item(cart: Cart, product_id: int, quantity: int) -> CartItem:
     item, _ = CartItem.objects.get_or_create(
@@ -100,6 +213,40 @@ def upsert_cart_item(cart: Cart, product_id: int, quantity: int) -> CartItem:
     return item
 
 
+def refresh_cart_aggregates(cart_ids: Iterable[int]) -> int:
+    carts = {
+        cart.id: cart
+        for cart in Cart.objects.filter(id__in=list(cart_ids)).only(
+            "id", "vat_rate_percent", "price_includes_vat", "promotion_code"
+        )
+    }
+    if not carts:
+        return 0
+
+    lines_by_cart: dict[int, list[tuple[int, int, Decimal]]] = {cart_id: [] for cart_id in carts}
+    item_rows = CartItem.objects.filter(cart_id__in=carts.keys()).values_list(
+        "cart_id", "product_id", "quantity", "unit_price_snapshot"
+    )
+    for cart_id, product_id, quantity, unit_price in item_rows:
+        lines_by_cart[cart_id].append((product_id, quantity, unit_price))
+
+    for cart_id, cart in carts.items():
+        lines = lines_by_cart[cart_id]
+        cart.item_count = sum(quantity for _, quantity, _ in lines)
+        cart.line_count = len(lines)
+        cart.pricing_fingerprint = compute_pricing_fingerprint(
+            lines,
+            vat_rate_percent=cart.vat_rate_percent,
+            price_includes_vat=cart.price_includes_vat,
+            promotion_code=cart.promotion_code,
+        )
+
+    Cart.objects.bulk_update(
+        carts.values(), ["item_count", "line_count", "pricing_fingerprint"], batch_size=500
+    )
+    return len(carts)
+
+
 @transaction.atomic
 def transition_order_status(order: Order, new_status: str) -> Order:
     if new_status not in OrderStatus.values:
@@ -122,7 +269,6 @@ def transition_order_status(order: Order, new_status: str) -> Order:
     return order
 
 
-@transaction.atomic
 def create_order_from_cart(
     cart: Cart,
     *,
@@ -130,6 +276,34 @@ def create_order_from_cart(
     full_name: str = "",
     shipping_address_id: int | None = None,
     billing_address_id: int | None = None,
+) -> Order:
+    try:
+        return _create_order_from_cart(
+            cart,
+            email=email,
+            full_name=full_name,
+            shipping_address_id=shipping_address_id,
+            billing_address_id=billing_address_id,
+        )
+    except ValueError as exc:
+        redemptions = _promotion_codes_module()
+        if redemptions is None or not isinstance(exc, redemptions.PromotionCodeExhausted):
+            raise
+        # The order rolled back. Drop the spent code and reprice so the next checkout can succeed.
+        apply_promotion_code(cart, "")
+        raise redemptions.PromotionCodeExhausted(
+            f"{exc} It was removed from the cart; review the new total and check out again."
+        ) from exc
+
+
+@transaction.atomic
+def _create_order_from_cart(
+    cart: Cart,
+    *,
+    email: str,
+    full_name: str,
+    shipping_address_id: int | None,
+    billing_address_id: int | None,
 ) -> Order:
     if cart.status != CartStatus.OPEN:
         raise ValueError("Only open carts can be checked out")
@@ -148,6 +322,8 @@ def create_order_from_cart(
         subtotal_excl_vat_amount=cart.subtotal_excl_vat_amount,
         subtotal_incl_vat_amount=cart.subtotal_incl_vat_amount,
         discount_amount=cart.discount_amount,
+        applied_rule_type=cart.applied_rule_type,
+        applied_rule_id=cart.applied_rule_id,
         tax_amount=cart.tax_amount,
         total_amount=cart.total_amount,
         total_excl_vat_amount=cart.total_excl_vat_amount,
@@ -156,6 +332,11 @@ def create_order_from_cart(
         billing_address_id=billing_address_id,
     )
 
+    OrderRuleComponent.objects.bulk_create(
+        OrderRuleComponent(order=order, rule_type=rule_type, rule_id=rule_id)
+        for rule_type, rule_id in {tuple(component) for component in cart.applied_rule_components}
+    )
+
     for item in cart.items.select_related("product"):
         line_total = item.quantity * item.unit_price_snapshot
         OrderItem.objects.create(
@@ -168,6 +349,11 @@ def create_order_from_cart(
             line_total=line_total,
         )
 
+    if cart.promotion_code:
+        redemptions = _promotion_codes_module()
+        if redemptions is not None:
+            redemptions.redeem_cart_promotion_code(cart, order)
+
     cart.status = CartStatus.CONVERTED
     cart.save(update_fields=["status", "updated_at"])
 
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from django.contrib.auth.signals import user_logged_in
+from django.dispatch import receiver
+
+from productory_checkout.guest_carts import (
+    CART_SESSION_KEY,
+    GUEST_CART_SESSION_KEY,
+    GuestCartBusy,
+    GuestCartNotFound,
+    guest_carts_enabled,
+    persist_guest_cart,
+)
+
+
+@receiver(user_logged_in)
+def persist_guest_cart_on_login(sender, request, user, **kwargs):
+    if not guest_carts_enabled():
+        return
+    session = getattr(request, "session", None)
+    if session is None:
+        return
+    token = session.get(GUEST_CART_SESSION_KEY)
+    if not token:
+        return
+
+    try:
+        cart = persist_guest_cart(token, customer=user)
+    except (GuestCartNotFound, GuestCartBusy):
+        # Busy means a checkout is persisting the same cart right now.
+        pass
+    else:
+        session[CART_SESSION_KEY] = cart.pk
+    session.pop(GUEST_CART_SESSION_KEY, None)
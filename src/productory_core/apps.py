@@ -7,4 +7,4 @@ class ProductoryCoreConfig(AppConfig):
     verbose_name = "Productory Core"
 
     def ready(self):
-        from productory_core import audit_signals  # noqa: F401
+        from productory_core import audit_signals, checks  # noqa: F401
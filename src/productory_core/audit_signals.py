@@ -56,11 +56,24 @@ def _record_event(*, instance, action: str, changes: dict) -> None:
         return
     if _model_label(instance) not in _TRACKED_MODEL_LABELS:
         return
-    actor = get_current_actor()
-    AuditEvent.objects.create(
+    record_audit_event(
         model_label=_model_label(instance),
         object_pk=str(instance.pk),
         action=action,
+        changes=changes,
+    )
+
+
+def record_audit_event(
+    *, model_label: str, object_pk: str, action: str, changes: dict, actor=None
+) -> AuditEvent:
+    # Also used directly by bulk operations that write one summary event instead of one per row.
+    if actor is None or not getattr(actor, "is_authenticated", False):
+        actor = get_current_actor()
+    return AuditEvent.objects.create(
+        model_label=model_label,
+        object_pk=object_pk,
+        action=action,
         actor=actor,
         actor_display=(getattr(actor, "get_username", lambda: "")() if actor else ""),
         changes=changes,
@@ -128,6 +141,8 @@ def audit_bundle_items_change(sender, instance, created, **kwargs):
                 "operation": "add_or_update" if created else "update",
                 "bundle_item_id": instance.id,
                 "product_id": instance.product_id,
+                "category_id": instance.category_id,
+                "collection_id": instance.collection_id,
                 "quantity": instance.quantity,
             }
         },
@@ -143,6 +158,8 @@ def audit_bundle_items_delete(sender, instance, **kwargs):
             "items": {
                 "operation": "remove",
                 "product_id": instance.product_id,
+                "category_id": instance.category_id,
+                "collection_id": instance.collection_id,
             }
         },
     )
@@ -168,3 +185,29 @@ def audit_promotion_bundles_change(sender, instance, action, pk_set, **kwargs):
         action="relation_updated",
         changes={"bundles": {"operation": action, "bundle_ids": sorted(pk_set or [])}},
     )
+
+
+@receiver(
+    m2m_changed, sender=apps.get_model("productory_promotions", "Promotion").categories.through
+)
+def audit_promotion_categories_change(sender, instance, action, pk_set, **kwargs):
+    if action not in {"post_add", "post_remove", "post_clear"}:
+        return
+    _record_event(
+        instance=instance,
+        action="relation_updated",
+        changes={"categories": {"operation": action, "category_ids": sorted(pk_set or [])}},
+    )
+
+
+@receiver(
+    m2m_changed, sender=apps.get_model("productory_promotions", "Promotion").collections.through
+)
+def audit_promotion_collections_change(sender, instance, action, pk_set, **kwargs):
+    if action not in {"post_add", "post_remove", "post_clear"}:
+        return
+    _record_event(
+        instance=instance,
+        action="relation_updated",
+        changes={"collections": {"operation": action, "collection_ids": sorted(pk_set or [])}},
+    )
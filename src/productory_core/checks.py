@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+from productory_core.conf import get_setting
+
+_PROCESS_LOCAL_BACKENDS = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    # Generation counters (rule sets, representations, memberships, facets, autocomplete,
+    # ETags) and guest carts live in the cache, so every worker has to see the same one.
+    aliases = {"default", str(get_setting("GUEST_CART_CACHE_ALIAS"))}
+    warnings = []
+    for alias in sorted(aliases):
+        backend = settings.CACHES.get(alias, {}).get("BACKEND", "")
+        if backend in _PROCESS_LOCAL_BACKENDS:
+            warnings.append(
+                Warning(
+                    f"CACHES[{alias!r}] uses {backend.rsplit('.', 1)[-1]}, which is not shared "
+                    "between processes.",
+                    hint=(
+                        "Productory keeps invalidation counters and guest carts in this cache; "
+                        "with several workers use a shared backend such as Redis or Memcached."
+                    ),
+                    id="productory_core.W001",
+                )
+            )
+    return warnings
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import hashlib
+from typing import TYPE_CHECKING
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from productory_core.generations import get_generation, get_generation_changed_at
+
+if TYPE_CHECKING:
+    from rest_framework.viewsets import ModelViewSet as _ViewSetBase
+else:
+    _ViewSetBase = object
+
+
+class ConditionalGetMixin(_ViewSetBase):
+    # ETag/Last-Modified for list and retrieve, derived from generation counters bumped by
+    # signals, so a 304 is answered before any query or serialization runs.
+    conditional_generations: tuple[str, ...] = ()
+
+    def get_conditional_generations(self) -> tuple[str, ...]:
+        return self.conditional_generations
+
+    def _conditional_validators(self) -> tuple[str, int | None] | None:
+        if not hasattr(self, "_validators"):
+            names = self.get_conditional_generations()
+            validators = None
+            if names:
+                versions = "|".join(f"{name}:{get_generation(name)}" for name in names)
+                etag = 'W/"' + hashlib.sha1(versions.encode()).hexdigest()[:20] + '"'
+                changed = [get_generation_changed_at(name) for name in names]
+                last_modified = None
+                if all(value is not None for value in changed):
+                    last_modified = int(max(value or 0.0 for value in changed))
+                validators = (etag, last_modified)
+            self._validators = validators
+        return self._validators
+
+    def _not_modified(self, request):
+        validators = self._conditional_validators()
+        if validators is None:
+            return None
+        etag, last_modified = validators
+        return get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+
+    def list(self, request, *args, **kwargs):
+        return self._not_modified(request) or super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._not_modified(request) or super().retrieve(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if (
+            request.method in {"GET", "HEAD"}
+            and response.status_code == 200
+            and getattr(self, "action", None) in {"list", "retrieve"}
+        ):
+            validators = self._conditional_validators()
+            if validators is not None:
+                etag, last_modified = validators
+                response["ETag"] = etag
+                if last_modified is not None:
+                    response["Last-Modified"] = http_date(last_modified)
+        return response
@@ -12,8 +12,23 @@ DEFAULTS: dict[str, Any] = {
     "DASHBOARD_KPI_CACHE_TTL_SECONDS": 120,
     "DEFAULT_PAGE_SIZE": 20,
     "ENABLE_PROMOTIONS": True,
+    "PRICING_STRATEGY": "best_single",
+    "PRICING_ALLOCATION_MAX_NODES": 20000,
+    "PRICING_ALLOCATION_MAX_MS": 5,
+    "PROMOTION_REDEMPTION_SHARDS": 8,
     "ENABLE_WEBHOOKS": False,
     "WEBHOOK_URL": "",
+    "FACET_PRICE_BANDS": ["100", "250", "500", "1000"],
+    "SEARCH_BACKEND": "auto",
+    "SEARCH_MAX_RESULTS": 1000,
+    "PRICE_UPDATE_MAX_ITEMS": 10000,
+    "STOCK_ADJUSTMENT_MAX_ITEMS": 50000,
+    "CHANGE_FEED_LAG_SECONDS": 2,
+    "SNAPSHOT_PRUNE_GRACE_SECONDS": 3600,
+    "CART_STORAGE": "db",
+    "GUEST_CART_CACHE_ALIAS": "default",
+    "GUEST_CART_IDLE_SECONDS": 1800,
+    "GUEST_CART_TTL_SECONDS": 604800,
 }
 
 
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import csv
+import json
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from decimal import Decimal
+from uuid import UUID
+
+from django.contrib import admin
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+DEFAULT_CHUNK_SIZE = 2000
+
+
+@dataclass(frozen=True)
+class ExportSpec:
+    name: str
+    columns: tuple[tuple[str, str], ...]
+    base_queryset: Callable[[], QuerySet]
+
+    @property
+    def headers(self) -> list[str]:
+        return [header for header, _ in self.columns]
+
+    @property
+    def lookups(self) -> list[str]:
+        return [lookup for _, lookup in self.columns]
+
+    def rows(self, queryset: QuerySet | None = None, *, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        if queryset is None:
+            queryset = self.base_queryset()
+        # values_list + iterator keeps a single chunk of plain tuples in memory at a time.
+        return queryset.values_list(*self.lookups).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    def write(self, value: str) -> str:
+        return value
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Unsupported export value: {type(value).__name__}")
+
+
+def iter_csv(headers: list[str], rows: Iterable[tuple]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_ndjson(headers: list[str], rows: Iterable[tuple]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row, strict=True)), default=_json_default) + "\n"
+
+
+def stream_export(
+    spec: ExportSpec,
+    queryset: QuerySet | None = None,
+    *,
+    export_format: str = "csv",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[str]:
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    rows = spec.rows(queryset, chunk_size=chunk_size)
+    if export_format == "ndjson":
+        return iter_ndjson(spec.headers, rows)
+    return iter_csv(spec.headers, rows)
+
+
+def streaming_export_response(
+    spec: ExportSpec,
+    queryset: QuerySet | None = None,
+    *,
+    export_format: str = "csv",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> StreamingHttpResponse:
+    content_type, extension = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(
+        stream_export(spec, queryset, export_format=export_format, chunk_size=chunk_size),
+        content_type=content_type,
+    )
+    response["Content-Disposition"] = f'attachment; filename="{spec.name}.{extension}"'
+    return response
+
+
+def export_action(
+    spec: ExportSpec,
+    *,
+    description: str,
+    export_format: str = "csv",
+    related_queryset: Callable[[QuerySet], QuerySet] | None = None,
+):
+    @admin.action(description=description)
+    def action(modeladmin, request, queryset):
+        if related_queryset is not None:
+            queryset = related_queryset(queryset)
+        return streaming_export_response(spec, queryset, export_format=export_format)
+
+    action.__name__ = f"export_{spec.name.replace('-', '_')}_{export_format}"
+    return action
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from django.core.cache import cache
+from django.db import transaction
+
+_KEY_PREFIX = "productory:generation"
+_LOG_TIMEOUT_SECONDS = 3600
+_LOG_MAX_ENTRIES = 1000
+
+
+def _key(name: str) -> str:
+    return f"{_KEY_PREFIX}:{name}"
+
+
+def _changed_at_key(name: str) -> str:
+    return f"{_KEY_PREFIX}:{name}:changed-at"
+
+
+def _log_key(name: str, generation: int) -> str:
+    return f"{_KEY_PREFIX}:{name}:log:{generation}"
+
+
+def _incr(key: str) -> int:
+    try:
+        return int(cache.incr(key))
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+        return int(cache.incr(key))
+
+
+def get_generation(name: str) -> int:
+    key = _key(name)
+    value = cache.get(key)
+    if value is None:
+        # Seed with a timestamp so a flushed cache never reissues an old generation.
+        cache.add(key, time.time_ns(), timeout=None)
+        value = cache.get(key)
+    return int(value or 0)
+
+
+def get_generations(names: Iterable[str]) -> dict[str, int]:
+    # Batched get_generation for per-object counters: one get_many, plus seeding for misses.
+    keys = {_key(name): name for name in names}
+    found = cache.get_many(list(keys))
+    missing = [key for key in keys if key not in found]
+    for key in missing:
+        cache.add(key, time.time_ns(), timeout=None)
+    if missing:
+        found.update(cache.get_many(missing))
+    return {name: int(found.get(key) or 0) for key, name in keys.items()}
+
+
+def bump_generation(name: str, *, change: Any = None) -> int:
+    generation = _incr(_key(name))
+    if change is not None:
+        cache.set(_log_key(name, generation), change, timeout=_LOG_TIMEOUT_SECONDS)
+    cache.set(_changed_at_key(name), time.time(), timeout=None)
+    return generation
+
+
+def bump_generations(names: Iterable[str]) -> None:
+    # Per-object counters: no changed-at stamp and no change log.
+    for name in names:
+        _incr(_key(name))
+
+
+def publish_generation(name: str, change: list[Any] | None = None) -> None:
+    # Bump now so this process sees its own writes, and again after commit so other processes
+    # cannot cache pre-commit data under the new generation. A logged change is published only
+    # after commit: followers replay it rather than re-read, so a rollback must never reach them.
+    if change is None:
+        bump_generation(name)
+    transaction.on_commit(lambda: bump_generation(name, change=change))
+
+
+def generation_changes(name: str, since: int, until: int) -> list[Any] | None:
+    # Changes logged by the bumps after ``since`` up to ``until``, oldest first. None means the
+    # log cannot bridge the gap (an entry expired, or a bump logged no change) and the caller
+    # has to rebuild from the database.
+    if not 0 <= until - since <= _LOG_MAX_ENTRIES:
+        return None
+    keys = [_log_key(name, generation) for generation in range(since + 1, until + 1)]
+    found = cache.get_many(keys) if keys else {}
+    if len(found) != len(keys):
+        return None
+    return [found[key] for key in keys]
+
+
+def get_generation_changed_at(name: str) -> float | None:
+    # Unix time of the last bump, or None when unknown (e.g. after a cache flush).
+    value = cache.get(_changed_at_key(name))
+    return float(value) if value is not None else None
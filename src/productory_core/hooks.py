@@ -9,6 +9,7 @@ from productory_core.conf import get_setting
 
 order_created = Signal()
 order_status_changed = Signal()
+product_prices_changed = Signal()
 
 
 def emit_webhook_event(event_name: str, payload: dict) -> None:
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from productory_core.exports import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, ExportSpec, stream_export
+
+
+def _export_specs() -> dict[str, ExportSpec]:
+    from productory_catalog.exports import CATEGORY_EXPORT, PRODUCT_EXPORT
+    from productory_checkout.exports import ORDER_EXPORT, ORDER_ITEM_EXPORT
+
+    return {
+        spec.name: spec
+        for spec in (CATEGORY_EXPORT, PRODUCT_EXPORT, ORDER_EXPORT, ORDER_ITEM_EXPORT)
+    }
+
+
+class Command(BaseCommand):
+    help = "Stream a Productory dataset to CSV or NDJSON with constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", help="One of: categories, products, orders, order-items.")
+        parser.add_argument("--format", dest="export_format", default="csv", choices=EXPORT_FORMATS)
+        parser.add_argument("--output", default="-", help="Output file path (default: stdout).")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        specs = _export_specs()
+        spec = specs.get(options["dataset"])
+        if spec is None:
+            raise CommandError(f"Unknown dataset. Choose from: {', '.join(sorted(specs))}.")
+
+        chunks = stream_export(
+            spec,
+            export_format=options["export_format"],
+            chunk_size=max(int(options["chunk_size"]), 1),
+        )
+        if options["output"] == "-":
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+
+        written = 0
+        with open(options["output"], "w", encoding="utf-8", newline="") as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+                written += 1
+        self.stderr.write(f"Wrote {written} lines to {options['output']}.")
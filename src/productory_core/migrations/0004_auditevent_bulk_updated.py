@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productory_core', '0003_auditevent'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditevent',
+            name='action',
+            field=models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted'), ('relation_updated', 'Relation Updated'), ('bulk_updated', 'Bulk Updated')], max_length=20),
+        ),
+    ]
@@ -2,12 +2,20 @@ from __future__ import annotations
 
 from decimal import Decimal
 
+import django
 from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.db.models import Q
 
 
+def check_constraint(*, condition: Q, name: str) -> models.CheckConstraint:
+    # Django 5.1 renamed CheckConstraint(check=...) to condition=; 4.2 only accepts check=.
+    if django.VERSION >= (5, 1):
+        return models.CheckConstraint(condition=condition, name=name)
+    return models.CheckConstraint(check=condition, name=name)  # type: ignore[call-arg]
+
+
 class TimeStampedModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -95,6 +103,7 @@ class AuditEvent(models.Model):
         UPDATED = "updated", "Updated"
         DELETED = "deleted", "Deleted"
         RELATION_UPDATED = "relation_updated", "Relation Updated"
+        BULK_UPDATED = "bulk_updated", "Bulk Updated"
 
     created_at = models.DateTimeField(auto_now_add=True)
     model_label = models.CharField(max_length=120)
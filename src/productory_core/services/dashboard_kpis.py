@@ -6,10 +6,10 @@ from decimal import Decimal
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from django.core.cache import cache
-from django.db.models import Count, Q, Sum
+from django.db.models import Avg, Count, Q, Sum
 
 from productory_catalog.models import Product, StockRecord
-from productory_checkout.models import Cart, CartStatus, Order, OrderStatus
+from productory_checkout.models import Cart, CartStatus, Order, OrderRuleComponent, OrderStatus
 from productory_core.conf import get_setting
 from productory_core.store import get_store_config, get_store_pricing_policy, store_now
 
@@ -49,7 +49,7 @@ def _cache_key(
     low_stock_threshold: int,
 ) -> str:
     return (
-        "productory:kpis:v1:"
+        "productory:kpis:v4:"
         f"{store_slug}:{date_from.isoformat()}:{date_to.isoformat()}:"
         f"{timezone_name}:{low_stock_threshold}"
     )
@@ -96,6 +96,8 @@ def get_store_kpis(
         net_sales=Sum("total_incl_vat_amount"),
         discount_total=Sum("discount_amount"),
         paid_count=Count("id"),
+        # Orders placed before the applied rule was recorded only show as discounted.
+        promo_usage=Count("id", filter=Q(discount_amount__gt=0) | ~Q(applied_rule_type="")),
     )
     gmv_incl_vat = _money(realized_agg["gmv_incl_vat"])
     net_sales = _money(realized_agg["net_sales"])
@@ -103,6 +105,44 @@ def get_store_kpis(
     paid_orders_count = int(realized_agg["paid_count"] or 0)
     aov_incl_vat = _money(net_sales / paid_orders_count) if paid_orders_count else _ZERO
 
+    # One grouped aggregate over the indexed applied-rule columns.
+    rule_rows = (
+        realized_orders.exclude(applied_rule_type="")
+        .values("applied_rule_type", "applied_rule_id")
+        .annotate(redemptions=Count("id"), discount_total=Sum("discount_amount"))
+        .order_by("applied_rule_type", "applied_rule_id")
+    )
+    rule_usage: dict[str, dict] = {"promotion": {}, "bundle": {}, "combined": {}}
+    for row in rule_rows:
+        rule_usage.setdefault(row["applied_rule_type"], {})[row["applied_rule_id"]] = {
+            "id": row["applied_rule_id"],
+            "redemptions": int(row["redemptions"]),
+            "discount_total": _money(row["discount_total"]),
+            "combined_redemptions": 0,
+        }
+    # A combined allocation's discount is not split per rule, so it only counts here.
+    if rule_usage["combined"]:
+        component_rows = (
+            OrderRuleComponent.objects.filter(
+                order__in=realized_orders.filter(applied_rule_type="combined")
+            )
+            .values("rule_type", "rule_id")
+            .annotate(orders=Count("id"))
+            .order_by()
+        )
+        for row in component_rows:
+            entry = rule_usage.setdefault(row["rule_type"], {}).setdefault(
+                row["rule_id"],
+                {
+                    "id": row["rule_id"],
+                    "redemptions": 0,
+                    "discount_total": _ZERO,
+                    "combined_redemptions": 0,
+                },
+            )
+            entry["combined_redemptions"] = int(row["orders"])
+    promo_usage_count = int(realized_agg["promo_usage"] or 0)
+
     status_counts = {
         row["status"]: row["total"] for row in orders.values("status").annotate(total=Count("id"))
     }
@@ -111,14 +151,19 @@ def get_store_kpis(
     }
 
     carts = Cart.objects.filter(created_at__gte=start_utc, created_at__lt=end_utc_exclusive)
+    # Cart KPIs read the denormalized aggregates on Cart; no CartItem join is needed.
     cart_counts = carts.aggregate(
         open=Count("id", filter=Q(status=CartStatus.OPEN)),
         converted=Count("id", filter=Q(status=CartStatus.CONVERTED)),
         abandoned=Count("id", filter=Q(status=CartStatus.ABANDONED)),
+        abandoned_value=Sum("total_amount", filter=Q(status=CartStatus.ABANDONED)),
+        average_item_count=Avg("item_count"),
     )
     open_count = int(cart_counts["open"] or 0)
     converted_count = int(cart_counts["converted"] or 0)
     abandoned_count = int(cart_counts["abandoned"] or 0)
+    abandoned_value = _money(cart_counts["abandoned_value"])
+    average_item_count = round(float(cart_counts["average_item_count"] or 0), 2)
     conversion_denominator = converted_count + abandoned_count
     conversion_rate = (
         round(converted_count / conversion_denominator, 4) if conversion_denominator else 0.0
@@ -154,13 +199,23 @@ def get_store_kpis(
             "total": orders.count(),
             "paid": paid_orders_count,
             "by_status": orders_by_status,
-            "promo_usage_count": realized_orders.filter(discount_amount__gt=_ZERO).count(),
+            "promo_usage_count": promo_usage_count,
+        },
+        "promotions": {
+            key: sorted(rule_usage[rule_type].values(), key=lambda entry: entry["id"] or 0)
+            for key, rule_type in (
+                ("promotions", "promotion"),
+                ("bundles", "bundle"),
+                ("combined", "combined"),
+            )
         },
         "carts": {
             "open": open_count,
             "converted": converted_count,
             "abandoned": abandoned_count,
             "conversion_rate": conversion_rate,
+            "abandoned_value": abandoned_value,
+            "average_item_count": average_item_count,
         },
         "catalog": {
             "active_products": active_products,
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+from django.db import connections
+
+
+def _setup_worker(initializer: Callable[..., None] | None, initargs: tuple[Any, ...]) -> None:
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def process_pool(
+    workers: int,
+    *,
+    initializer: Callable[..., None] | None = None,
+    initargs: tuple[Any, ...] = (),
+) -> ProcessPoolExecutor:
+    # Each worker opens its own database connections; the parent's are closed first so no
+    # connection is shared across fork.
+    connections.close_all()
+    return ProcessPoolExecutor(
+        max_workers=workers, initializer=_setup_worker, initargs=(initializer, initargs)
+    )
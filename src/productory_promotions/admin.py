@@ -1,11 +1,12 @@
 from django.contrib import admin
 
-from productory_promotions.models import Bundle, BundleItem, Promotion
+from productory_promotions.models import Bundle, BundleItem, Promotion, PromotionRedemption
 
 
 class BundleItemInline(admin.TabularInline):
     model = BundleItem
     extra = 0
+    autocomplete_fields = ("product", "category", "collection")
 
 
 @admin.register(Bundle)
@@ -24,10 +25,20 @@ class PromotionAdmin(admin.ModelAdmin):
         "promotion_type",
         "value",
         "applies_to_all_products",
+        "requires_code",
+        "max_redemptions",
         "start_at",
         "end_at",
         "is_active",
     )
-    list_filter = ("promotion_type", "applies_to_all_products", "is_active")
+    list_filter = ("promotion_type", "applies_to_all_products", "requires_code", "is_active")
     search_fields = ("name", "code")
-    filter_horizontal = ("products", "bundles")
+    filter_horizontal = ("products", "categories", "collections", "bundles")
+
+
+@admin.register(PromotionRedemption)
+class PromotionRedemptionAdmin(admin.ModelAdmin):
+    list_display = ("promotion", "order", "customer_key", "discount_amount", "created_at")
+    list_filter = ("promotion",)
+    search_fields = ("promotion__code", "order__number", "customer_key")
+    raw_id_fields = ("order",)
@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from decimal import Decimal
+
+from productory_catalog.memberships import ProductMembership
+from productory_promotions.models import PromotionType
+from productory_promotions.rules import RuleSet
+
+_ZERO = Decimal("0.00")
+_MONEY_PLACES = Decimal("0.01")
+
+
+@dataclass(frozen=True)
+class AllocationBudget:
+    max_nodes: int = 20_000
+    max_seconds: float = 0.005
+
+
+@dataclass(frozen=True)
+class Allocation:
+    discount: Decimal
+    # (position in ``RuleSet.bundles``, number of sets applied)
+    bundle_sets: tuple[tuple[int, int], ...]
+    promotion: int | None
+    nodes: int
+    exhausted: bool
+
+    def describe(self, rules: RuleSet) -> str:
+        parts = [
+            f"bundle:{rules.bundles[position].slug}" + (f"x{sets}" if sets > 1 else "")
+            for position, sets in self.bundle_sets
+        ]
+        if self.promotion is not None:
+            parts.append(f"promotion:{rules.promotions[self.promotion].code}")
+        return "+".join(parts)
+
+    def components(self, rules: RuleSet) -> tuple[tuple[str, int], ...]:
+        parts = [("bundle", rules.bundles[position].id) for position, _ in self.bundle_sets]
+        if self.promotion is not None:
+            parts.append(("promotion", rules.promotions[self.promotion].id))
+        return tuple(parts)
+
+
+def _cents(amount: Decimal) -> int:
+    return int(amount * 100)
+
+
+@dataclass(frozen=True)
+class _BundleOption:
+    position: int
+    # Money inside the search is integer cents; Decimal arithmetic dominates otherwise.
+    saving: int
+    # (slot index, quantity per set)
+    usage: tuple[tuple[int, int], ...]
+
+
+class _Search:
+    def __init__(
+        self,
+        cart_lines: Mapping[int, tuple[int, Decimal]],
+        rules: RuleSet,
+        budget: AllocationBudget,
+        promotion_code: str,
+        memberships: Mapping[int, ProductMembership],
+    ) -> None:
+        self.rules = rules
+        self.budget = budget
+        self.started = time.perf_counter()
+        self.nodes = 0
+        self.exhausted = False
+
+        self.options: list[_BundleOption] = []
+        slots: dict[int, int] = {}
+        for position in rules.candidate_bundles(cart_lines):
+            bundle = rules.bundles[position]
+            if bundle.group_items:
+                # Group slots can be filled many ways; they only compete as single rules.
+                continue
+            regular_set_total = _ZERO
+            feasible = True
+            for product_id, bundle_quantity in bundle.items:
+                line = cart_lines.get(product_id)
+                if not line or line[0] < bundle_quantity:
+                    feasible = False
+                    break
+                regular_set_total += line[1] * bundle_quantity
+            saving = _cents(regular_set_total - bundle.price_amount)
+            if not feasible or saving <= 0:
+                continue
+            usage = tuple(
+                (slots.setdefault(product_id, len(slots)), quantity)
+                for product_id, quantity in bundle.items
+            )
+            self.options.append(_BundleOption(position=position, saving=saving, usage=usage))
+        # Most valuable sets first so the first leaf reached is the greedy allocation.
+        self.options.sort(key=lambda option: (-option.saving, option.position))
+
+        self.initial = tuple(cart_lines[product_id][0] for product_id in slots)
+        slot_demand = [0] * len(slots)
+        for option in self.options:
+            for slot, _ in option.usage:
+                slot_demand[slot] += 1
+        # Prefer the most contended slot when several are equally scarce (see _bundle_bound).
+        self.slot_priority = [-demand for demand in slot_demand]
+
+        # Promotion eligibility split into a constant part (units no bundle can take) and
+        # per-slot prices for the units bundles compete for.
+        self.promotions: list[tuple[int, int, tuple[tuple[int, int], ...]]] = []
+        candidate_promotions = set(rules.storewide_promotions)
+        for product_id in cart_lines:
+            candidate_promotions.update(
+                rules.line_promotions(product_id, memberships.get(product_id))
+            )
+        for position in sorted(candidate_promotions):
+            promo = rules.promotions[position]
+            if not promo.is_available(promotion_code):
+                continue
+            fixed_eligible = 0
+            slot_terms: list[tuple[int, int]] = []
+            for product_id, (quantity, unit_price) in cart_lines.items():
+                if not promo.targets(product_id, memberships.get(product_id)):
+                    continue
+                if product_id in slots:
+                    slot_terms.append((slots[product_id], _cents(unit_price)))
+                else:
+                    fixed_eligible += quantity * _cents(unit_price)
+            self.promotions.append((position, fixed_eligible, tuple(slot_terms)))
+
+        self.best_discount = 0
+        self.best_sets: tuple[tuple[int, int], ...] = ()
+        self.best_promotion: int | None = None
+        self.seen: dict[tuple[int, tuple[int, ...]], int] = {}
+
+    def _feasible(
+        self, options: Sequence[_BundleOption], remaining: tuple[int, ...]
+    ) -> list[tuple[_BundleOption, int]]:
+        # Units only ever decrease down the tree, so infeasible bundles are dropped for good.
+        feasible = []
+        for option in options:
+            sets = min(remaining[slot] // quantity for slot, quantity in option.usage)
+            if sets:
+                feasible.append((option, sets))
+        return feasible
+
+    def _bundle_bound(
+        self, live: list[tuple[_BundleOption, int]], remaining: tuple[int, ...]
+    ) -> int:
+        # Two valid bounds, take the tighter: every bundle at its own maximum, and charging each
+        # bundle's saving to its scarcest slot, so shared units are only counted once.
+        independent = 0
+        per_unit: dict[int, tuple[int, int]] = {}
+        for option, sets in live:
+            independent += option.saving * sets
+            slot = quantity = -1
+            for usage_slot, usage_quantity in option.usage:
+                if remaining[usage_slot] // usage_quantity == sets and (
+                    slot < 0 or self.slot_priority[usage_slot] < self.slot_priority[slot]
+                ):
+                    slot, quantity = usage_slot, usage_quantity
+            current = per_unit.get(slot)
+            if current is None or option.saving * current[1] > current[0] * quantity:
+                per_unit[slot] = (option.saving, quantity)
+        charged = sum(
+            -(-remaining[slot] * saving // quantity)
+            for slot, (saving, quantity) in per_unit.items()
+        )
+        return min(independent, charged)
+
+    def _best_promotion(self, remaining: tuple[int, ...]) -> tuple[int, int | None]:
+        best = 0
+        best_position = None
+        for position, fixed_eligible, slot_terms in self.promotions:
+            eligible = fixed_eligible + sum(
+                remaining[slot] * unit_price for slot, unit_price in slot_terms
+            )
+            if eligible <= 0:
+                continue
+            promo = self.rules.promotions[position]
+            if promo.promotion_type == PromotionType.PERCENTAGE:
+                discount = _cents(
+                    (Decimal(eligible) * promo.value / 10_000).quantize(_MONEY_PLACES)
+                )
+            else:
+                discount = min(_cents(promo.value), eligible)
+            if discount > best:
+                best = discount
+                best_position = position
+        return best, best_position
+
+    def _out_of_budget(self) -> bool:
+        if self.exhausted:
+            return True
+        if self.nodes >= self.budget.max_nodes:
+            self.exhausted = True
+        elif time.perf_counter() - self.started >= self.budget.max_seconds:
+            self.exhausted = True
+        return self.exhausted
+
+    def run(self) -> Allocation:
+        self._visit(self.options, self.initial, 0, ())
+        return Allocation(
+            discount=(Decimal(self.best_discount) / 100).quantize(_MONEY_PLACES),
+            bundle_sets=self.best_sets,
+            promotion=self.best_promotion,
+            nodes=self.nodes,
+            exhausted=self.exhausted,
+        )
+
+    def _visit(
+        self,
+        options: Sequence[_BundleOption],
+        remaining: tuple[int, ...],
+        saved: int,
+        chosen: tuple[tuple[int, int], ...],
+    ) -> None:
+        if self._out_of_budget():
+            return
+        self.nodes += 1
+        promo_discount, promo_position = self._best_promotion(remaining)
+        if saved + promo_discount > self.best_discount:
+            self.best_discount = saved + promo_discount
+            self.best_sets = chosen
+            self.best_promotion = promo_position
+
+        live = self._feasible(options, remaining)
+        if not live:
+            return
+
+        # Reaching the same state with no more savings cannot do better.
+        option, max_sets = live[0]
+        key = (option.position, remaining)
+        previous = self.seen.get(key)
+        if previous is not None and previous >= saved:
+            return
+        self.seen[key] = saved
+
+        # Removing units never increases a promotion's discount, so its current value plus a
+        # bound on the remaining bundle savings is an optimistic estimate for this subtree.
+        optimistic = saved + promo_discount + self._bundle_bound(live, remaining)
+        if optimistic <= self.best_discount:
+            return
+
+        rest = [candidate for candidate, _ in live[1:]]
+        for sets in range(max_sets, -1, -1):
+            if sets:
+                taken = list(remaining)
+                for slot, quantity in option.usage:
+                    taken[slot] -= quantity * sets
+                next_remaining = tuple(taken)
+                next_chosen = (*chosen, (option.position, sets))
+            else:
+                next_remaining = remaining
+                next_chosen = chosen
+            self._visit(rest, next_remaining, saved + option.saving * sets, next_chosen)
+            if self.exhausted:
+                return
+
+
+def allocate(
+    cart_lines: Mapping[int, tuple[int, Decimal]],
+    rules: RuleSet,
+    *,
+    budget: AllocationBudget | None = None,
+    promotion_code: str = "",
+    memberships: Mapping[int, ProductMembership] | None = None,
+) -> Allocation:
+    return _Search(
+        cart_lines, rules, budget or AllocationBudget(), promotion_code, memberships or {}
+    ).run()
@@ -1,12 +1,12 @@
 from rest_framework import serializers
 
-from productory_promotions.models import Bundle, BundleItem, Promotion
+from productory_promotions.models import Bundle, BundleItem, Promotion, PromotionType
 
 
 class BundleItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = BundleItem
-        fields = ["id", "product", "quantity"]
+        fields = ["id", "product", "category", "collection", "quantity"]
 
 
 class BundleSerializer(serializers.ModelSerializer):
@@ -35,7 +35,12 @@ class PromotionSerializer(serializers.ModelSerializer):
             "name",
             "code",
             "applies_to_all_products",
+            "requires_code",
+            "max_redemptions",
+            "max_redemptions_per_customer",
             "products",
+            "categories",
+            "collections",
             "bundles",
             "promotion_type",
             "value",
@@ -45,3 +50,70 @@ class PromotionSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
+
+    def validate(self, attrs):
+        def current(key):
+            return attrs.get(key, getattr(self.instance, key, None))
+
+        capped = any(
+            current(key) is not None for key in ("max_redemptions", "max_redemptions_per_customer")
+        )
+        if capped and not current("requires_code"):
+            raise serializers.ValidationError(
+                {"requires_code": "Redemption limits are only enforced for code promotions."}
+            )
+        return attrs
+
+
+class SimulatedPromotionSerializer(serializers.Serializer):
+    code = serializers.CharField(max_length=64, required=False, allow_blank=True)
+    promotion_type = serializers.ChoiceField(choices=PromotionType.choices)
+    value = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    applies_to_all_products = serializers.BooleanField(required=False, default=False)
+    products = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    categories = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list
+    )
+    collections = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list
+    )
+
+
+class SimulatedBundleItemSerializer(serializers.Serializer):
+    product = serializers.IntegerField(required=False)
+    category = serializers.IntegerField(required=False)
+    collection = serializers.IntegerField(required=False)
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+    def validate(self, attrs):
+        if sum(attrs.get(key) is not None for key in ("product", "category", "collection")) != 1:
+            raise serializers.ValidationError("Set exactly one of product, category or collection.")
+        return attrs
+
+
+class SimulatedBundleSerializer(serializers.Serializer):
+    slug = serializers.SlugField(required=False, allow_blank=True)
+    bundle_price_amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    items = SimulatedBundleItemSerializer(many=True, allow_empty=False)
+
+
+class PromotionSimulationSerializer(serializers.Serializer):
+    date_from = serializers.DateTimeField(required=False)
+    date_to = serializers.DateTimeField(required=False)
+    promotion_ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list
+    )
+    bundle_ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list
+    )
+    promotions = SimulatedPromotionSerializer(many=True, required=False, default=list)
+    bundles = SimulatedBundleSerializer(many=True, required=False, default=list)
+
+    def validate(self, attrs):
+        date_from = attrs.get("date_from")
+        date_to = attrs.get("date_to")
+        if date_from and date_to and date_from > date_to:
+            raise serializers.ValidationError({"date_from": "`date_from` must be <= `date_to`."})
+        if not any(attrs[key] for key in ("promotion_ids", "bundle_ids", "promotions", "bundles")):
+            raise serializers.ValidationError("Provide at least one promotion or bundle.")
+        return attrs
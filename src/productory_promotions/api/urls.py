@@ -1,9 +1,21 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 
-from productory_promotions.api.views import BundleViewSet, PromotionViewSet
+from productory_promotions.api.views import (
+    BundleViewSet,
+    PromotionSimulationView,
+    PromotionViewSet,
+)
 
 router = DefaultRouter()
 router.register("bundles", BundleViewSet, basename="productory-bundle")
 router.register("promotions", PromotionViewSet, basename="productory-promotion")
 
-urlpatterns = router.urls
+urlpatterns = [
+    path(
+        "simulations/",
+        PromotionSimulationView.as_view(),
+        name="productory-promotion-simulations",
+    ),
+    *router.urls,
+]
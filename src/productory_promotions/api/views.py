@@ -1,17 +1,51 @@
 from rest_framework import viewsets
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from productory_promotions.api.serializers import BundleSerializer, PromotionSerializer
+from productory_catalog.generations import CATALOG_GENERATION
+from productory_core.conditional import ConditionalGetMixin
+from productory_promotions.api.serializers import (
+    BundleSerializer,
+    PromotionSerializer,
+    PromotionSimulationSerializer,
+)
 from productory_promotions.models import Bundle, Promotion
+from productory_promotions.rules import RULES_GENERATION
+from productory_promotions.simulation import proposed_rule_set, simulate_promotions
 
 
-class BundleViewSet(viewsets.ModelViewSet):
+class BundleViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    # Product deletes cascade through bundle and promotion relations without rule signals.
+    conditional_generations = (RULES_GENERATION, CATALOG_GENERATION)
     queryset = Bundle.objects.prefetch_related("items")
     serializer_class = BundleSerializer
     permission_classes = [AllowAny]
 
 
-class PromotionViewSet(viewsets.ModelViewSet):
-    queryset = Promotion.objects.prefetch_related("products", "bundles")
+class PromotionViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    conditional_generations = (RULES_GENERATION, CATALOG_GENERATION)
+    queryset = Promotion.objects.prefetch_related(
+        "products", "categories", "collections", "bundles"
+    )
     serializer_class = PromotionSerializer
     permission_classes = [AllowAny]
+
+
+class PromotionSimulationView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = PromotionSimulationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        rules = proposed_rule_set(
+            promotion_ids=data["promotion_ids"],
+            bundle_ids=data["bundle_ids"],
+            promotions=data["promotions"],
+            bundles=data["bundles"],
+        )
+        report = simulate_promotions(
+            rules, date_from=data.get("date_from"), date_to=data.get("date_to")
+        )
+        return Response(report.as_dict())
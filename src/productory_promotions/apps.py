@@ -5,3 +5,6 @@ class ProductoryPromotionsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "productory_promotions"
     verbose_name = "Productory Promotions"
+
+    def ready(self):
+        from productory_promotions import signals  # noqa: F401
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:36
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+from productory_core.models import check_constraint
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productory_checkout', '0007_cart_promotion_code'),
+        ('productory_promotions', '0003_promotion_applies_to_all_products_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='promotion',
+            name='max_redemptions',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='promotion',
+            name='max_redemptions_per_customer',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='promotion',
+            name='requires_code',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddConstraint(
+            model_name='promotion',
+            constraint=check_constraint(condition=models.Q(('requires_code', True), models.Q(('max_redemptions__isnull', True), ('max_redemptions_per_customer__isnull', True)), _connector='OR'), name='productory_promo_caps_need_code'),
+        ),
+        migrations.CreateModel(
+            name='PromotionRedemption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('customer_key', models.CharField(blank=True, max_length=255)),
+                ('discount_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.00'))])),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='promotion_redemptions', to='productory_checkout.order')),
+                ('promotion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='redemptions', to='productory_promotions.promotion')),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PromotionCustomerUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('customer_key', models.CharField(max_length=255)),
+                ('used', models.PositiveIntegerField(default=0)),
+                ('promotion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='customer_usages', to='productory_promotions.promotion')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('promotion', 'customer_key'), name='productory_promo_customer_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PromotionRedemptionShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('capacity', models.PositiveIntegerField(default=0)),
+                ('used', models.PositiveIntegerField(default=0)),
+                ('promotion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='redemption_shards', to='productory_promotions.promotion')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('promotion', 'shard'), name='productory_promo_shard_uniq')],
+            },
+        ),
+    ]
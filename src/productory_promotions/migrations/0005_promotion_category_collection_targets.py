@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from productory_core.models import check_constraint
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productory_catalog', '0003_alter_product_currency'),
+        ('productory_promotions', '0004_promotion_codes_and_redemptions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bundleitem',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bundle_items', to='productory_catalog.category'),
+        ),
+        migrations.AddField(
+            model_name='bundleitem',
+            name='collection',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bundle_items', to='productory_catalog.collection'),
+        ),
+        migrations.AddField(
+            model_name='promotion',
+            name='categories',
+            field=models.ManyToManyField(blank=True, related_name='promotions', to='productory_catalog.category'),
+        ),
+        migrations.AddField(
+            model_name='promotion',
+            name='collections',
+            field=models.ManyToManyField(blank=True, related_name='promotions', to='productory_catalog.collection'),
+        ),
+        migrations.AlterField(
+            model_name='bundleitem',
+            name='product',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bundle_items', to='productory_catalog.product'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='bundleitem',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='bundleitem',
+            constraint=check_constraint(condition=models.Q(models.Q(('category__isnull', True), ('collection__isnull', True), ('product__isnull', False)), models.Q(('category__isnull', False), ('collection__isnull', True), ('product__isnull', True)), models.Q(('category__isnull', True), ('collection__isnull', False), ('product__isnull', True)), _connector='OR'), name='productory_bundle_item_one_target'),
+        ),
+        migrations.AddConstraint(
+            model_name='bundleitem',
+            constraint=models.UniqueConstraint(condition=models.Q(('product__isnull', False)), fields=('bundle', 'product'), name='productory_bundle_item_product_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='bundleitem',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', False)), fields=('bundle', 'category'), name='productory_bundle_item_category_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='bundleitem',
+            constraint=models.UniqueConstraint(condition=models.Q(('collection__isnull', False)), fields=('bundle', 'collection'), name='productory_bundle_item_collection_uniq'),
+        ),
+    ]
@@ -2,13 +2,16 @@ from __future__ import annotations
 
 from decimal import Decimal
 
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import Q
 from django.utils import timezone
 
-from productory_catalog.models import Product
+from productory_catalog.models import Category, Collection, Product
+from productory_checkout.models import Order
 from productory_core.currency import default_currency_code
-from productory_core.models import TimeStampedModel
+from productory_core.models import TimeStampedModel, check_constraint
 from productory_core.validators import validate_active_currency_code
 
 
@@ -36,13 +39,45 @@ class Bundle(TimeStampedModel):
         return super().save(*args, **kwargs)
 
 
+BUNDLE_ITEM_TARGETS = ("product", "category", "collection")
+
+
 class BundleItem(TimeStampedModel):
+    # A slot is filled by one product, or by any product in a category or collection.
     bundle = models.ForeignKey(Bundle, on_delete=models.CASCADE, related_name="items")
-    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="bundle_items")
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="bundle_items", null=True, blank=True
+    )
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, related_name="bundle_items", null=True, blank=True
+    )
+    collection = models.ForeignKey(
+        Collection, on_delete=models.CASCADE, related_name="bundle_items", null=True, blank=True
+    )
     quantity = models.PositiveIntegerField(default=1)
 
     class Meta:
-        unique_together = ("bundle", "product")
+        constraints = [
+            check_constraint(
+                condition=Q(product__isnull=False, category__isnull=True, collection__isnull=True)
+                | Q(product__isnull=True, category__isnull=False, collection__isnull=True)
+                | Q(product__isnull=True, category__isnull=True, collection__isnull=False),
+                name="productory_bundle_item_one_target",
+            ),
+            *[
+                models.UniqueConstraint(
+                    fields=["bundle", target],
+                    condition=Q(**{f"{target}__isnull": False}),
+                    name=f"productory_bundle_item_{target}_uniq",
+                )
+                for target in BUNDLE_ITEM_TARGETS
+            ],
+        ]
+
+    def clean(self):
+        targets = [getattr(self, f"{target}_id") for target in BUNDLE_ITEM_TARGETS]
+        if sum(target is not None for target in targets) != 1:
+            raise ValidationError("Set exactly one of product, category or collection.")
 
 
 class PromotionType(models.TextChoices):
@@ -55,6 +90,8 @@ class Promotion(TimeStampedModel):
     code = models.CharField(max_length=64, unique=True)
     products = models.ManyToManyField(Product, related_name="promotions", blank=True)
     bundles = models.ManyToManyField(Bundle, related_name="promotions", blank=True)
+    categories = models.ManyToManyField(Category, related_name="promotions", blank=True)
+    collections = models.ManyToManyField(Collection, related_name="promotions", blank=True)
     promotion_type = models.CharField(max_length=20, choices=PromotionType.choices)
     value = models.DecimalField(
         max_digits=10,
@@ -62,6 +99,9 @@ class Promotion(TimeStampedModel):
         validators=[MinValueValidator(Decimal("0.00"))],
     )
     applies_to_all_products = models.BooleanField(default=False)
+    requires_code = models.BooleanField(default=False)
+    max_redemptions = models.PositiveIntegerField(null=True, blank=True)
+    max_redemptions_per_customer = models.PositiveIntegerField(null=True, blank=True)
     start_at = models.DateTimeField()
     end_at = models.DateTimeField()
     is_active = models.BooleanField(default=True)
@@ -74,7 +114,63 @@ class Promotion(TimeStampedModel):
                 name="productory_promo_window_idx",
             )
         ]
+        constraints = [
+            # Caps are only enforced when a code is redeemed; automatic promotions have none.
+            check_constraint(
+                condition=Q(requires_code=True)
+                | Q(max_redemptions__isnull=True, max_redemptions_per_customer__isnull=True),
+                name="productory_promo_caps_need_code",
+            )
+        ]
 
     def is_current(self) -> bool:
         now = timezone.now()
         return self.is_active and self.start_at <= now <= self.end_at
+
+
+class PromotionRedemptionShard(models.Model):
+    # The global cap is split across several counter rows so concurrent redemptions of one
+    # code update different rows instead of queueing on a single hot row.
+    promotion = models.ForeignKey(
+        Promotion, on_delete=models.CASCADE, related_name="redemption_shards"
+    )
+    shard = models.PositiveSmallIntegerField()
+    capacity = models.PositiveIntegerField(default=0)
+    used = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["promotion", "shard"], name="productory_promo_shard_uniq"
+            )
+        ]
+
+
+class PromotionCustomerUsage(models.Model):
+    promotion = models.ForeignKey(
+        Promotion, on_delete=models.CASCADE, related_name="customer_usages"
+    )
+    customer_key = models.CharField(max_length=255)
+    used = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["promotion", "customer_key"], name="productory_promo_customer_uniq"
+            )
+        ]
+
+
+class PromotionRedemption(TimeStampedModel):
+    promotion = models.ForeignKey(Promotion, on_delete=models.CASCADE, related_name="redemptions")
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="promotion_redemptions")
+    customer_key = models.CharField(max_length=255, blank=True)
+    discount_amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal("0.00"),
+        validators=[MinValueValidator(Decimal("0.00"))],
+    )
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
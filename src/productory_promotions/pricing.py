@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping, Sequence
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import NamedTuple
+
+from productory_catalog.memberships import ProductMembership
+from productory_promotions.allocation import AllocationBudget, allocate
+from productory_promotions.models import PromotionType
+from productory_promotions.rules import BundleRule, PromotionRule, RuleSet
+
+_ZERO = Decimal("0.00")
+_MONEY_PLACES = Decimal("0.01")
+
+BEST_SINGLE = "best_single"
+ALLOCATE = "allocate"
+
+
+class CartLine(NamedTuple):
+    product_id: int
+    quantity: int
+    unit_price: Decimal
+
+
+@dataclass(frozen=True)
+class PricingResolution:
+    base_subtotal: Decimal
+    discount_amount: Decimal
+    final_total: Decimal
+    rule: str
+    # "promotion", "bundle", "combined" (allocation) or "" when nothing applied.
+    rule_type: str = ""
+    rule_id: int | None = None
+    # ("bundle" | "promotion", id) for every rule in a "combined" allocation.
+    components: tuple[tuple[str, int], ...] = ()
+
+
+# product_id -> (quantity, unit_price)
+_LineMap = Mapping[int, tuple[int, Decimal]]
+_Memberships = Mapping[int, ProductMembership]
+
+
+def _in_group(kind: str, group_id: int, membership: ProductMembership | None) -> bool:
+    if membership is None:
+        return False
+    if kind == "category":
+        return group_id in membership.category_path
+    return group_id in membership.collection_ids
+
+
+def _group_bundle_discount(
+    bundle: BundleRule, cart_lines: _LineMap, memberships: _Memberships
+) -> Decimal:
+    # Named-product slots are reserved first; group slots then take the cheapest remaining
+    # units so the bundle never claims more saving than the customer could be charged.
+    best = _ZERO
+    max_sets = min(
+        (
+            cart_lines.get(product_id, (0, _ZERO))[0] // quantity
+            for product_id, quantity in bundle.items
+        ),
+        default=None,
+    )
+    for kind, group_id, quantity in bundle.group_items:
+        units = sum(
+            line_quantity
+            for product_id, (line_quantity, _) in cart_lines.items()
+            if _in_group(kind, group_id, memberships.get(product_id))
+        )
+        group_sets = units // quantity
+        max_sets = group_sets if max_sets is None else min(max_sets, group_sets)
+
+    for sets in range(max_sets or 0, 0, -1):
+        remaining = {product_id: line[0] for product_id, line in cart_lines.items()}
+        regular_total = _ZERO
+        for product_id, quantity in bundle.items:
+            remaining[product_id] -= quantity * sets
+            regular_total += cart_lines[product_id][1] * quantity * sets
+        feasible = True
+        for kind, group_id, quantity in bundle.group_items:
+            needed = quantity * sets
+            eligible = sorted(
+                (
+                    (cart_lines[product_id][1], product_id)
+                    for product_id, available in remaining.items()
+                    if available > 0 and _in_group(kind, group_id, memberships.get(product_id))
+                ),
+            )
+            for unit_price, product_id in eligible:
+                taken = min(needed, remaining[product_id])
+                remaining[product_id] -= taken
+                regular_total += unit_price * taken
+                needed -= taken
+                if not needed:
+                    break
+            if needed:
+                feasible = False
+                break
+        if feasible:
+            best = max(best, regular_total - bundle.price_amount * sets)
+    return best
+
+
+def _bundle_discount(
+    cart_lines: _LineMap, rules: RuleSet, memberships: _Memberships | None = None
+) -> tuple[Decimal, str, int | None]:
+    best_discount = _ZERO
+    best_rule = ""
+    best_id = None
+
+    # Only bundles referencing a product in the cart can possibly match.
+    for position in rules.candidate_bundles(cart_lines, memberships):
+        bundle = rules.bundles[position]
+        if bundle.group_items:
+            discount = _group_bundle_discount(bundle, cart_lines, memberships or {})
+            if discount > best_discount:
+                best_discount = discount
+                best_rule = f"bundle:{bundle.slug}"
+                best_id = bundle.id
+            continue
+
+        set_counts: list[int] = []
+        regular_set_total = _ZERO
+        for product_id, bundle_quantity in bundle.items:
+            line = cart_lines.get(product_id)
+            if not line:
+                set_counts = []
+                break
+            quantity, unit_price = line
+            set_counts.append(quantity // bundle_quantity)
+            regular_set_total += unit_price * bundle_quantity
+
+        if not set_counts:
+            continue
+
+        bundle_sets = min(set_counts)
+        if bundle_sets < 1:
+            continue
+
+        standard_price = regular_set_total * bundle_sets
+        bundle_price = bundle.price_amount * bundle_sets
+        discount = standard_price - bundle_price
+
+        if discount > best_discount:
+            best_discount = discount
+            best_rule = f"bundle:{bundle.slug}"
+            best_id = bundle.id
+
+    return best_discount, best_rule, best_id
+
+
+def _promotion_discount(
+    cart_lines: _LineMap,
+    rules: RuleSet,
+    cart_subtotal: Decimal,
+    promotion_code: str = "",
+    memberships: _Memberships | None = None,
+) -> tuple[Decimal, str, int | None]:
+    best_discount = _ZERO
+    best_rule = ""
+    best_id = None
+
+    # Accumulate eligible subtotals by walking cart lines through the inverted index.
+    eligible: dict[int, Decimal] = dict.fromkeys(rules.storewide_promotions, cart_subtotal)
+    for product_id, (quantity, unit_price) in cart_lines.items():
+        membership = memberships.get(product_id) if memberships else None
+        for position in rules.line_promotions(product_id, membership):
+            eligible[position] = eligible.get(position, _ZERO) + quantity * unit_price
+
+    for position in sorted(eligible):
+        promo = rules.promotions[position]
+        eligible_subtotal = eligible[position]
+        if eligible_subtotal <= _ZERO or not promo.is_available(promotion_code):
+            continue
+
+        if promo.promotion_type == PromotionType.PERCENTAGE:
+            discount = (eligible_subtotal * promo.value / Decimal("100")).quantize(_MONEY_PLACES)
+        else:
+            discount = min(promo.value, eligible_subtotal)
+
+        if discount > best_discount:
+            best_discount = discount
+            best_rule = f"promotion:{promo.code}"
+            best_id = promo.id
+
+    return best_discount, best_rule, best_id
+
+
+def _unit_discount(promo: PromotionRule, unit_price: Decimal) -> Decimal:
+    if promo.promotion_type == PromotionType.PERCENTAGE:
+        return (unit_price * promo.value / Decimal("100")).quantize(_MONEY_PLACES)
+    return min(promo.value, unit_price)
+
+
+def unit_prices(
+    products: Iterable[tuple[int, Decimal]],
+    rules: RuleSet,
+    *,
+    memberships: _Memberships | None = None,
+) -> dict[int, tuple[Decimal, PromotionRule | None]]:
+    # Price of one unit bought on its own: the best promotion that needs no code. Bundles
+    # are left out, a single unit cannot complete one.
+    storewide = [
+        rules.promotions[position]
+        for position in rules.storewide_promotions
+        if not rules.promotions[position].requires_code
+    ]
+    prices: dict[int, tuple[Decimal, PromotionRule | None]] = {}
+    for product_id, unit_price in products:
+        membership = memberships.get(product_id) if memberships else None
+        candidates = storewide + [
+            rules.promotions[position]
+            for position in sorted(rules.line_promotions(product_id, membership))
+            if not rules.promotions[position].requires_code
+        ]
+        best_discount = _ZERO
+        best_rule = None
+        for promo in candidates:
+            discount = _unit_discount(promo, unit_price)
+            if discount > best_discount:
+                best_discount = discount
+                best_rule = promo
+        prices[product_id] = (unit_price - best_discount, best_rule)
+    return prices
+
+
+def price_lines(
+    lines: Iterable[tuple[int, int, Decimal]],
+    rules: RuleSet,
+    *,
+    base_subtotal: Decimal | None = None,
+    promotion_code: str = "",
+    strategy: str = BEST_SINGLE,
+    budget: AllocationBudget | None = None,
+    memberships: _Memberships | None = None,
+) -> PricingResolution:
+    cart_lines: dict[int, tuple[int, Decimal]] = {
+        product_id: (quantity, unit_price) for product_id, quantity, unit_price in lines
+    }
+    cart_subtotal = sum(
+        (quantity * unit_price for quantity, unit_price in cart_lines.values()), _ZERO
+    )
+    resolved_subtotal = base_subtotal if base_subtotal is not None else cart_subtotal
+
+    bundle_discount, bundle_rule, bundle_id = _bundle_discount(cart_lines, rules, memberships)
+    promo_discount, promo_rule, promo_id = _promotion_discount(
+        cart_lines, rules, cart_subtotal, promotion_code, memberships
+    )
+
+    discount = bundle_discount
+    rule = bundle_rule
+    rule_type, rule_id = ("bundle", bundle_id) if bundle_rule else ("", None)
+    components: tuple[tuple[str, int], ...] = ()
+    if promo_discount > bundle_discount:
+        discount = promo_discount
+        rule = promo_rule
+        rule_type, rule_id = "promotion", promo_id
+
+    if strategy == ALLOCATE:
+        allocation = allocate(
+            cart_lines,
+            rules,
+            budget=budget,
+            promotion_code=promotion_code,
+            memberships=memberships,
+        )
+        # The single best rule is always a valid allocation, so never do worse than it.
+        if allocation.discount > discount:
+            discount = allocation.discount
+            rule = allocation.describe(rules)
+            rule_type, rule_id = "combined", None
+            components = allocation.components(rules)
+
+    final_total = (resolved_subtotal - discount).quantize(_MONEY_PLACES)
+    if final_total < _ZERO:
+        final_total = _ZERO
+
+    return PricingResolution(
+        base_subtotal=resolved_subtotal,
+        discount_amount=discount,
+        final_total=final_total,
+        rule=rule or "none",
+        rule_type=rule_type,
+        rule_id=rule_id,
+        components=components,
+    )
+
+
+def price_many(
+    carts_lines: Iterable[Sequence[tuple[int, int, Decimal]]],
+    rules: RuleSet,
+    *,
+    promotion_codes: Sequence[str] | None = None,
+    strategy: str = BEST_SINGLE,
+    budget: AllocationBudget | None = None,
+    memberships: _Memberships | None = None,
+) -> list[PricingResolution]:
+    carts_lines = list(carts_lines)
+    codes = promotion_codes if promotion_codes is not None else [""] * len(carts_lines)
+    return [
+        price_lines(
+            lines,
+            rules,
+            promotion_code=code,
+            strategy=strategy,
+            budget=budget,
+            memberships=memberships,
+        )
+        for lines, code in zip(carts_lines, codes, strict=True)
+    ]
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import random
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from productory_checkout.models import AppliedRuleType, Cart, Order
+from productory_core.conf import get_setting
+from productory_promotions.models import (
+    Promotion,
+    PromotionCustomerUsage,
+    PromotionRedemption,
+    PromotionRedemptionShard,
+)
+
+
+class PromotionCodeError(ValueError):
+    pass
+
+
+class PromotionCodeExhausted(PromotionCodeError):
+    pass
+
+
+def customer_key(*, customer_id: int | None = None, email: str = "") -> str:
+    if customer_id:
+        return f"user:{customer_id}"
+    if email:
+        return f"email:{email.strip().lower()}"
+    return ""
+
+
+def get_code_promotion(code: str) -> Promotion:
+    now = timezone.now()
+    promotion = (
+        Promotion.objects.filter(
+            code__iexact=code.strip(), is_active=True, start_at__lte=now, end_at__gte=now
+        )
+        .only("id", "code", "max_redemptions", "max_redemptions_per_customer")
+        .first()
+    )
+    if promotion is None:
+        raise PromotionCodeError("Unknown or expired promotion code.")
+    return promotion
+
+
+def validate_promotion_code(code: str, *, customer: str = "") -> Promotion:
+    # Advisory check when a code is entered; the authoritative check happens on redemption.
+    promotion = get_code_promotion(code)
+    if promotion.max_redemptions is not None:
+        remaining = PromotionRedemptionShard.objects.filter(promotion=promotion).aggregate(
+            remaining=Sum(F("capacity") - F("used"))
+        )["remaining"]
+        if remaining is not None and remaining <= 0:
+            raise PromotionCodeExhausted("This promotion code has reached its redemption limit.")
+    limit = promotion.max_redemptions_per_customer
+    if limit is not None and customer:
+        used = (
+            PromotionCustomerUsage.objects.filter(promotion=promotion, customer_key=customer)
+            .values_list("used", flat=True)
+            .first()
+        )
+        if (used or 0) >= limit:
+            raise PromotionCodeExhausted("This promotion code has already been used.")
+    return promotion
+
+
+@transaction.atomic
+def ensure_redemption_shards(promotion: Promotion) -> None:
+    if promotion.max_redemptions is None:
+        return
+
+    shards = {
+        shard.shard: shard
+        for shard in PromotionRedemptionShard.objects.select_for_update().filter(
+            promotion=promotion
+        )
+    }
+    shard_count = max(
+        1, min(int(get_setting("PROMOTION_REDEMPTION_SHARDS")), promotion.max_redemptions)
+    )
+    # Spread only what is left so lowering the cap never re-opens already used slots.
+    remaining = max(promotion.max_redemptions - sum(s.used for s in shards.values()), 0)
+    share, extra = divmod(remaining, shard_count)
+
+    to_create: list[PromotionRedemptionShard] = []
+    for number in range(max(shard_count, len(shards))):
+        allowance = share + (1 if number < extra else 0) if number < shard_count else 0
+        shard = shards.get(number)
+        if shard is None:
+            to_create.append(
+                PromotionRedemptionShard(promotion=promotion, shard=number, capacity=allowance)
+            )
+        else:
+            shard.capacity = shard.used + allowance
+    if shards:
+        PromotionRedemptionShard.objects.bulk_update(shards.values(), ["capacity"])
+    if to_create:
+        PromotionRedemptionShard.objects.bulk_create(to_create)
+
+
+def _open_shards(promotion: Promotion) -> list[int]:
+    return list(
+        PromotionRedemptionShard.objects.filter(
+            promotion=promotion, used__lt=F("capacity")
+        ).values_list("shard", flat=True)
+    )
+
+
+def _claim_global_slot(promotion: Promotion) -> None:
+    open_shards = _open_shards(promotion)
+    if not open_shards and not promotion.redemption_shards.exists():
+        # Cap set without going through save() (e.g. a queryset update).
+        ensure_redemption_shards(promotion)
+        open_shards = _open_shards(promotion)
+    # Random order spreads concurrent checkouts across rows; the conditional UPDATE is the
+    # authoritative check, so a shard filling up between the read and the write is fine.
+    random.shuffle(open_shards)
+    for number in open_shards:
+        claimed = PromotionRedemptionShard.objects.filter(
+            promotion=promotion, shard=number, used__lt=F("capacity")
+        ).update(used=F("used") + 1)
+        if claimed:
+            return
+    raise PromotionCodeExhausted("This promotion code has reached its redemption limit.")
+
+
+def _claim_customer_slot(promotion: Promotion, customer: str) -> None:
+    limit = promotion.max_redemptions_per_customer
+    if limit is None:
+        return
+    if not customer:
+        raise PromotionCodeError("This promotion code requires a customer or email address.")
+
+    usages = PromotionCustomerUsage.objects.filter(promotion=promotion, customer_key=customer)
+    if usages.filter(used__lt=limit).update(used=F("used") + 1):
+        return
+    if limit > 0 and not usages.exists():
+        try:
+            with transaction.atomic():
+                PromotionCustomerUsage.objects.create(
+                    promotion=promotion, customer_key=customer, used=1
+                )
+            return
+        except IntegrityError:
+            # Another checkout created the row first; retry as an update.
+            if usages.filter(used__lt=limit).update(used=F("used") + 1):
+                return
+    raise PromotionCodeExhausted("This promotion code has already been used.")
+
+
+@transaction.atomic
+def claim_redemption(promotion: Promotion, *, customer: str = "") -> None:
+    _claim_customer_slot(promotion, customer)
+    if promotion.max_redemptions is not None:
+        _claim_global_slot(promotion)
+
+
+def _priced_promotion_ids(cart: Cart) -> set[int]:
+    if cart.applied_rule_type == AppliedRuleType.PROMOTION:
+        return {cart.applied_rule_id} if cart.applied_rule_id is not None else set()
+    return {
+        rule_id
+        for rule_type, rule_id in cart.applied_rule_components
+        if rule_type == AppliedRuleType.PROMOTION
+    }
+
+
+def redeem_cart_promotion_code(cart: Cart, order: Order) -> PromotionRedemption | None:
+    if not cart.promotion_code:
+        return None
+
+    # Only count a redemption when the code priced the stored totals the order was created from.
+    promotion = (
+        Promotion.objects.filter(
+            id__in=_priced_promotion_ids(cart), code__iexact=cart.promotion_code
+        )
+        .only("id", "code", "max_redemptions", "max_redemptions_per_customer")
+        .first()
+    )
+    if promotion is None:
+        return None
+
+    customer = customer_key(customer_id=order.customer_id, email=order.email)
+    claim_redemption(promotion, customer=customer)
+    return PromotionRedemption.objects.create(
+        promotion=promotion,
+        order=order,
+        customer_key=customer,
+        discount_amount=order.discount_amount,
+    )
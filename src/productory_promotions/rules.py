@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal
+from threading import Lock
+
+from django.utils import timezone
+
+from productory_catalog.memberships import ProductMembership
+from productory_core.generations import get_generation
+from productory_promotions.models import Bundle, BundleItem, Promotion
+
+RULES_GENERATION = "promotions"
+
+
+@dataclass(frozen=True)
+class BundleRule:
+    id: int
+    slug: str
+    price_amount: Decimal
+    items: tuple[tuple[int, int], ...]
+    # Slots filled by any product of a group: (kind, group_id, quantity), kind being
+    # "category" or "collection".
+    group_items: tuple[tuple[str, int, int], ...] = ()
+
+
+@dataclass(frozen=True)
+class PromotionRule:
+    id: int
+    code: str
+    promotion_type: str
+    value: Decimal
+    applies_to_all_products: bool
+    product_ids: frozenset[int]
+    requires_code: bool = False
+    category_ids: frozenset[int] = frozenset()
+    collection_ids: frozenset[int] = frozenset()
+
+    def is_available(self, promotion_code: str) -> bool:
+        return not self.requires_code or self.code == promotion_code
+
+    def targets(self, product_id: int, membership: ProductMembership | None = None) -> bool:
+        if self.applies_to_all_products or product_id in self.product_ids:
+            return True
+        if membership is None:
+            return False
+        return not self.category_ids.isdisjoint(
+            membership.category_path
+        ) or not self.collection_ids.isdisjoint(membership.collection_ids)
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    bundles: tuple[BundleRule, ...]
+    promotions: tuple[PromotionRule, ...]
+    generation: int = 0
+    expires_at: datetime | None = None
+    # Inverted indexes: product_id -> positions in ``bundles`` / ``promotions``.
+    bundles_by_product: Mapping[int, tuple[int, ...]] = field(default_factory=dict)
+    promotions_by_product: Mapping[int, tuple[int, ...]] = field(default_factory=dict)
+    storewide_promotions: tuple[int, ...] = ()
+    bundles_by_category: Mapping[int, tuple[int, ...]] = field(default_factory=dict)
+    bundles_by_collection: Mapping[int, tuple[int, ...]] = field(default_factory=dict)
+    promotions_by_category: Mapping[int, tuple[int, ...]] = field(default_factory=dict)
+    promotions_by_collection: Mapping[int, tuple[int, ...]] = field(default_factory=dict)
+
+    @property
+    def uses_memberships(self) -> bool:
+        return bool(
+            self.bundles_by_category
+            or self.bundles_by_collection
+            or self.promotions_by_category
+            or self.promotions_by_collection
+        )
+
+    def is_fresh(self, generation: int, now: datetime) -> bool:
+        if generation != self.generation:
+            return False
+        return self.expires_at is None or now < self.expires_at
+
+    def candidate_bundles(
+        self,
+        product_ids: Iterable[int],
+        memberships: Mapping[int, ProductMembership] | None = None,
+    ) -> list[int]:
+        candidates: set[int] = set()
+        for product_id in product_ids:
+            candidates.update(self.bundles_by_product.get(product_id, ()))
+            membership = memberships.get(product_id) if memberships else None
+            if membership is not None:
+                for category_id in membership.category_path:
+                    candidates.update(self.bundles_by_category.get(category_id, ()))
+                for collection_id in membership.collection_ids:
+                    candidates.update(self.bundles_by_collection.get(collection_id, ()))
+        return sorted(candidates)
+
+    def line_promotions(
+        self, product_id: int, membership: ProductMembership | None = None
+    ) -> set[int]:
+        # Scoped promotions for one line; a line matching several targets still counts once.
+        positions = set(self.promotions_by_product.get(product_id, ()))
+        if membership is not None:
+            for category_id in membership.category_path:
+                positions.update(self.promotions_by_category.get(category_id, ()))
+            for collection_id in membership.collection_ids:
+                positions.update(self.promotions_by_collection.get(collection_id, ()))
+        return positions
+
+
+def build_rule_set(
+    bundles: Iterable[BundleRule],
+    promotions: Iterable[PromotionRule],
+    *,
+    generation: int = 0,
+    expires_at: datetime | None = None,
+) -> RuleSet:
+    bundles = tuple(bundles)
+    promotions = tuple(promotions)
+
+    bundles_by_product: dict[int, list[int]] = {}
+    bundles_by_group: dict[str, dict[int, list[int]]] = {"category": {}, "collection": {}}
+    for position, bundle in enumerate(bundles):
+        for product_id, _ in bundle.items:
+            bundles_by_product.setdefault(product_id, []).append(position)
+        for kind, group_id, _ in bundle.group_items:
+            index = bundles_by_group[kind].setdefault(group_id, [])
+            if position not in index:
+                index.append(position)
+
+    promotions_by_product: dict[int, list[int]] = {}
+    promotions_by_category: dict[int, list[int]] = {}
+    promotions_by_collection: dict[int, list[int]] = {}
+    storewide: list[int] = []
+    for position, promo in enumerate(promotions):
+        if promo.applies_to_all_products:
+            storewide.append(position)
+            continue
+        for product_id in promo.product_ids:
+            promotions_by_product.setdefault(product_id, []).append(position)
+        for category_id in promo.category_ids:
+            promotions_by_category.setdefault(category_id, []).append(position)
+        for collection_id in promo.collection_ids:
+            promotions_by_collection.setdefault(collection_id, []).append(position)
+
+    def _freeze(index: dict[int, list[int]]) -> dict[int, tuple[int, ...]]:
+        return {key: tuple(value) for key, value in index.items()}
+
+    return RuleSet(
+        bundles=bundles,
+        promotions=promotions,
+        generation=generation,
+        expires_at=expires_at,
+        bundles_by_product=_freeze(bundles_by_product),
+        promotions_by_product=_freeze(promotions_by_product),
+        storewide_promotions=tuple(storewide),
+        bundles_by_category=_freeze(bundles_by_group["category"]),
+        bundles_by_collection=_freeze(bundles_by_group["collection"]),
+        promotions_by_category=_freeze(promotions_by_category),
+        promotions_by_collection=_freeze(promotions_by_collection),
+    )
+
+
+_compiled: RuleSet | None = None
+_compile_lock = Lock()
+
+
+def compile_rules(*, now: datetime | None = None, generation: int = 0) -> RuleSet:
+    now = now or timezone.now()
+
+    bundle_items: dict[int, list[tuple[int, int]]] = {}
+    bundle_group_items: dict[int, list[tuple[str, int, int]]] = {}
+    for bundle_id, product_id, category_id, collection_id, quantity in (
+        BundleItem.objects.filter(bundle__is_active=True)
+        .order_by("id")
+        .values_list("bundle_id", "product_id", "category_id", "collection_id", "quantity")
+    ):
+        if product_id is not None:
+            bundle_items.setdefault(bundle_id, []).append((product_id, quantity))
+        elif category_id is not None:
+            bundle_group_items.setdefault(bundle_id, []).append(("category", category_id, quantity))
+        elif collection_id is not None:
+            bundle_group_items.setdefault(bundle_id, []).append(
+                ("collection", collection_id, quantity)
+            )
+    bundles = tuple(
+        BundleRule(
+            id=bundle_id,
+            slug=slug,
+            price_amount=price_amount,
+            items=tuple(bundle_items.get(bundle_id, ())),
+            group_items=tuple(bundle_group_items.get(bundle_id, ())),
+        )
+        for bundle_id, slug, price_amount in Bundle.objects.filter(is_active=True).values_list(
+            "id", "slug", "bundle_price_amount"
+        )
+    )
+
+    current: list[Promotion] = []
+    boundaries: list[datetime] = []
+    # Upcoming promotions are loaded only to know when the compiled set goes stale.
+    for promo in Promotion.objects.filter(is_active=True, end_at__gte=now).only(
+        "id",
+        "code",
+        "promotion_type",
+        "value",
+        "applies_to_all_products",
+        "requires_code",
+        "start_at",
+        "end_at",
+    ):
+        if promo.start_at <= now:
+            current.append(promo)
+            boundaries.append(promo.end_at + timedelta(microseconds=1))
+        else:
+            boundaries.append(promo.start_at)
+
+    scoped_ids = [promo.id for promo in current if not promo.applies_to_all_products]
+    targets: dict[str, dict[int, set[int]]] = {}
+    for relation, column in (
+        ("products", "product_id"),
+        ("categories", "category_id"),
+        ("collections", "collection_id"),
+    ):
+        targets[relation] = {promo.id: set() for promo in current}
+        if not scoped_ids:
+            continue
+        through = getattr(Promotion, relation).through
+        for promotion_id, target_id in through.objects.filter(
+            promotion_id__in=scoped_ids
+        ).values_list("promotion_id", column):
+            targets[relation][promotion_id].add(target_id)
+
+    promotions = tuple(
+        PromotionRule(
+            id=promo.id,
+            code=promo.code,
+            promotion_type=promo.promotion_type,
+            value=promo.value,
+            applies_to_all_products=promo.applies_to_all_products,
+            product_ids=frozenset(targets["products"][promo.id]),
+            requires_code=promo.requires_code,
+            category_ids=frozenset(targets["categories"][promo.id]),
+            collection_ids=frozenset(targets["collections"][promo.id]),
+        )
+        for promo in current
+    )
+    return build_rule_set(
+        bundles,
+        promotions,
+        generation=generation,
+        expires_at=min(boundaries) if boundaries else None,
+    )
+
+
+def get_rule_set() -> RuleSet:
+    global _compiled
+
+    now = timezone.now()
+    generation = get_generation(RULES_GENERATION)
+    compiled = _compiled
+    if compiled is not None and compiled.is_fresh(generation, now):
+        return compiled
+
+    with _compile_lock:
+        compiled = _compiled
+        if compiled is None or not compiled.is_fresh(generation, now):
+            compiled = compile_rules(now=now, generation=generation)
+            _compiled = compiled
+    return compiled
@@ -1,119 +1,172 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections.abc import Iterable, Sequence
 from decimal import Decimal
 
-from django.db.models import Prefetch
-from django.utils import timezone
+from django.db.models import Q
 
+from productory_catalog.memberships import (
+    ProductMembership,
+    category_path_ids,
+    get_product_memberships,
+)
+from productory_catalog.models import Category, Product
 from productory_checkout.models import Cart
-from productory_promotions.models import Bundle, Promotion, PromotionType
-
+from productory_core.conf import get_setting
+from productory_promotions.allocation import AllocationBudget
+from productory_promotions.models import BundleItem, Promotion
+from productory_promotions.pricing import (
+    CartLine,
+    PricingResolution,
+    price_lines,
+    price_many,
+    unit_prices,
+)
+from productory_promotions.rules import RuleSet, get_rule_set
+
+
+def _pricing_strategy() -> tuple[str, AllocationBudget]:
+    budget = AllocationBudget(
+        max_nodes=int(get_setting("PRICING_ALLOCATION_MAX_NODES")),
+        max_seconds=int(get_setting("PRICING_ALLOCATION_MAX_MS")) / 1000,
+    )
+    return str(get_setting("PRICING_STRATEGY")), budget
 
-@dataclass(frozen=True)
-class PricingResolution:
-    base_subtotal: Decimal
-    discount_amount: Decimal
-    final_total: Decimal
-    rule: str
 
+def _memberships(
+    rules: RuleSet, carts_lines: Sequence[Sequence[tuple[int, int, Decimal]]]
+) -> dict[int, ProductMembership] | None:
+    # Category/collection lookups are only paid for when a live rule targets a group.
+    if not rules.uses_memberships:
+        return None
+    return get_product_memberships(
+        product_id for lines in carts_lines for product_id, _, _ in lines
+    )
 
-def _bundle_discount(cart: Cart) -> tuple[Decimal, str]:
-    cart_items = {item.product_id: item for item in cart.items.select_related("product")}
-    best_discount = Decimal("0.00")
-    best_rule = ""
 
-    bundles = Bundle.objects.filter(is_active=True).prefetch_related(
-        Prefetch("items", to_attr="bundle_items")
+def resolve_line_pricing(
+    lines: Iterable[tuple[int, int, Decimal]],
+    *,
+    base_subtotal: Decimal | None = None,
+    promotion_code: str = "",
+    rules: RuleSet | None = None,
+) -> PricingResolution:
+    if rules is None:
+        rules = get_rule_set()
+    lines = list(lines)
+    strategy, budget = _pricing_strategy()
+    return price_lines(
+        lines,
+        rules,
+        base_subtotal=base_subtotal,
+        promotion_code=promotion_code,
+        strategy=strategy,
+        budget=budget,
+        memberships=_memberships(rules, [lines]),
     )
 
-    for bundle in bundles:
-        set_counts: list[int] = []
-        regular_set_total = Decimal("0.00")
-        for bundle_item in bundle.bundle_items:
-            cart_item = cart_items.get(bundle_item.product_id)
-            if not cart_item:
-                set_counts = []
-                break
-            set_counts.append(cart_item.quantity // bundle_item.quantity)
-            regular_set_total += cart_item.unit_price_snapshot * bundle_item.quantity
-
-        if not set_counts:
-            continue
-
-        bundle_sets = min(set_counts)
-        if bundle_sets < 1:
-            continue
-
-        standard_price = regular_set_total * bundle_sets
-        bundle_price = bundle.bundle_price_amount * bundle_sets
-        discount = standard_price - bundle_price
-
-        if discount > best_discount:
-            best_discount = discount
-            best_rule = f"bundle:{bundle.slug}"
-
-    return best_discount, best_rule
-
-
-def _promotion_discount(cart: Cart) -> tuple[Decimal, str]:
-    now = timezone.now()
-    cart_items = {item.product_id: item for item in cart.items.select_related("product")}
-    cart_subtotal = sum(item.quantity * item.unit_price_snapshot for item in cart_items.values())
-    best_discount = Decimal("0.00")
-    best_rule = ""
-
-    promotions = Promotion.objects.filter(
-        is_active=True,
-        start_at__lte=now,
-        end_at__gte=now,
-    ).prefetch_related("products")
-
-    for promo in promotions:
-        if promo.applies_to_all_products:
-            eligible_subtotal = cart_subtotal
-        else:
-            eligible_subtotal = Decimal("0.00")
-            for product in promo.products.all():
-                item = cart_items.get(product.id)
-                if not item:
-                    continue
-                eligible_subtotal += item.quantity * item.unit_price_snapshot
-
-        if eligible_subtotal <= Decimal("0.00"):
-            continue
-
-        if promo.promotion_type == PromotionType.PERCENTAGE:
-            discount = (eligible_subtotal * promo.value / Decimal("100")).quantize(Decimal("0.01"))
-        else:
-            discount = min(promo.value, eligible_subtotal)
-
-        if discount > best_discount:
-            best_discount = discount
-            best_rule = f"promotion:{promo.code}"
-
-    return best_discount, best_rule
+
+def resolve_many(
+    carts_lines: Iterable[Sequence[tuple[int, int, Decimal]]],
+    *,
+    promotion_codes: Sequence[str] | None = None,
+    rules: RuleSet | None = None,
+) -> list[PricingResolution]:
+    if rules is None:
+        rules = get_rule_set()
+    carts_lines = list(carts_lines)
+    strategy, budget = _pricing_strategy()
+    return price_many(
+        carts_lines,
+        rules,
+        promotion_codes=promotion_codes,
+        strategy=strategy,
+        budget=budget,
+        memberships=_memberships(rules, carts_lines),
+    )
 
 
 def resolve_cart_pricing(cart: Cart, *, base_subtotal: Decimal | None = None) -> PricingResolution:
     resolved_subtotal = base_subtotal if base_subtotal is not None else cart.subtotal_amount
+    lines = [
+        CartLine(*row)
+        for row in cart.items.values_list("product_id", "quantity", "unit_price_snapshot")
+    ]
+    return resolve_line_pricing(
+        lines, base_subtotal=resolved_subtotal, promotion_code=cart.promotion_code
+    )
 
-    bundle_discount, bundle_rule = _bundle_discount(cart)
-    promo_discount, promo_rule = _promotion_discount(cart)
-
-    discount = bundle_discount
-    rule = bundle_rule
-    if promo_discount > bundle_discount:
-        discount = promo_discount
-        rule = promo_rule
 
-    final_total = (resolved_subtotal - discount).quantize(Decimal("0.01"))
-    if final_total < Decimal("0.00"):
-        final_total = Decimal("0.00")
+def resolve_product_prices(
+    products: Sequence[Product], *, rules: RuleSet | None = None
+) -> dict[int, tuple[Decimal, str]]:
+    # Expects ``category`` selected and ``collections`` prefetched when group rules are live; no
+    # per-product queries.
+    if rules is None:
+        rules = get_rule_set()
+    memberships = None
+    if rules.uses_memberships:
+        memberships = {
+            product.id: ProductMembership(
+                product.category_id,
+                frozenset(collection.id for collection in product.collections.all()),
+                category_path_ids(product.category.path, product.category_id),
+            )
+            for product in products
+        }
+    prices = unit_prices(
+        ((product.id, product.price_amount) for product in products),
+        rules,
+        memberships=memberships,
+    )
+    return {
+        product_id: (price, promo.code if promo is not None else "")
+        for product_id, (price, promo) in prices.items()
+    }
+
+
+def rule_product_ids(
+    *, promotion_ids: Iterable[int] = (), bundle_ids: Iterable[int] = ()
+) -> set[int] | None:
+    # ``None`` means a storewide promotion is involved and every cart is affected.
+    promotion_ids = list(promotion_ids)
+    if Promotion.objects.filter(id__in=promotion_ids, applies_to_all_products=True).exists():
+        return None
+    product_ids = set(
+        Promotion.products.through.objects.filter(promotion_id__in=promotion_ids).values_list(
+            "product_id", flat=True
+        )
+    )
+    bundle_ids = list(bundle_ids)
+    bundle_items = BundleItem.objects.filter(bundle_id__in=bundle_ids)
+    product_ids.update(
+        bundle_items.filter(product__isnull=False).values_list("product_id", flat=True)
+    )
 
-    return PricingResolution(
-        base_subtotal=resolved_subtotal,
-        discount_amount=discount,
-        final_total=final_total,
-        rule=rule or "none",
+    category_ids = set(
+        Promotion.categories.through.objects.filter(promotion_id__in=promotion_ids).values_list(
+            "category_id", flat=True
+        )
+    )
+    category_ids.update(
+        bundle_items.filter(category__isnull=False).values_list("category_id", flat=True)
+    )
+    collection_ids = set(
+        Promotion.collections.through.objects.filter(promotion_id__in=promotion_ids).values_list(
+            "collection_id", flat=True
+        )
+    )
+    collection_ids.update(
+        bundle_items.filter(collection__isnull=False).values_list("collection_id", flat=True)
     )
+    if category_ids or collection_ids:
+        # Category targets cover their subtrees; one path-prefix test per targeted category.
+        in_trees = Q(pk__in=[])
+        for path in Category.objects.filter(id__in=category_ids).values_list("path", flat=True):
+            in_trees |= Q(category__path__startswith=path)
+        product_ids.update(
+            Product.objects.filter(in_trees | Q(collections__in=collection_ids)).values_list(
+                "id", flat=True
+            )
+        )
+    return product_ids
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from productory_core.generations import publish_generation
+from productory_promotions.models import Bundle, BundleItem, Promotion
+from productory_promotions.rules import RULES_GENERATION
+
+
+def invalidate_rule_set() -> None:
+    publish_generation(RULES_GENERATION)
+
+
+@receiver(post_save, sender=Bundle)
+@receiver(post_save, sender=BundleItem)
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=Bundle)
+@receiver(post_delete, sender=BundleItem)
+@receiver(post_delete, sender=Promotion)
+def invalidate_on_rule_change(sender, **kwargs):
+    invalidate_rule_set()
+
+
+@receiver(post_save, sender=Promotion)
+def sync_redemption_shards(sender, instance, raw=False, **kwargs):
+    if raw or instance.max_redemptions is None:
+        return
+    from productory_promotions.redemptions import ensure_redemption_shards
+
+    ensure_redemption_shards(instance)
+
+
+@receiver(m2m_changed, sender=Promotion.products.through)
+@receiver(m2m_changed, sender=Promotion.categories.through)
+@receiver(m2m_changed, sender=Promotion.collections.through)
+@receiver(m2m_changed, sender=Promotion.bundles.through)
+def invalidate_on_rule_relation_change(sender, action, **kwargs):
+    if action in {"post_add", "post_remove", "post_clear"}:
+        invalidate_rule_set()
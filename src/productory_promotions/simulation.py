@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import time
+from collections import Counter
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Any
+
+from django.db.models import Sum
+
+from productory_checkout.models import Order, OrderItem
+from productory_core.workers import process_pool
+from productory_promotions.models import Bundle, BundleItem, Promotion
+from productory_promotions.rules import BundleRule, PromotionRule, RuleSet, build_rule_set
+from productory_promotions.services import resolve_many
+
+_ZERO = Decimal("0.00")
+SIMULATED_ORDER_STATUSES: tuple[str, ...] = ("submitted", "paid", "fulfilled")
+
+
+@dataclass(frozen=True)
+class SimulationReport:
+    orders_scanned: int
+    orders_affected: int
+    discount_total: Decimal
+    actual_discount_total: Decimal
+    rule_hits: dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "orders_scanned": self.orders_scanned,
+            "orders_affected": self.orders_affected,
+            "discount_total": str(self.discount_total),
+            "actual_discount_total": str(self.actual_discount_total),
+            "rule_hits": self.rule_hits,
+            "seconds": round(self.seconds, 3),
+        }
+
+
+def _group_item(spec: Mapping[str, Any]) -> tuple[str, int, int] | None:
+    for kind in ("category", "collection"):
+        if spec.get(kind) is not None:
+            return kind, int(spec[kind]), int(spec.get("quantity", 1))
+    return None
+
+
+def proposed_rule_set(
+    *,
+    promotion_ids: Iterable[int] = (),
+    bundle_ids: Iterable[int] = (),
+    promotions: Iterable[Mapping[str, Any]] = (),
+    bundles: Iterable[Mapping[str, Any]] = (),
+) -> RuleSet:
+    # Stored rules are replayed regardless of status or schedule, and code-gated promotions are
+    # treated as used by every eligible order, so the projection is an upper bound.
+    promotion_rules: list[PromotionRule] = []
+    for promo in Promotion.objects.filter(id__in=list(promotion_ids)).prefetch_related(
+        "products", "categories", "collections"
+    ):
+        promotion_rules.append(
+            PromotionRule(
+                id=promo.id,
+                code=promo.code,
+                promotion_type=promo.promotion_type,
+                value=promo.value,
+                applies_to_all_products=promo.applies_to_all_products,
+                product_ids=frozenset(product.id for product in promo.products.all()),
+                category_ids=frozenset(category.id for category in promo.categories.all()),
+                collection_ids=frozenset(collection.id for collection in promo.collections.all()),
+            )
+        )
+    # Ad-hoc definitions get negative ids so they never collide with stored rules.
+    for index, spec in enumerate(promotions, start=1):
+        promotion_rules.append(
+            PromotionRule(
+                id=-index,
+                code=spec.get("code") or f"SIMULATED-{index}",
+                promotion_type=spec["promotion_type"],
+                value=Decimal(spec["value"]),
+                applies_to_all_products=bool(spec.get("applies_to_all_products", False)),
+                product_ids=frozenset(spec.get("products", ())),
+                category_ids=frozenset(spec.get("categories", ())),
+                collection_ids=frozenset(spec.get("collections", ())),
+            )
+        )
+
+    bundle_rules: list[BundleRule] = []
+    items_by_bundle: dict[int, list[BundleItem]] = {}
+    for item in BundleItem.objects.filter(bundle_id__in=list(bundle_ids)).order_by("id"):
+        items_by_bundle.setdefault(item.bundle_id, []).append(item)
+    for bundle in Bundle.objects.filter(id__in=list(bundle_ids)):
+        items = items_by_bundle.get(bundle.id, [])
+        bundle_rules.append(
+            BundleRule(
+                id=bundle.id,
+                slug=bundle.slug,
+                price_amount=bundle.bundle_price_amount,
+                items=tuple((item.product_id, item.quantity) for item in items if item.product_id),
+                group_items=tuple(
+                    ("category", item.category_id, item.quantity)
+                    if item.category_id
+                    else ("collection", item.collection_id, item.quantity)
+                    for item in items
+                    if not item.product_id
+                ),
+            )
+        )
+    for index, spec in enumerate(bundles, start=1):
+        items = spec.get("items", ())
+        bundle_rules.append(
+            BundleRule(
+                id=-index,
+                slug=spec.get("slug") or f"simulated-{index}",
+                price_amount=Decimal(spec["bundle_price_amount"]),
+                items=tuple(
+                    (int(item["product"]), int(item.get("quantity", 1)))
+                    for item in items
+                    if item.get("product") is not None
+                ),
+                group_items=tuple(group for item in items if (group := _group_item(item))),
+            )
+        )
+    return build_rule_set(bundle_rules, promotion_rules)
+
+
+def _orders(date_from: datetime | None, date_to: datetime | None, statuses: Sequence[str]):
+    queryset = Order.objects.filter(status__in=list(statuses))
+    if date_from is not None:
+        queryset = queryset.filter(created_at__gte=date_from)
+    if date_to is not None:
+        queryset = queryset.filter(created_at__lt=date_to)
+    return queryset
+
+
+def _id_ranges(order_ids: Iterable[int], size: int) -> Iterator[tuple[int, int]]:
+    # Chunks are (first id, last id) pairs so only boundaries are held in memory.
+    first = last = None
+    count = 0
+    for order_id in order_ids:
+        if first is None:
+            first = order_id
+        last = order_id
+        count += 1
+        if count >= size:
+            yield first, last
+            first = None
+            count = 0
+    if first is not None and last is not None:
+        yield first, last
+
+
+_worker_rules: RuleSet | None = None
+
+
+def simulate_order_range(
+    rules: RuleSet,
+    first_id: int,
+    last_id: int,
+    *,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    statuses: Sequence[str] = SIMULATED_ORDER_STATUSES,
+) -> tuple[int, int, Decimal, Counter[str]]:
+    order_ids = _orders(date_from, date_to, statuses).filter(id__gte=first_id, id__lte=last_id)
+    baskets: dict[int, dict[int, tuple[int, Decimal]]] = {}
+    for order_id, product_id, quantity, unit_price in (
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .order_by("order_id", "id")
+        .values_list("order_id", "product_id", "quantity", "unit_price_snapshot")
+    ):
+        basket = baskets.setdefault(order_id, {})
+        if product_id is None:
+            # Deleted products cannot match any rule.
+            continue
+        previous = basket.get(product_id)
+        basket[product_id] = (quantity + (previous[0] if previous else 0), unit_price)
+
+    carts_lines = [
+        [(product_id, quantity, unit_price) for product_id, (quantity, unit_price) in lines.items()]
+        for lines in baskets.values()
+    ]
+    affected = 0
+    discount_total = _ZERO
+    hits: Counter[str] = Counter()
+    for resolution in resolve_many(carts_lines, rules=rules):
+        if resolution.discount_amount <= _ZERO:
+            continue
+        affected += 1
+        discount_total += resolution.discount_amount
+        hits[resolution.rule] += 1
+    return len(baskets), affected, discount_total, hits
+
+
+def _init_worker(rules: RuleSet) -> None:
+    global _worker_rules
+    _worker_rules = rules
+
+
+def _simulate_in_worker(
+    first_id: int,
+    last_id: int,
+    date_from: datetime | None,
+    date_to: datetime | None,
+    statuses: Sequence[str],
+) -> tuple[int, int, Decimal, Counter[str]]:
+    if _worker_rules is None:
+        raise RuntimeError("Simulation worker was started without its rule set.")
+    return simulate_order_range(
+        _worker_rules,
+        first_id,
+        last_id,
+        date_from=date_from,
+        date_to=date_to,
+        statuses=statuses,
+    )
+
+
+def simulate_promotions(
+    rules: RuleSet,
+    *,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    statuses: Sequence[str] = SIMULATED_ORDER_STATUSES,
+    chunk_size: int = 2000,
+    workers: int = 0,
+) -> SimulationReport:
+    started = time.perf_counter()
+    statuses = [str(status) for status in statuses]
+    orders = _orders(date_from, date_to, statuses)
+    actual_discount = orders.aggregate(total=Sum("discount_amount"))["total"] or _ZERO
+    ranges = list(
+        _id_ranges(
+            orders.order_by("id").values_list("id", flat=True).iterator(chunk_size=chunk_size),
+            max(int(chunk_size), 1),
+        )
+    )
+
+    scanned = affected = 0
+    discount_total = _ZERO
+    hits: Counter[str] = Counter()
+
+    def _collect(result: tuple[int, int, Decimal, Counter[str]]) -> None:
+        nonlocal scanned, affected, discount_total
+        scanned += result[0]
+        affected += result[1]
+        discount_total += result[2]
+        hits.update(result[3])
+
+    if workers > 1 and len(ranges) > 1:
+        with process_pool(workers, initializer=_init_worker, initargs=(rules,)) as pool:
+            futures = [
+                pool.submit(_simulate_in_worker, first, last, date_from, date_to, statuses)
+                for first, last in ranges
+            ]
+            for future in futures:
+                _collect(future.result())
+    else:
+        for first, last in ranges:
+            _collect(
+                simulate_order_range(
+                    rules, first, last, date_from=date_from, date_to=date_to, statuses=statuses
+                )
+            )
+
+    return SimulationReport(
+        orders_scanned=scanned,
+        orders_affected=affected,
+        discount_total=discount_total,
+        actual_discount_total=actual_discount,
+        rule_hits=dict(hits.most_common()),
+        seconds=time.perf_counter() - started,
+    )
@@ -1,8 +1,16 @@
 import pytest
+from django.core.cache import cache
 
 from tests.factories import CartFactory, CategoryFactory, ProductFactory
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
 @pytest.fixture
 def category(db):
     return CategoryFactory()
@@ -1,3 +1,9 @@
+import os
+import tempfile
+from pathlib import Path
+
+import django
+
 SECRET_KEY = "tests"
 DEBUG = True
 ALLOWED_HOSTS = ["*"]
@@ -21,10 +27,20 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = "tests.urls"
 
+_SQLITE_OPTIONS: dict = {"timeout": 20}
+if django.VERSION >= (5, 1):
+    # Worker processes write concurrently; without this they fail on lock upgrades.
+    _SQLITE_OPTIONS["transaction_mode"] = "IMMEDIATE"
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": ":memory:",
+        "OPTIONS": _SQLITE_OPTIONS,
+        # A file, so worker processes started by parallel commands can reach the test data.
+        "TEST": {
+            "NAME": str(Path(tempfile.gettempdir()) / f"productory-tests-{os.getpid()}.sqlite3")
+        },
     }
 }
 
@@ -48,3 +64,6 @@ PRODUCTORY = {
     "ENABLE_PROMOTIONS": True,
     "ENABLE_WEBHOOKS": False,
 }
+
+# Tests run in one process, so the process-local cache is fine.
+SILENCED_SYSTEM_CHECKS = ["productory_core.W001"]
@@ -1,6 +1,27 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.utils import timezone
 from rest_framework.test import APIClient
 
+from productory_catalog.memberships import get_product_memberships
+from productory_catalog.models import Category, Collection, Product, ProductImage, StockRecord
+from productory_catalog.representations import (
+    forget_product_representations,
+    get_representations,
+)
+from productory_catalog.services import bulk_update_prices
+from productory_catalog.stock import StockAdjustment, apply_stock_adjustments
 from productory_checkout.models import OrderStatus
+from productory_checkout.services import upsert_cart_item
+from productory_core.hooks import product_prices_changed
+from productory_core.models import AuditEvent
+from productory_promotions.models import Promotion, PromotionType
+from tests.factories import CategoryFactory, ProductFactory
 
 
 def test_catalog_and_checkout_flow(cart, product):
@@ -55,3 +76,355 @@ def test_product_list_serializer_shape(product):
     assert payload[0]["sku"] == product.sku
     assert "category_name" in payload[0]
     assert "description" not in payload[0]
+
+
+def test_product_list_expands_effective_price_without_per_product_queries(
+    product, django_assert_num_queries
+):
+    promotion = Promotion.objects.create(
+        name="Category sale",
+        code="CATEGORY20",
+        promotion_type=PromotionType.PERCENTAGE,
+        value=Decimal("20.00"),
+        start_at=timezone.now() - timedelta(days=1),
+        end_at=timezone.now() + timedelta(days=1),
+    )
+    promotion.categories.add(product.category)
+    for _ in range(3):
+        ProductFactory()
+    client = APIClient()
+    assert "effective_price" not in client.get("/api/catalog/products/").json()[0]
+    client.get("/api/catalog/products/?expand=effective_price")
+
+    # Same three queries as the plain list once the rule set is compiled.
+    with django_assert_num_queries(3):
+        response = client.get("/api/catalog/products/?expand=effective_price")
+
+    rows = {row["id"]: row for row in response.json()}
+    assert rows[product.id]["effective_price"] == "10.00"
+    assert rows[product.id]["applied_promotion"] == "CATEGORY20"
+    other = next(row for row in rows.values() if row["id"] != product.id)
+    assert (other["effective_price"], other["applied_promotion"]) == ("12.50", None)
+
+    detail = client.get(f"/api/catalog/products/{product.id}/?expand=effective_price").json()
+    assert detail["effective_price"] == "10.00"
+
+
+def test_cart_detail_uses_compact_lines_in_fixed_queries(cart, django_assert_num_queries):
+    for position in range(3):
+        line_product = ProductFactory()
+        ProductImage.objects.create(
+            product=line_product,
+            image_url=f"https://example.com/{line_product.sku}-{position}.png",
+            position=position,
+        )
+        upsert_cart_item(cart, line_product.id, 1)
+
+    client = APIClient()
+    # Cold: one extra query loads the uncached line products; warm: cart, items, product ids.
+    with django_assert_num_queries(4):
+        client.get(f"/api/checkout/carts/{cart.id}/")
+    with django_assert_num_queries(3):
+        response = client.get(f"/api/checkout/carts/{cart.id}/")
+
+    assert response.status_code == 200
+    line = response.json()["items"][0]["product"]
+    assert set(line) == {"id", "name", "sku", "price_amount", "currency", "primary_image_url"}
+    assert line["primary_image_url"].startswith("https://example.com/")
+
+
+def test_cart_detail_expand_product_returns_nested_product(cart, product):
+    upsert_cart_item(cart, product.id, 1)
+
+    response = APIClient().get(f"/api/checkout/carts/{cart.id}/?expand=product")
+
+    assert response.status_code == 200
+    line = response.json()["items"][0]["product"]
+    assert line["category"]["id"] == product.category_id
+    assert line["images"] == []
+    assert line["stock_record"] is None
+
+
+def test_product_representations_are_served_from_cache_until_changed(
+    product, django_assert_num_queries
+):
+    client = APIClient()
+    first = client.get(f"/api/catalog/products/{product.id}/").json()
+
+    with django_assert_num_queries(0):
+        cached = client.get(f"/api/catalog/products/{product.id}/")
+    assert cached.json() == first
+
+    StockRecord.objects.update_or_create(product=product, defaults={"quantity": 7})
+    assert (
+        client.get(f"/api/catalog/products/{product.id}/").json()["stock_record"]["quantity"] == 7
+    )
+
+    collection = Collection.objects.create(name="Gifts", slug="gifts")
+    collection.products.add(product)
+    detail = client.get(f"/api/catalog/products/{product.id}/").json()
+    assert [entry["name"] for entry in detail["collections"]] == ["Gifts"]
+
+    product.category.name = "Renamed category"
+    product.category.save()
+    detail = client.get(f"/api/catalog/products/{product.id}/").json()
+    assert detail["category"]["name"] == "Renamed category"
+    listed = client.get("/api/catalog/products/").json()
+    assert listed[0]["category_name"] == "Renamed category"
+
+
+def test_reads_racing_a_commit_do_not_cache_pre_commit_rows(product):
+    collection = Collection.objects.create(name="Gifts", slug="gifts")
+
+    def render(product_ids):
+        rendered = {product_id: {"name": "Old name"} for product_id in product_ids}
+        # A writer commits and invalidates while this reader still holds the old rows.
+        forget_product_representations(product_ids)
+        return rendered
+
+    assert get_representations("list", [product.id], render)[product.id] == {"name": "Old name"}
+    fresh = get_representations("list", [product.id], lambda ids: {product.id: {"name": "New"}})
+    assert fresh[product.id] == {"name": "New"}
+
+    committed: list[bool] = []
+
+    def commit_during_read(execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        if not committed:
+            committed.append(True)
+            collection.products.add(product)
+        return result
+
+    with connection.execute_wrapper(commit_during_read):
+        assert get_product_memberships([product.id])[product.id].collection_ids == frozenset()
+    assert get_product_memberships([product.id])[product.id].collection_ids == {collection.id}
+
+
+def test_product_facets_match_between_bitmap_index_and_grouped_aggregates(
+    product, django_assert_num_queries
+):
+    collection = Collection.objects.create(name="Gifts", slug="gifts")
+    pricey = ProductFactory(category=product.category, price_amount="300.00")
+    ProductFactory(price_amount="50.00", is_active=False)
+    collection.products.add(product, pricey)
+    StockRecord.objects.create(product=product, quantity=3)
+    client = APIClient()
+
+    facets = client.get("/api/catalog/products/facets/").json()
+    with django_assert_num_queries(0):
+        indexed = client.get(f"/api/catalog/products/facets/?category={product.category_id}")
+    indexed = indexed.json()
+
+    assert facets["count"] == 3
+    assert indexed["count"] == 2
+    assert indexed["categories"] == [
+        {"id": product.category_id, "name": product.category.name, "count": 2}
+    ]
+    assert indexed["collections"] == [{"id": collection.id, "name": "Gifts", "count": 2}]
+    assert [band["count"] for band in indexed["price_bands"]] == [1, 0, 1, 0, 0]
+    assert indexed["in_stock"] == {"true": 1, "false": 1}
+
+    # The grouped-aggregate path (used for searches) returns the same shape and numbers.
+    grouped = client.get(f"/api/catalog/products/facets/?category={product.category_id}&search=")
+    assert grouped.json() == indexed
+
+    pricey.delete()
+    assert client.get("/api/catalog/products/facets/").json()["count"] == 2
+    active = client.get("/api/catalog/products/facets/?is_active=false&search=").json()
+    assert active["count"] == 1
+
+
+def test_catalog_and_promotion_reads_answer_conditional_gets(product, django_assert_num_queries):
+    client = APIClient()
+    first = client.get("/api/catalog/products/")
+    etag = first["ETag"]
+    assert etag.startswith('W/"')
+
+    with django_assert_num_queries(0):
+        cached = client.get("/api/catalog/products/", HTTP_IF_NONE_MATCH=etag)
+    assert cached.status_code == 304
+    detail = client.get(f"/api/catalog/products/{product.id}/")
+    assert (
+        client.get(
+            f"/api/catalog/products/{product.id}/", HTTP_IF_NONE_MATCH=detail["ETag"]
+        ).status_code
+        == 304
+    )
+
+    product.name = "Renamed"
+    product.save()
+    refreshed = client.get("/api/catalog/products/", HTTP_IF_NONE_MATCH=etag)
+    assert refreshed.status_code == 200
+    assert refreshed.json()[0]["name"] == "Renamed"
+    assert "Last-Modified" in refreshed
+
+    promotions = client.get("/api/promotions/promotions/")
+    assert (
+        client.get("/api/promotions/promotions/", HTTP_IF_NONE_MATCH=promotions["ETag"]).status_code
+        == 304
+    )
+    assert "ETag" not in client.get("/api/catalog/products/?expand=effective_price")
+
+
+def test_bulk_price_update_is_staff_only_atomic_and_audited(db, django_capture_on_commit_callbacks):
+    products = [ProductFactory(price_amount=Decimal("10.00")) for _ in range(3)]
+    client = APIClient()
+    payload = {
+        "prices": [
+            {"sku": products[0].sku, "price_amount": "12.50"},
+            {"sku": products[1].sku, "price_amount": "10.00"},
+        ]
+    }
+    assert client.post("/api/catalog/price-updates/", payload, format="json").status_code == 403
+
+    staff = get_user_model().objects.create_user(username="pricing", is_staff=True)
+    client.force_authenticate(user=staff)
+    client.get(f"/api/catalog/products/{products[0].id}/")
+    unknown = {"prices": [*payload["prices"], {"sku": "MISSING", "price_amount": "1.00"}]}
+    response = client.post("/api/catalog/price-updates/", unknown, format="json")
+    assert response.status_code == 400
+    assert response.json()["unknown_skus"] == ["MISSING"]
+    products[0].refresh_from_db()
+    assert products[0].price_amount == Decimal("10.00")
+
+    received = []
+
+    def _receiver(sender, product_ids, changes, **kwargs):
+        received.append((product_ids, changes))
+
+    product_prices_changed.connect(_receiver)
+    try:
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.post("/api/catalog/price-updates/", payload, format="json")
+    finally:
+        product_prices_changed.disconnect(_receiver)
+
+    assert response.status_code == 200
+    assert (response.json()["updated"], response.json()["unchanged"]) == (1, 1)
+    assert received == [([products[0].id], {products[0].sku: ("10.00", "12.50")})]
+    event = AuditEvent.objects.get(action="bulk_updated")
+    assert event.actor == staff
+    assert event.changes == {"price_amount": {products[0].sku: ["10.00", "12.50"]}}
+    detail = client.get(f"/api/catalog/products/{products[0].id}/").json()
+    assert detail["price_amount"] == "12.50"
+
+
+def test_change_feed_pages_upserts_and_tombstones_by_cursor(db, settings):
+    settings.PRODUCTORY = {**settings.PRODUCTORY, "CHANGE_FEED_LAG_SECONDS": 0}
+    first, second, third = (ProductFactory() for _ in range(3))
+    client = APIClient()
+
+    page = client.get("/api/catalog/changes/?limit=2").json()
+    assert [change["id"] for change in page["results"]] == [first.id, second.id]
+    assert page["has_more"] is True
+    assert page["results"][0]["product"]["sku"] == first.sku
+    page = client.get(f"/api/catalog/changes/?since={page['next_cursor']}").json()
+    assert [change["id"] for change in page["results"]] == [third.id]
+    assert page["has_more"] is False
+    cursor = page["next_cursor"]
+
+    first.name = "Renamed"
+    first.save()
+    deleted_id = second.id
+    second.delete()
+    page = client.get(f"/api/catalog/changes/?since={cursor}").json()
+    assert [(change["type"], change["id"]) for change in page["results"]] == [
+        ("upsert", first.id),
+        ("delete", deleted_id),
+    ]
+    assert page["results"][0]["product"]["name"] == "Renamed"
+    assert page["results"][1]["product"] is None
+    assert client.get(f"/api/catalog/changes/?since={page['next_cursor']}").json()["results"] == []
+    assert client.get("/api/catalog/changes/?since=garbage").status_code == 400
+
+
+def test_change_feed_reports_category_collection_stock_and_price_writes(db, settings):
+    settings.PRODUCTORY = {**settings.PRODUCTORY, "CHANGE_FEED_LAG_SECONDS": 0}
+    coffee = CategoryFactory(name="Coffee")
+    renamed, linked, stocked, priced = (ProductFactory(category=coffee) for _ in range(4))
+    others = CategoryFactory(name="Tea")
+    for product in (linked, stocked, priced):
+        product.category = others
+        product.save()
+    client = APIClient()
+
+    def drain(cursor=""):
+        page = client.get(f"/api/catalog/changes/?since={cursor}").json()
+        return [change["id"] for change in page["results"]], page["next_cursor"], page
+
+    _, cursor, _ = drain()
+    coffee.name = "Coffee beans"
+    coffee.save()
+    ids, cursor, page = drain(cursor)
+    assert ids == [renamed.id]
+    assert page["results"][0]["product"]["category_name"] == "Coffee beans"
+
+    Collection.objects.create(name="Gifts", slug="gifts").products.add(linked)
+    assert drain(cursor)[0] == [linked.id]
+    _, cursor, _ = drain(cursor)
+    apply_stock_adjustments([StockAdjustment(stocked.sku, quantity=4)])
+    assert drain(cursor)[0] == [stocked.id]
+    _, cursor, _ = drain(cursor)
+    bulk_update_prices([(priced.sku, Decimal("99.00"))])
+    assert drain(cursor)[0] == [priced.id]
+
+
+def test_category_tree_filters_products_by_subtree_and_moves_subtrees(
+    db, django_assert_num_queries
+):
+    coffee = CategoryFactory(name="Coffee")
+    beans = CategoryFactory(name="Beans", parent=coffee)
+    espresso = CategoryFactory(name="Espresso", parent=beans)
+    tea = CategoryFactory(name="Tea")
+    products = {
+        category.name: ProductFactory(category=category) for category in [coffee, espresso, tea]
+    }
+    assert espresso.path == f"{coffee.id}/{beans.id}/{espresso.id}/"
+    assert espresso.depth == 2
+    client = APIClient()
+
+    def tree(category):
+        response = client.get(f"/api/catalog/products/?category_tree={category.id}")
+        return sorted(row["id"] for row in response.data)
+
+    assert tree(coffee) == sorted([products["Coffee"].id, products["Espresso"].id])
+    assert tree(beans) == [products["Espresso"].id]
+    # One lookup of the root's path, then a prefix match, however deep the subtree is.
+    with django_assert_num_queries(1):
+        list(Product.objects.in_category_tree(coffee).values_list("id", flat=True))
+
+    # Moving Beans rewrites its whole subtree's paths in one UPDATE.
+    client.force_authenticate(get_user_model().objects.create_user("staff", is_staff=True))
+    response = client.patch(f"/api/catalog/categories/{beans.id}/", {"parent": tea.id})
+    assert response.status_code == 200
+    assert response.data["path"] == f"{tea.id}/{beans.id}/"
+    espresso.refresh_from_db()
+    assert (espresso.path, espresso.depth) == (f"{tea.id}/{beans.id}/{espresso.id}/", 2)
+    assert tree(coffee) == [products["Coffee"].id]
+    assert tree(tea) == sorted([products["Tea"].id, products["Espresso"].id])
+    assert [
+        row["name"] for row in client.get(f"/api/catalog/categories/?parent={tea.id}").data
+    ] == ["Beans"]
+
+    response = client.patch(f"/api/catalog/categories/{tea.id}/", {"parent": espresso.id})
+    assert response.status_code == 400
+    assert "parent" in response.data
+
+
+def test_category_tree_depth_limit_is_a_validation_error(db):
+    deepest = CategoryFactory(name="Level 0")
+    while not Category(name="next").is_too_deep_under(deepest):
+        deepest = CategoryFactory(name=f"Level {deepest.depth + 1}", parent=deepest)
+    shallow = CategoryFactory(name="Shallow")
+    client = APIClient()
+    client.force_authenticate(get_user_model().objects.create_user("staff", is_staff=True))
+
+    created = client.post(
+        "/api/catalog/categories/", {"name": "Too deep", "slug": "too-deep", "parent": deepest.id}
+    )
+    moved = client.patch(f"/api/catalog/categories/{shallow.id}/", {"parent": deepest.id})
+
+    assert (created.status_code, moved.status_code) == (400, 400)
+    assert created.data["parent"] == ["The category tree is too deep."]
+    with pytest.raises(ValidationError):
+        CategoryFactory(name="Backstop", parent=deepest)
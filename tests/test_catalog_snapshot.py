@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import gzip
+import json
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+
+from productory_catalog.snapshot import MANIFEST_NAME, build_catalog_snapshot
+from tests.factories import ProductFactory
+
+
+def _shard(output_dir, entry):
+    return json.loads(gzip.decompress((output_dir / entry["file"]).read_bytes()))
+
+
+def test_snapshot_reuses_unchanged_shards_and_retires_replaced_ones(db, tmp_path):
+    products = ProductFactory.create_batch(5)
+    hidden = ProductFactory(is_active=False)
+    shard_size = products[-1].id - products[0].id  # At least two shards.
+
+    report = build_catalog_snapshot(tmp_path, shard_size=shard_size)
+
+    manifest = json.loads((tmp_path / MANIFEST_NAME).read_text())
+    assert report.products == manifest["products"] == 5
+    assert report.shards == len(manifest["shards"]) >= 2
+    rows = [row for entry in manifest["shards"] for row in _shard(tmp_path, entry)]
+    assert [row["sku"] for row in rows] == [product.sku for product in products]
+    assert hidden.sku not in {row["sku"] for row in rows}
+    assert "effective_price" in rows[0]
+    assert _shard(tmp_path, manifest["files"]["categories"])
+
+    # Nothing changed: every file is reused and the output is byte-for-byte stable.
+    again = build_catalog_snapshot(tmp_path, shard_size=shard_size)
+    assert (again.files_written, again.files_pruned) == (0, 0)
+    assert again.files_reused == again.shards + 2
+
+    products[0].price_amount = Decimal("1.23")
+    products[0].save()
+    edited = build_catalog_snapshot(tmp_path, shard_size=shard_size)
+    assert (edited.files_written, edited.files_pruned, edited.files_retired) == (1, 0, 1)
+    current = json.loads((tmp_path / MANIFEST_NAME).read_text())
+    # Clients still holding the previous manifest can fetch the replaced shard.
+    assert list(current["retired"]) == [manifest["shards"][0]["file"]]
+    assert (tmp_path / manifest["shards"][0]["file"]).exists()
+    assert current["shards"][0]["file"] != manifest["shards"][0]["file"]
+    assert current["shards"][1:] == manifest["shards"][1:]
+    assert _shard(tmp_path, current["shards"][0])[0]["price_amount"] == "1.23"
+
+    # Within the grace period a retired file survives; once it has passed, it is pruned.
+    kept = build_catalog_snapshot(tmp_path, shard_size=shard_size)
+    assert (kept.files_pruned, kept.files_retired) == (0, 1)
+    expired = build_catalog_snapshot(tmp_path, shard_size=shard_size, prune_grace_seconds=0)
+    assert (expired.files_pruned, expired.files_retired) == (1, 0)
+    current = json.loads((tmp_path / MANIFEST_NAME).read_text())
+    assert current["retired"] == {}
+    referenced = [entry["file"] for entry in [*current["shards"], *current["files"].values()]]
+    assert sorted(path.name for path in tmp_path.glob("*.json.gz")) == sorted(referenced)
+
+
+def test_build_catalog_snapshot_command_reports_json(db, tmp_path):
+    ProductFactory.create_batch(3)
+    output = StringIO()
+
+    call_command(
+        "productory_build_catalog_snapshot",
+        str(tmp_path),
+        "--no-effective-prices",
+        "--json",
+        stdout=output,
+    )
+
+    report = json.loads(output.getvalue())
+    assert report["products"] == 3
+    assert report["files_written"] == report["shards"] + 2
+    manifest = json.loads((tmp_path / MANIFEST_NAME).read_text())
+    assert manifest["effective_prices"] is False
+    assert "effective_price" not in _shard(tmp_path, manifest["shards"][0])[0]
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 from types import SimpleNamespace
 
+from productory_core.checks import check_shared_cache
 from productory_core.conf import get_setting
+from productory_core.generations import generation_changes, get_generation, publish_generation
 from productory_core.permissions import HasProductoryScope, IsStaffOrReadOnly
 from productory_core.scopes import parse_scopes
 
@@ -38,3 +40,38 @@ def test_staff_or_read_only_permission():
         method="POST", user=SimpleNamespace(is_authenticated=True, is_staff=True)
     )
     assert permission.has_permission(post_request, view=None)
+
+
+def test_publish_generation_bumps_now_and_logs_changes_after_commit(
+    db, django_capture_on_commit_callbacks
+):
+    start = get_generation("widgets")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        publish_generation("widgets")
+        assert get_generation("widgets") == start + 1
+    assert get_generation("widgets") == start + 2
+
+    # A logged change is only published once the transaction commits.
+    with django_capture_on_commit_callbacks(execute=True):
+        publish_generation("widgets", [("widget", 1)])
+        assert get_generation("widgets") == start + 2
+    assert generation_changes("widgets", start + 2, start + 3) == [[("widget", 1)]]
+    assert generation_changes("widgets", start, start + 3) is None
+
+
+def test_shared_cache_check_warns_about_process_local_backends(settings):
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "carts": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+    }
+    settings.PRODUCTORY = {**settings.PRODUCTORY, "GUEST_CART_CACHE_ALIAS": "carts"}
+
+    warnings = check_shared_cache(None)
+
+    assert [warning.id for warning in warnings] == ["productory_core.W001"] * 2
+    assert "DummyCache" in warnings[0].msg and "LocMemCache" in warnings[1].msg
+
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}}
+    settings.PRODUCTORY = {**settings.PRODUCTORY, "GUEST_CART_CACHE_ALIAS": "default"}
+    assert check_shared_cache(None) == []
@@ -9,7 +9,14 @@ from django.utils import timezone
 from rest_framework.test import APIClient
 
 from productory_catalog.models import Category, Product, StockRecord
-from productory_checkout.models import Cart, CartStatus, Order, OrderStatus
+from productory_checkout.models import (
+    AppliedRuleType,
+    Cart,
+    CartStatus,
+    Order,
+    OrderRuleComponent,
+    OrderStatus,
+)
 from productory_core.services.dashboard_kpis import get_store_kpis
 
 
@@ -126,6 +133,8 @@ def test_get_store_kpis_aggregates_expected_metrics():
     assert payload["carts"]["converted"] == 1
     assert payload["carts"]["abandoned"] == 1
     assert payload["carts"]["conversion_rate"] == 0.5
+    assert payload["carts"]["abandoned_value"] == Decimal("0.00")
+    assert payload["carts"]["average_item_count"] == 0.0
 
     assert payload["catalog"]["active_products"] == 2
     assert payload["catalog"]["out_of_stock"] == 1
@@ -171,3 +180,42 @@ def test_dashboard_kpi_endpoint_validates_range_and_store():
     unknown_store = client.get("/api/internal/dashboard/kpis/?store=other")
     assert unknown_store.status_code == 400
     assert "detail" in unknown_store.data
+
+
+@pytest.mark.django_db
+def test_get_store_kpis_breaks_promo_usage_down_by_applied_rule():
+    def order(discount, rule_type="", rule_id=None, components=()):
+        created = Order.objects.create(
+            cart=Cart.objects.create(status=CartStatus.CONVERTED),
+            status=OrderStatus.PAID,
+            discount_amount=Decimal(discount),
+            applied_rule_type=rule_type,
+            applied_rule_id=rule_id,
+        )
+        for component_type, component_id in components:
+            OrderRuleComponent.objects.create(
+                order=created, rule_type=component_type, rule_id=component_id
+            )
+        return created
+
+    order("5.00", AppliedRuleType.PROMOTION, 7)
+    order("4.00", AppliedRuleType.BUNDLE, 3)
+    order("9.00", AppliedRuleType.COMBINED, components=[("bundle", 3), ("promotion", 8)])
+    # Placed before the applied rule was recorded.
+    order("2.00")
+    order("0.00")
+
+    payload = get_store_kpis()
+
+    assert payload["orders"]["promo_usage_count"] == 4
+    promotions = payload["promotions"]
+    assert promotions["promotions"] == [
+        {"id": 7, "redemptions": 1, "discount_total": Decimal("5.00"), "combined_redemptions": 0},
+        {"id": 8, "redemptions": 0, "discount_total": Decimal("0.00"), "combined_redemptions": 1},
+    ]
+    assert promotions["bundles"] == [
+        {"id": 3, "redemptions": 1, "discount_total": Decimal("4.00"), "combined_redemptions": 1}
+    ]
+    assert promotions["combined"] == [
+        {"id": None, "redemptions": 1, "discount_total": Decimal("9.00"), "combined_redemptions": 0}
+    ]
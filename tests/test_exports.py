@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.http import StreamingHttpResponse
+
+from productory_catalog.exports import PRODUCT_EXPORT
+from productory_checkout.exports import ORDER_EXPORT, ORDER_ITEM_EXPORT
+from productory_checkout.models import OrderItem
+from productory_checkout.services import create_order_from_cart, upsert_cart_item
+from productory_core.exports import streaming_export_response
+
+
+def _content(response: StreamingHttpResponse) -> str:
+    return b"".join(response.streaming_content).decode("utf-8")
+
+
+def test_product_csv_export_streams_rows(product):
+    response = streaming_export_response(PRODUCT_EXPORT)
+
+    assert isinstance(response, StreamingHttpResponse)
+    assert response["Content-Disposition"] == 'attachment; filename="products.csv"'
+    lines = _content(response).splitlines()
+    assert lines[0] == "id,name,sku,category,price_amount,currency,is_active"
+    assert lines[1] == (
+        f"{product.id},{product.name},{product.sku},{product.category.name},12.50,ZAR,True"
+    )
+
+
+def test_order_exports_cover_orders_and_line_items(cart, product):
+    upsert_cart_item(cart, product.id, 2)
+    order = create_order_from_cart(cart, email="export@example.com")
+
+    ndjson = _content(streaming_export_response(ORDER_EXPORT, export_format="ndjson"))
+    record = json.loads(ndjson.splitlines()[0])
+    assert record["number"] == order.number
+    assert record["total_amount"] == "25.00"
+
+    items = OrderItem.objects.filter(order__in=[order])
+    items_csv = _content(streaming_export_response(ORDER_ITEM_EXPORT, items)).splitlines()
+    assert len(items_csv) == 2
+    assert items_csv[1].startswith(f"{order.id},{order.number},submitted,")
+    assert items_csv[1].endswith(f",{product.sku},{product.name},2,12.50,25.00")
+
+
+def test_export_command_streams_dataset(product):
+    out = StringIO()
+    call_command("productory_export", "products", "--format", "ndjson", stdout=out)
+
+    record = json.loads(out.getvalue().splitlines()[0])
+    assert record["sku"] == product.sku
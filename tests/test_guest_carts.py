@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import time
+from types import SimpleNamespace
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_in
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from productory_checkout import guest_carts
+from productory_checkout.guest_carts import (
+    CART_SESSION_KEY,
+    GUEST_CART_SESSION_KEY,
+    GuestCartBusy,
+    create_guest_cart,
+    flush_idle_guest_carts,
+    persist_guest_cart,
+    set_guest_cart_item,
+)
+from productory_checkout.models import Cart, CartItem
+from productory_checkout.services import create_order_from_cart, upsert_cart_item
+
+
+@pytest.fixture
+def cache_cart_storage(settings):
+    settings.PRODUCTORY = {**settings.PRODUCTORY, "CART_STORAGE": "cache"}
+
+
+def test_guest_cart_endpoints_are_disabled_by_default(db):
+    response = APIClient().post("/api/checkout/guest-carts/", {}, format="json")
+    assert response.status_code == 404
+
+
+def test_guest_cart_lives_in_cache_until_checkout(
+    cache_cart_storage, product, django_capture_on_commit_callbacks
+):
+    client = APIClient()
+    created = client.post("/api/checkout/guest-carts/", {"email": "guest@example.com"})
+    assert created.status_code == 201
+    token = created.data["token"]
+
+    updated = client.post(
+        f"/api/checkout/guest-carts/{token}/items/",
+        {"product_id": product.id, "quantity": 3},
+        format="json",
+    )
+    assert updated.status_code == 200
+    assert updated.data["total_amount"] == "37.50"
+    assert updated.data["item_count"] == 3
+    assert Cart.objects.count() == 0
+    assert CartItem.objects.count() == 0
+
+    with django_capture_on_commit_callbacks(execute=True):
+        checkout = client.post(
+            "/api/checkout/checkout/",
+            {"guest_cart_token": token, "full_name": "Guest"},
+            format="json",
+        )
+    assert checkout.status_code == 201
+
+    db_cart = Cart.objects.create(email="db@example.com")
+    upsert_cart_item(db_cart, product.id, 3)
+    db_order = create_order_from_cart(db_cart)
+    assert checkout.data["total_amount"] == str(db_order.total_amount)
+    assert checkout.data["tax_amount"] == str(db_order.tax_amount)
+    assert checkout.data["email"] == "guest@example.com"
+
+
+def test_checkout_requires_exactly_one_cart_reference(cache_cart_storage, cart):
+    response = APIClient().post(
+        "/api/checkout/checkout/",
+        {"cart_id": cart.id, "guest_cart_token": "1.abc"},
+        format="json",
+    )
+    assert response.status_code == 400
+
+
+def test_flush_persists_idle_guest_carts_once(
+    cache_cart_storage, product, django_capture_on_commit_callbacks
+):
+    guest_cart = create_guest_cart(email="idle@example.com")
+    set_guest_cart_item(guest_cart.token, product.id, 2)
+    create_guest_cart()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert flush_idle_guest_carts(idle_seconds=0) == 1
+    assert flush_idle_guest_carts(idle_seconds=0) == 0
+
+    cart = Cart.objects.get()
+    assert cart.email == "idle@example.com"
+    assert cart.item_count == 2
+
+
+def test_login_persists_session_guest_cart(cache_cart_storage, product):
+    guest_cart = create_guest_cart()
+    set_guest_cart_item(guest_cart.token, product.id, 1)
+    user = get_user_model().objects.create_user(username="shopper", password="pass")
+    request = SimpleNamespace(session={GUEST_CART_SESSION_KEY: guest_cart.token})
+
+    user_logged_in.send(sender=user.__class__, request=request, user=user)
+
+    cart = Cart.objects.get(customer=user)
+    assert request.session[CART_SESSION_KEY] == cart.pk
+    assert GUEST_CART_SESSION_KEY not in request.session
+    assert cart.items.get().product_id == product.id
+
+
+def test_persisting_a_guest_cart_twice_creates_one_cart(
+    cache_cart_storage, product, django_capture_on_commit_callbacks, monkeypatch
+):
+    guest_cart = create_guest_cart()
+    set_guest_cart_item(guest_cart.token, product.id, 2)
+    monkeypatch.setattr(guest_carts, "_LOCK_WAIT_SECONDS", 0.05)
+
+    # Until the first persist commits, the token stays locked for every other writer.
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        first = persist_guest_cart(guest_cart.token)
+        with pytest.raises(GuestCartBusy):
+            persist_guest_cart(guest_cart.token)
+        with pytest.raises(GuestCartBusy):
+            set_guest_cart_item(guest_cart.token, product.id, 5)
+    for callback in callbacks:
+        callback()
+
+    assert persist_guest_cart(guest_cart.token) == first
+    assert Cart.objects.count() == 1
+    assert first.item_count == 2
+
+
+def test_flush_skips_locked_carts_and_keeps_their_slots(
+    cache_cart_storage, product, django_capture_on_commit_callbacks, monkeypatch
+):
+    busy = create_guest_cart()
+    set_guest_cart_item(busy.token, product.id, 1)
+    idle = create_guest_cart()
+    set_guest_cart_item(idle.token, product.id, 3)
+    monkeypatch.setattr(guest_carts, "_LOCK_WAIT_SECONDS", 0.05)
+
+    owner = guest_carts._acquire_lock(busy.token)
+    with django_capture_on_commit_callbacks(execute=True):
+        assert flush_idle_guest_carts(idle_seconds=0) == 1
+    guest_carts._release_lock(busy.token, owner)
+
+    # The busy cart's slot was not passed by the low-water mark, so the next run gets it.
+    with django_capture_on_commit_callbacks(execute=True):
+        assert flush_idle_guest_carts(idle_seconds=0) == 1
+    assert Cart.objects.count() == 2
+
+
+def test_empty_cart_flush_keeps_items_added_concurrently(cache_cart_storage, product):
+    guest_cart = create_guest_cart()
+    stale = guest_carts.get_guest_cart(guest_cart.token)
+    set_guest_cart_item(guest_cart.token, product.id, 1)
+
+    # The flusher saw the cart empty; by the time it holds the lock an item was added.
+    assert guest_carts._flush_cart(guest_cart.token, stale, cutoff=time.time()) == (False, False)
+    assert guest_carts.get_guest_cart(guest_cart.token).quantities == {product.id: 1}
+
+
+def test_slots_restart_above_the_low_water_mark_after_eviction(cache_cart_storage, product):
+    set_guest_cart_item(create_guest_cart().token, product.id, 1)
+    create_guest_cart()
+    assert flush_idle_guest_carts(idle_seconds=0) == 1
+    cache.delete(guest_carts._SEQUENCE_KEY)
+
+    late = create_guest_cart()
+    set_guest_cart_item(late.token, product.id, 2)
+
+    assert int(late.token.split(".")[0], 16) == 3
+    assert flush_idle_guest_carts(idle_seconds=0) == 1
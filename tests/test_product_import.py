@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+from decimal import Decimal
+
+from django.core.management import call_command
+
+from productory_catalog.models import Category, Collection, Product, StockRecord
+from productory_catalog.search import search_product_ids
+
+CSV_FEED = """sku,name,category,collections,price_amount,currency,stock_quantity,allow_backorder
+MUG-1,Coffee mug,Kitchen,Gifts|Sale,49.90,ZAR,12,false
+POT-1,Tea pot,Kitchen,,120.00,ZAR,0,true
+BAD-1,Broken row,Kitchen,,not-a-price,ZAR,,
+"""
+
+
+def _import(tmp_path, name, content, *args):
+    path = tmp_path / name
+    path.write_text(content, encoding="utf-8")
+    output = []
+
+    class _Out:
+        def write(self, value):
+            output.append(value)
+
+        def flush(self):
+            pass
+
+    call_command("productory_import_products", str(path), "--json", *args, stdout=_Out())
+    return json.loads("".join(output))
+
+
+def test_import_upserts_products_stock_and_collections_in_batches(db, tmp_path):
+    report = _import(tmp_path, "feed.csv", CSV_FEED, "--batch-size", "2")
+
+    assert report["created"] == 2
+    assert report["errors"] == 1
+    assert "price_amount" in report["error_samples"][0]
+    mug = Product.objects.get(sku="MUG-1")
+    assert mug.category == Category.objects.get(name="Kitchen")
+    assert sorted(mug.collections.values_list("name", flat=True)) == ["Gifts", "Sale"]
+    assert mug.stock_record.quantity == 12
+    assert StockRecord.objects.get(product__sku="POT-1").allow_backorder is True
+    assert search_product_ids("mug") == [mug.id]
+
+    # Re-running the same feed writes nothing; changed rows are updated in place.
+    assert _import(tmp_path, "feed.csv", CSV_FEED)["unchanged"] == 2
+    feed = "\n".join(
+        [
+            json.dumps(
+                {
+                    "sku": "MUG-1",
+                    "name": "Coffee mug",
+                    "category": "kitchen",
+                    "collections": ["Gifts"],
+                    "price_amount": "39.90",
+                    "stock_quantity": 3,
+                }
+            ),
+            json.dumps(
+                {"sku": "NEW-1", "name": "Saucer", "category": "Kitchen", "price_amount": 5}
+            ),
+        ]
+    )
+    report = _import(tmp_path, "feed.jsonl", feed)
+
+    assert (report["created"], report["updated"], report["errors"]) == (1, 1, 0)
+    mug.refresh_from_db()
+    assert mug.price_amount == Decimal("39.90")
+    assert list(mug.collections.values_list("name", flat=True)) == ["Gifts"]
+    assert mug.stock_record.quantity == 3
+    assert Collection.objects.count() == 2
+    assert Product.objects.get(sku="NEW-1").slug == "saucer-new-1"
+
+    # A manual edit clears the hash, so the next import restores the feed values.
+    mug.name = "Edited"
+    mug.save()
+    assert _import(tmp_path, "feed.jsonl", feed)["updated"] == 1
+    mug.refresh_from_db()
+    assert mug.name == "Coffee mug"
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.db import IntegrityError, OperationalError, connections, transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from productory_checkout.models import Cart
+from productory_checkout.services import create_order_from_cart, upsert_cart_item
+from productory_promotions.models import (
+    Promotion,
+    PromotionCustomerUsage,
+    PromotionRedemption,
+    PromotionRedemptionShard,
+    PromotionType,
+)
+from productory_promotions.redemptions import PromotionCodeError, claim_redemption
+
+
+def _code_promotion(product, **kwargs):
+    promotion = Promotion.objects.create(
+        name=kwargs.pop("name", "Campaign"),
+        code=kwargs.pop("code", "CAMPAIGN20"),
+        promotion_type=PromotionType.PERCENTAGE,
+        value=Decimal("20.00"),
+        requires_code=True,
+        start_at=timezone.now() - timedelta(days=1),
+        end_at=timezone.now() + timedelta(days=1),
+        **kwargs,
+    )
+    promotion.products.add(product)
+    return promotion
+
+
+def test_code_promotion_applies_only_after_code_entry_and_is_redeemed(cart, product):
+    promotion = _code_promotion(product, max_redemptions=5, max_redemptions_per_customer=1)
+    upsert_cart_item(cart, product.id, 2)
+    cart.refresh_from_db()
+    assert cart.discount_amount == Decimal("0.00")
+
+    client = APIClient()
+    rejected = client.post(
+        f"/api/checkout/carts/{cart.id}/promotion-code/", {"code": "NOPE"}, format="json"
+    )
+    assert rejected.status_code == 400
+
+    applied = client.post(
+        f"/api/checkout/carts/{cart.id}/promotion-code/", {"code": "campaign20"}, format="json"
+    )
+    assert applied.status_code == 200
+    assert applied.data["promotion_code"] == "CAMPAIGN20"
+    assert Decimal(applied.data["discount_amount"]) == Decimal("5.00")
+
+    checkout = client.post("/api/checkout/checkout/", {"cart_id": cart.id}, format="json")
+    assert checkout.status_code == 201
+    redemption = PromotionRedemption.objects.get()
+    assert redemption.promotion == promotion
+    assert redemption.customer_key == f"email:{cart.email}"
+    assert sum(promotion.redemption_shards.values_list("used", flat=True)) == 1
+
+    second_cart = Cart.objects.create(email=cart.email)
+    upsert_cart_item(second_cart, product.id, 1)
+    again = client.post(
+        f"/api/checkout/carts/{second_cart.id}/promotion-code/",
+        {"code": "CAMPAIGN20"},
+        format="json",
+    )
+    assert again.status_code == 400
+
+
+def test_redemption_caps_require_a_code(product):
+    payload = {
+        "name": "Automatic",
+        "code": "AUTO",
+        "promotion_type": "fixed",
+        "value": "1.00",
+        "max_redemptions": 10,
+        "start_at": timezone.now().isoformat(),
+        "end_at": (timezone.now() + timedelta(days=1)).isoformat(),
+    }
+    client = APIClient()
+
+    response = client.post("/api/promotions/promotions/", payload, format="json")
+    assert response.status_code == 400
+    assert "requires_code" in response.data
+
+    promotion = _code_promotion(product, max_redemptions=10)
+    response = client.patch(
+        f"/api/promotions/promotions/{promotion.id}/", {"requires_code": False}, format="json"
+    )
+    assert response.status_code == 400
+    # Writes that skip the serializer hit the database constraint.
+    with pytest.raises(IntegrityError), transaction.atomic():
+        Promotion.objects.filter(pk=promotion.pk).update(requires_code=False)
+
+
+def test_checkout_drops_a_code_whose_global_cap_was_used_after_it_was_applied(product):
+    promotion = _code_promotion(product, max_redemptions=1)
+    client = APIClient()
+    carts = []
+    for index in range(2):
+        cart = Cart.objects.create(email=f"buyer{index}@example.com")
+        upsert_cart_item(cart, product.id, 1)
+        response = client.post(
+            f"/api/checkout/carts/{cart.id}/promotion-code/",
+            {"code": promotion.code},
+            format="json",
+        )
+        assert response.status_code == 200
+        cart.refresh_from_db()
+        carts.append(cart)
+
+    create_order_from_cart(carts[0])
+    response = client.post("/api/checkout/checkout/", {"cart_id": carts[1].id}, format="json")
+    assert response.status_code == 400
+    assert "removed from the cart" in response.data["detail"]
+
+    carts[1].refresh_from_db()
+    assert carts[1].status == "open"
+    assert carts[1].promotion_code == ""
+    assert carts[1].discount_amount == Decimal("0.00")
+    assert PromotionRedemption.objects.count() == 1
+
+    retry = client.post("/api/checkout/checkout/", {"cart_id": carts[1].id}, format="json")
+    assert retry.status_code == 201
+    assert Decimal(retry.data["discount_amount"]) == Decimal("0.00")
+
+
+def test_redemption_follows_the_stored_cart_pricing(cart, product):
+    promotion = _code_promotion(product, max_redemptions=5)
+    upsert_cart_item(cart, product.id, 1)
+    cart.promotion_code = promotion.code
+    cart.save(update_fields=["promotion_code", "updated_at"])
+
+    order = create_order_from_cart(cart)
+    assert (order.applied_rule_type, order.applied_rule_id) == ("promotion", promotion.id)
+    assert PromotionRedemption.objects.get().order == order
+
+
+def test_cap_lowering_never_reopens_used_slots(product, settings):
+    settings.PRODUCTORY = {**settings.PRODUCTORY, "PROMOTION_REDEMPTION_SHARDS": 4}
+    promotion = _code_promotion(product, max_redemptions=8)
+    for _ in range(5):
+        claim_redemption(promotion)
+
+    promotion.max_redemptions = 6
+    promotion.save()
+
+    shards = PromotionRedemptionShard.objects.filter(promotion=promotion)
+    assert sum(shard.capacity for shard in shards) == 6
+    assert sum(shard.used for shard in shards) == 5
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_redemptions_respect_global_and_customer_caps(product, settings):
+    settings.PRODUCTORY = {**settings.PRODUCTORY, "PROMOTION_REDEMPTION_SHARDS": 4}
+    promotion = _code_promotion(product, max_redemptions=12, max_redemptions_per_customer=2)
+    customers = [f"email:buyer{index}@example.com" for index in range(10)]
+    attempts = [customer for customer in customers for _ in range(3)]
+    outcomes: list[str] = []
+    lock = threading.Lock()
+
+    def redeem(customer: str) -> None:
+        try:
+            while True:
+                try:
+                    claim_redemption(promotion, customer=customer)
+                    outcome = "redeemed"
+                except PromotionCodeError:
+                    outcome = "rejected"
+                except OperationalError:
+                    # SQLite reports lock contention instead of blocking; retry the attempt.
+                    time.sleep(0.001)
+                    continue
+                with lock:
+                    outcomes.append(outcome)
+                return
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=redeem, args=(customer,)) for customer in attempts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(outcomes) == len(attempts)
+    assert outcomes.count("redeemed") == 12
+    shards = PromotionRedemptionShard.objects.filter(promotion=promotion)
+    assert sum(shard.used for shard in shards) == 12
+    assert all(shard.used <= shard.capacity for shard in shards)
+    usage = PromotionCustomerUsage.objects.filter(promotion=promotion)
+    assert sum(row.used for row in usage) == 12
+    assert all(row.used <= 2 for row in usage)
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import json
+from decimal import Decimal
+from io import StringIO
+
+import django
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from productory_checkout.models import Order
+from productory_checkout.services import create_order_from_cart, upsert_cart_item
+from productory_promotions.models import Bundle, BundleItem, Promotion
+from productory_promotions.simulation import proposed_rule_set, simulate_promotions
+from tests.factories import CartFactory, ProductFactory
+
+
+def _order(*lines):
+    cart = CartFactory()
+    for product, quantity in lines:
+        upsert_cart_item(cart, product.id, quantity)
+    return create_order_from_cart(cart)
+
+
+def test_simulation_replays_orders_in_chunks_without_writing(product):
+    other = ProductFactory(price_amount="8.00")
+    for _ in range(3):
+        _order((product, 2))
+    _order((other, 1))
+    bundle = Bundle.objects.create(
+        name="Draft pair", slug="draft-pair", bundle_price_amount=Decimal("20.00"), is_active=False
+    )
+    BundleItem.objects.create(bundle=bundle, product=product, quantity=2)
+    rules = proposed_rule_set(
+        bundle_ids=[bundle.id],
+        promotions=[
+            {"code": "OTHER10", "promotion_type": "fixed", "value": "1.00", "products": [other.id]}
+        ],
+    )
+
+    report = simulate_promotions(rules, chunk_size=2)
+
+    assert report.orders_scanned == 4
+    assert report.orders_affected == 4
+    assert report.discount_total == Decimal("16.00")
+    assert report.actual_discount_total == Decimal("0.00")
+    assert report.rule_hits == {"bundle:draft-pair": 3, "promotion:OTHER10": 1}
+    assert not Promotion.objects.exists()
+    assert not Order.objects.exclude(discount_amount=0).exists()
+
+
+def test_simulation_api_is_staff_only_and_validates_definitions(product):
+    _order((product, 1))
+    client = APIClient()
+    payload = {
+        "promotions": [
+            {
+                "promotion_type": "percentage",
+                "value": "10.00",
+                "categories": [product.category_id],
+            }
+        ]
+    }
+    assert client.post("/api/promotions/simulations/", payload, format="json").status_code == 403
+
+    staff = get_user_model().objects.create_user(username="planner", is_staff=True)
+    client.force_authenticate(user=staff)
+    response = client.post("/api/promotions/simulations/", payload, format="json")
+    assert response.status_code == 200
+    assert response.data["discount_total"] == "1.25"
+    assert response.data["rule_hits"] == {"promotion:SIMULATED-1": 1}
+
+    empty = client.post("/api/promotions/simulations/", {}, format="json")
+    assert empty.status_code == 400
+
+
+def test_simulate_promotions_command_reads_rules_file(product, tmp_path):
+    _order((product, 2))
+    rules = tmp_path / "rules.json"
+    rules.write_text(
+        json.dumps(
+            {
+                "bundles": [
+                    {
+                        "slug": "category-pair",
+                        "bundle_price_amount": "22.00",
+                        "items": [{"category": product.category_id, "quantity": 2}],
+                    }
+                ]
+            }
+        )
+    )
+    stdout = StringIO()
+
+    call_command("productory_simulate_promotions", "--rules", str(rules), "--json", stdout=stdout)
+
+    report = json.loads(stdout.getvalue())
+    assert report["orders_affected"] == 1
+    assert report["discount_total"] == "3.00"
+
+
+@pytest.mark.skipif(django.VERSION < (5, 1), reason="Concurrent SQLite writers need Django 5.1+.")
+@pytest.mark.django_db(transaction=True)
+def test_simulate_promotions_command_with_worker_processes(tmp_path):
+    # Committed data in the file-backed test database is visible to the forked workers.
+    product = ProductFactory()
+    for _ in range(4):
+        _order((product, 2))
+    rules = tmp_path / "rules.json"
+    rules.write_text(
+        json.dumps(
+            {"promotions": [{"promotion_type": "fixed", "value": "1.00", "products": [product.id]}]}
+        )
+    )
+    stdout = StringIO()
+
+    call_command(
+        "productory_simulate_promotions",
+        "--rules",
+        str(rules),
+        "--chunk-size",
+        "1",
+        "--workers",
+        "2",
+        "--json",
+        stdout=stdout,
+    )
+
+    report = json.loads(stdout.getvalue())
+    assert (report["orders_scanned"], report["orders_affected"]) == (4, 4)
+    assert report["discount_total"] == "4.00"
@@ -1,10 +1,29 @@
+from dataclasses import replace
 from datetime import timedelta
 from decimal import Decimal
 
+import pytest
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 
-from productory_checkout.services import recompute_cart_totals, upsert_cart_item
+from productory_catalog.models import Category, Collection
+from productory_checkout.models import AppliedRuleType, OrderRuleComponent
+from productory_checkout.services import (
+    create_order_from_cart,
+    recompute_cart_totals,
+    upsert_cart_item,
+)
+from productory_promotions import rules
+from productory_promotions.allocation import AllocationBudget, allocate
 from productory_promotions.models import Bundle, BundleItem, Promotion, PromotionType
+from productory_promotions.rules import BundleRule, PromotionRule, build_rule_set, get_rule_set
+from productory_promotions.services import (
+    CartLine,
+    resolve_line_pricing,
+    resolve_many,
+    rule_product_ids,
+)
+from tests.factories import ProductFactory
 
 
 def test_percentage_promotion_applies_best_discount(cart, product):
@@ -43,6 +62,32 @@ def test_bundle_discount_is_applied(cart, product):
     assert cart.subtotal_amount == Decimal("25.00")
     assert cart.discount_amount == Decimal("5.00")
     assert cart.total_amount == Decimal("20.00")
+    assert cart.applied_rule_type == AppliedRuleType.BUNDLE
+    assert cart.applied_rule_id == bundle.id
+
+    order = create_order_from_cart(cart)
+    assert (order.applied_rule_type, order.applied_rule_id) == (AppliedRuleType.BUNDLE, bundle.id)
+
+
+def test_checkout_records_combined_allocation_components(cart, settings):
+    settings.PRODUCTORY = {**settings.PRODUCTORY, "PRICING_STRATEGY": "allocate"}
+    bundles = []
+    for name in ("mugs", "cups"):
+        item = ProductFactory(price_amount="10.00")
+        bundle = Bundle.objects.create(
+            name=name, slug=name, bundle_price_amount=Decimal("15.00"), is_active=True
+        )
+        BundleItem.objects.create(bundle=bundle, product=item, quantity=2)
+        upsert_cart_item(cart, item.id, 2)
+        bundles.append(bundle)
+    cart.refresh_from_db()
+    assert cart.applied_rule_type == AppliedRuleType.COMBINED
+
+    order = create_order_from_cart(cart)
+    assert set(order.rule_components.values_list("rule_type", "rule_id")) == {
+        (AppliedRuleType.BUNDLE, bundle.id) for bundle in bundles
+    }
+    assert OrderRuleComponent.objects.count() == 2
 
 
 def test_applies_to_all_products_promotion_uses_cart_subtotal(cart, product):
@@ -64,3 +109,259 @@ def test_applies_to_all_products_promotion_uses_cart_subtotal(cart, product):
     assert cart.subtotal_amount == Decimal("25.00")
     assert cart.discount_amount == Decimal("2.50")
     assert cart.total_amount == Decimal("22.50")
+
+
+def test_cart_pricing_uses_compiled_rules_without_promotion_queries(
+    cart, product, django_assert_num_queries
+):
+    Promotion.objects.create(
+        name="Compiled",
+        code="COMPILED10",
+        promotion_type=PromotionType.PERCENTAGE,
+        value=Decimal("10.00"),
+        applies_to_all_products=True,
+        start_at=timezone.now() - timedelta(days=1),
+        end_at=timezone.now() + timedelta(days=1),
+    )
+    lines = [(product.id, 2, Decimal("12.50"))]
+    assert resolve_line_pricing(lines).discount_amount == Decimal("2.50")
+
+    with django_assert_num_queries(0):
+        resolution = resolve_line_pricing(lines)
+
+    assert resolution.rule == "promotion:COMPILED10"
+
+
+def test_compiled_rules_invalidate_on_changes_and_window_boundaries(product, monkeypatch):
+    now = timezone.now()
+    lines = [(product.id, 1, Decimal("12.50"))]
+    promo = Promotion.objects.create(
+        name="Later",
+        code="LATER",
+        promotion_type=PromotionType.FIXED,
+        value=Decimal("2.00"),
+        start_at=now + timedelta(hours=1),
+        end_at=now + timedelta(hours=2),
+    )
+    promo.products.add(product)
+    assert resolve_line_pricing(lines).rule == "none"
+    assert get_rule_set().expires_at == promo.start_at
+
+    monkeypatch.setattr(rules.timezone, "now", lambda: now + timedelta(hours=1))
+    assert resolve_line_pricing(lines).rule == "promotion:LATER"
+
+    promo.products.remove(product)
+    assert resolve_line_pricing(lines).rule == "none"
+
+    promo.products.add(product)
+    monkeypatch.setattr(rules.timezone, "now", lambda: now + timedelta(hours=3))
+    assert resolve_line_pricing(lines).rule == "none"
+
+
+def test_rule_index_only_evaluates_candidate_rules():
+    scoped = PromotionRule(
+        id=1,
+        code="SCOPED",
+        promotion_type=PromotionType.PERCENTAGE,
+        value=Decimal("50.00"),
+        applies_to_all_products=False,
+        product_ids=frozenset({1, 2}),
+    )
+    storewide = PromotionRule(
+        id=2,
+        code="STORE",
+        promotion_type=PromotionType.FIXED,
+        value=Decimal("1.00"),
+        applies_to_all_products=True,
+        product_ids=frozenset(),
+    )
+    pair = BundleRule(id=1, slug="pair", price_amount=Decimal("5.00"), items=((3, 1), (4, 1)))
+    rule_set = build_rule_set([pair], [scoped, storewide])
+
+    assert rule_set.promotions_by_product == {1: (0,), 2: (0,)}
+    assert rule_set.storewide_promotions == (1,)
+    assert rule_set.candidate_bundles([3, 9]) == [0]
+
+    scoped_cart = resolve_line_pricing([(2, 1, Decimal("10.00"))], rules=rule_set)
+    assert scoped_cart.rule == "promotion:SCOPED"
+    assert scoped_cart.discount_amount == Decimal("5.00")
+
+    other_cart = resolve_line_pricing([(9, 1, Decimal("10.00"))], rules=rule_set)
+    assert other_cart.rule == "promotion:STORE"
+
+
+def test_resolve_many_prices_preloaded_lines_without_db_access():
+    pair = BundleRule(id=1, slug="pair", price_amount=Decimal("15.00"), items=((1, 1), (2, 1)))
+    rule_set = build_rule_set([pair], [])
+    carts_lines = [
+        [CartLine(1, 1, Decimal("10.00")), CartLine(2, 1, Decimal("10.00"))],
+        [CartLine(1, 3, Decimal("10.00"))],
+    ]
+
+    # No ``db`` fixture: any query here would fail the test.
+    bundled, plain = resolve_many(carts_lines, rules=rule_set)
+
+    assert bundled.rule == "bundle:pair"
+    assert bundled.final_total == Decimal("15.00")
+    assert plain.rule == "none"
+    assert plain.final_total == Decimal("30.00")
+
+
+def test_allocate_strategy_combines_bundles_and_promotion_on_remaining_units(settings):
+    pair = BundleRule(id=1, slug="pair", price_amount=Decimal("15.00"), items=((1, 1), (2, 1)))
+    trio = BundleRule(id=2, slug="trio", price_amount=Decimal("20.00"), items=((3, 3),))
+    promo = PromotionRule(
+        id=1,
+        code="SOCKS10",
+        promotion_type=PromotionType.PERCENTAGE,
+        value=Decimal("10.00"),
+        applies_to_all_products=False,
+        product_ids=frozenset({4}),
+    )
+    rule_set = build_rule_set([pair, trio], [promo])
+    lines = [
+        CartLine(1, 1, Decimal("10.00")),
+        CartLine(2, 1, Decimal("10.00")),
+        CartLine(3, 3, Decimal("10.00")),
+        CartLine(4, 2, Decimal("10.00")),
+    ]
+
+    single = resolve_line_pricing(lines, rules=rule_set)
+    assert single.discount_amount == Decimal("10.00")
+
+    settings.PRODUCTORY = {**settings.PRODUCTORY, "PRICING_STRATEGY": "allocate"}
+    combined = resolve_line_pricing(lines, rules=rule_set)
+
+    assert combined.discount_amount == Decimal("17.00")
+    assert combined.final_total == Decimal("53.00")
+    assert combined.rule == "bundle:trio+bundle:pair+promotion:SOCKS10"
+    assert combined.components == (("bundle", 2), ("bundle", 1), ("promotion", 1))
+
+
+def test_allocation_search_respects_node_budget():
+    bundles = [
+        BundleRule(id=idx, slug=f"b{idx}", price_amount=Decimal("15.00"), items=((idx, 1), (0, 1)))
+        for idx in range(1, 40)
+    ]
+    rule_set = build_rule_set(bundles, [])
+    cart_lines = {pid: (20, Decimal("10.00")) for pid in range(40)}
+
+    bounded = allocate(cart_lines, rule_set, budget=AllocationBudget(max_nodes=2))
+    complete = allocate(
+        cart_lines, rule_set, budget=AllocationBudget(max_nodes=10**6, max_seconds=5)
+    )
+
+    assert bounded.exhausted is True
+    assert bounded.nodes == 2
+    assert bounded.discount == Decimal("100.00")
+    assert complete.exhausted is False
+    assert complete.discount == Decimal("100.00")
+
+
+def test_category_targeted_promotion_follows_product_moves(product):
+    promotion = Promotion.objects.create(
+        name="Category sale",
+        code="CATEGORY20",
+        promotion_type=PromotionType.PERCENTAGE,
+        value=Decimal("20.00"),
+        start_at=timezone.now() - timedelta(days=1),
+        end_at=timezone.now() + timedelta(days=1),
+    )
+    promotion.categories.add(product.category)
+    outsider = ProductFactory()
+    lines = [(product.id, 2, Decimal("12.50")), (outsider.id, 1, Decimal("12.50"))]
+
+    resolution = resolve_line_pricing(lines)
+    assert resolution.discount_amount == Decimal("5.00")
+    assert (resolution.rule_type, resolution.rule_id) == ("promotion", promotion.id)
+    assert rule_product_ids(promotion_ids=[promotion.id]) == {product.id}
+
+    # Cached memberships are dropped when a product changes category.
+    outsider.category = product.category
+    outsider.save()
+    assert resolve_line_pricing(lines).discount_amount == Decimal("7.50")
+
+
+def test_category_promotion_covers_the_category_subtree(product):
+    promotion = Promotion.objects.create(
+        name="Department sale",
+        code="DEPT10",
+        promotion_type=PromotionType.PERCENTAGE,
+        value=Decimal("10.00"),
+        start_at=timezone.now() - timedelta(days=1),
+        end_at=timezone.now() + timedelta(days=1),
+    )
+    promotion.categories.add(product.category)
+    subcategory = Category.objects.create(name="Espresso", slug="espresso", parent=product.category)
+    nested = ProductFactory(category=subcategory)
+    lines = [(nested.id, 1, Decimal("20.00"))]
+
+    assert resolve_line_pricing(lines).discount_amount == Decimal("2.00")
+    assert rule_product_ids(promotion_ids=[promotion.id]) == {product.id, nested.id}
+
+    # Moving the subcategory out of the tree drops the cached ancestor path.
+    subcategory.parent = None
+    subcategory.save()
+    assert resolve_line_pricing(lines).discount_amount == Decimal("0.00")
+    assert rule_product_ids(promotion_ids=[promotion.id]) == {product.id}
+
+
+def test_collection_bundle_slot_takes_cheapest_member_units(product):
+    collection = Collection.objects.create(name="Mugs", slug="mugs")
+    cheap = ProductFactory(price_amount="4.00")
+    dear = ProductFactory(price_amount="9.00")
+    collection.products.add(cheap, dear)
+    bundle = Bundle.objects.create(
+        name="Coffee and a mug", slug="coffee-mug", bundle_price_amount=Decimal("14.00")
+    )
+    BundleItem.objects.create(bundle=bundle, product=product, quantity=1)
+    BundleItem.objects.create(bundle=bundle, collection=collection, quantity=1)
+
+    lines = [
+        (product.id, 2, Decimal("12.50")),
+        (cheap.id, 1, Decimal("4.00")),
+        (dear.id, 1, Decimal("9.00")),
+    ]
+    resolution = resolve_line_pricing(lines)
+    # Two sets: 12.50 + 4.00 and 12.50 + 9.00 against 2 x 14.00.
+    assert resolution.discount_amount == Decimal("10.00")
+    assert resolution.rule == "bundle:coffee-mug"
+
+    collection.products.remove(dear)
+    assert resolve_line_pricing(lines).discount_amount == Decimal("2.50")
+
+
+def test_bundle_items_need_exactly_one_target_per_slot(product):
+    collection = Collection.objects.create(name="Cups", slug="cups")
+    bundle = Bundle.objects.create(name="Set", slug="set", bundle_price_amount=Decimal("9.00"))
+    BundleItem.objects.create(bundle=bundle, product=product)
+    BundleItem.objects.create(bundle=bundle, category=product.category)
+
+    for targets in [
+        {},
+        {"product": ProductFactory(), "collection": collection},
+        {"product": product},
+        {"category": product.category},
+    ]:
+        with pytest.raises(IntegrityError), transaction.atomic():
+            BundleItem.objects.create(bundle=bundle, **targets)
+    BundleItem.objects.create(bundle=bundle, collection=collection)
+
+
+def test_group_targets_are_indexed_only_when_present():
+    promo = PromotionRule(
+        id=1,
+        code="CAT",
+        promotion_type=PromotionType.FIXED,
+        value=Decimal("1.00"),
+        applies_to_all_products=False,
+        product_ids=frozenset({7}),
+        category_ids=frozenset({3}),
+    )
+    rule_set = build_rule_set([], [promo])
+    assert rule_set.uses_memberships
+    assert rule_set.promotions_by_category == {3: (0,)}
+    assert rule_set.line_promotions(7) == {0}
+
+    plain = build_rule_set([], [replace(promo, category_ids=frozenset())])
+    assert not plain.uses_memberships
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection, transaction
+from rest_framework.test import APIClient
+
+from productory_catalog.autocomplete import AUTOCOMPLETE_GENERATION, autocomplete
+from productory_catalog.search import (
+    SEARCH_TABLE,
+    SqliteFtsSearchBackend,
+    _IndexedSearchBackend,
+    get_search_backend,
+    search_product_ids,
+)
+from productory_core.generations import bump_generation
+from tests.factories import CategoryFactory, ProductFactory
+
+
+def _names(response):
+    return [row["name"] for row in response.json()]
+
+
+def test_search_ranks_matches_and_tracks_product_changes(db):
+    assert isinstance(get_search_backend(), SqliteFtsSearchBackend)
+    ProductFactory(name="Coffee grinder", sku="GRIND-1", description="Burrs for coffee beans")
+    mug = ProductFactory(name="Coffee mug", sku="MUG-1")
+    ProductFactory(name="Tea pot", sku="POT-1", description="Pairs with a coffee mug")
+    client = APIClient()
+
+    response = client.get("/api/catalog/products/?search=coffee mug")
+    assert _names(response) == ["Coffee mug", "Tea pot"]
+    assert _names(client.get("/api/catalog/products/?search=gri")) == ["Coffee grinder"]
+    ordered = client.get("/api/catalog/products/?search=coffee&ordering=-name")
+    assert _names(ordered) == ["Tea pot", "Coffee mug", "Coffee grinder"]
+
+    mug.name = "Espresso cup"
+    mug.save()
+    assert _names(client.get("/api/catalog/products/?search=espresso")) == ["Espresso cup"]
+    mug.delete()
+    assert _names(client.get("/api/catalog/products/?search=espresso")) == []
+
+
+def test_search_cap_applies_after_the_list_filters(db, settings):
+    settings.PRODUCTORY = {**settings.PRODUCTORY, "SEARCH_MAX_RESULTS": 3}
+    beans = CategoryFactory(name="Beans")
+    for index in range(5):
+        ProductFactory(name=f"Coffee grinder {index}", sku=f"GRIND-{index}")
+    ProductFactory(
+        name="Whole beans", sku="BEANS-1", category=beans, description="Roasted for coffee"
+    )
+    client = APIClient()
+
+    response = client.get("/api/catalog/products/", {"search": "coffee", "category": beans.id})
+
+    assert _names(response) == ["Whole beans"]
+    assert len(client.get("/api/catalog/products/", {"search": "coffee"}).json()) == 3
+
+
+def test_indexed_backends_must_implement_upsert():
+    class Incomplete(_IndexedSearchBackend):
+        def search_ids(self, query, *, limit, within=None):
+            return []
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_exact_sku_short_circuits_the_text_index(db, django_assert_num_queries):
+    product = ProductFactory(sku="SKU-ABC-1")
+    ProductFactory(name="Sku abc lookalike")
+
+    with django_assert_num_queries(1):
+        assert search_product_ids("sku-abc-1") == [product.id]
+
+
+def test_rebuild_command_reindexes_bulk_writes(db):
+    product = ProductFactory(name="Kettle")
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+    assert search_product_ids("kettle") == []
+
+    stdout = StringIO()
+    call_command("productory_rebuild_search_index", stdout=stdout)
+
+    assert search_product_ids("kettle") == [product.id]
+    assert "Indexed 1 products" in stdout.getvalue()
+
+
+def test_basic_backend_falls_back_to_icontains(db, settings):
+    settings.PRODUCTORY = {**settings.PRODUCTORY, "SEARCH_BACKEND": "basic"}
+    ProductFactory(name="Milk frother")
+
+    response = APIClient().get("/api/catalog/products/?search=rothe")
+
+    assert _names(response) == ["Milk frother"]
+
+
+def test_autocomplete_serves_prefixes_from_memory_and_follows_signals(
+    db, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    grinder = ProductFactory(name="Coffee grinder", sku="GRIND-1")
+    ProductFactory(name="Coffee mug", sku="MUG-1")
+    ProductFactory(name="Hidden", sku="HID-1", is_active=False)
+    client = APIClient()
+    url = "/api/catalog/products/autocomplete/"
+
+    assert [row["name"] for row in client.get(url, {"q": "cof"}).json()] == [
+        "Coffee grinder",
+        "Coffee mug",
+    ]
+    with django_assert_num_queries(0):
+        response = client.get(url, {"q": "grin"})
+    assert response.json() == [{"id": grinder.id, "name": "Coffee grinder", "sku": "GRIND-1"}]
+    assert client.get(url, {"q": "mug-"}).json()[0]["sku"] == "MUG-1"
+    assert client.get(url, {"q": "hid"}).json() == []
+    assert len(client.get(url, {"q": "c", "limit": 1}).json()) == 1
+
+    grinder.name = "Burr mill"
+    with django_capture_on_commit_callbacks(execute=True):
+        grinder.save()
+    with django_assert_num_queries(0):
+        assert [row["name"] for row in client.get(url, {"q": "cof"}).json()] == ["Coffee mug"]
+        assert client.get(url, {"q": "burr"}).json()[0]["id"] == grinder.id
+    assert client.get(url).status_code == 400
+
+
+def test_autocomplete_replays_changes_logged_by_other_processes(db, django_assert_num_queries):
+    grinder = ProductFactory(name="Coffee grinder", sku="GRIND-1")
+    mug = ProductFactory(name="Coffee mug", sku="MUG-1")
+    client = APIClient()
+    url = "/api/catalog/products/autocomplete/"
+    assert len(client.get(url, {"q": "cof"}).json()) == 2
+
+    # What another process logs after committing: its rows are patched in, not reloaded.
+    bump_generation(AUTOCOMPLETE_GENERATION, change=[(grinder.id, "Burr mill", "GRIND-1")])
+    bump_generation(AUTOCOMPLETE_GENERATION, change=[(mug.id, None, None)])
+    with django_assert_num_queries(0):
+        assert client.get(url, {"q": "cof"}).json() == []
+        assert client.get(url, {"q": "burr"}).json()[0]["id"] == grinder.id
+
+    # A bump without a logged change (bulk writes) leaves a gap, so the index is rebuilt.
+    bump_generation(AUTOCOMPLETE_GENERATION)
+    with django_assert_num_queries(1):
+        assert len(client.get(url, {"q": "cof"}).json()) == 2
+
+
+def test_autocomplete_ignores_rolled_back_writes(db, django_capture_on_commit_callbacks):
+    mug = ProductFactory(name="Coffee mug", sku="MUG-1")
+    expected = [(mug.id, "Coffee mug", "MUG-1")]
+    assert autocomplete("cof") == expected
+
+    with django_capture_on_commit_callbacks(execute=True):
+        with pytest.raises(RuntimeError), transaction.atomic():
+            ProductFactory(name="Zebra", sku="Z9")
+            mug.delete()
+            raise RuntimeError
+
+    assert autocomplete("zeb") == []
+    assert autocomplete("cof") == expected
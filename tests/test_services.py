@@ -1,14 +1,19 @@
 from decimal import Decimal
+from io import StringIO
 
+import django
 import pytest
+from django.core.management import call_command
 
 from productory_checkout.models import Cart, CartStatus, OrderStatus
+from productory_checkout.repricing import reprice_open_carts
 from productory_checkout.services import (
     create_order_from_cart,
     transition_order_status,
     upsert_cart_item,
 )
 from productory_core.models import StoreConfig
+from tests.factories import CartFactory, ProductFactory
 
 
 def test_create_order_snapshots_prices(cart, product):
@@ -81,3 +86,100 @@ def test_create_order_supports_exclusive_vat_mode(product):
     assert order.total_excl_vat_amount == Decimal("25.00")
     assert order.total_incl_vat_amount == Decimal("28.75")
     assert order.total_amount == Decimal("28.75")
+
+
+def test_cart_aggregates_are_maintained_by_upsert(cart, product):
+    second_product = ProductFactory()
+    upsert_cart_item(cart, product.id, 2)
+    upsert_cart_item(cart, second_product.id, 3)
+    cart.refresh_from_db()
+    first_fingerprint = cart.pricing_fingerprint
+
+    assert cart.item_count == 5
+    assert cart.line_count == 2
+    assert len(first_fingerprint) == 64
+
+    upsert_cart_item(cart, product.id, 1)
+    cart.refresh_from_db()
+    assert cart.item_count == 4
+    assert cart.pricing_fingerprint != first_fingerprint
+
+
+def test_backfill_cart_aggregates_command(cart, product):
+    upsert_cart_item(cart, product.id, 2)
+    cart.refresh_from_db()
+    expected_fingerprint = cart.pricing_fingerprint
+    Cart.objects.filter(pk=cart.pk).update(item_count=0, line_count=0, pricing_fingerprint="")
+
+    call_command("productory_backfill_cart_aggregates", chunk_size=1, stdout=StringIO())
+
+    cart.refresh_from_db()
+    assert cart.item_count == 2
+    assert cart.line_count == 1
+    assert cart.pricing_fingerprint == expected_fingerprint
+
+
+def test_reprice_open_carts_targets_carts_holding_changed_products(cart, product):
+    other_product = ProductFactory()
+    other_cart = CartFactory()
+    closed_cart = CartFactory()
+    upsert_cart_item(cart, product.id, 2)
+    upsert_cart_item(other_cart, other_product.id, 1)
+    upsert_cart_item(closed_cart, product.id, 1)
+    Cart.objects.filter(pk=closed_cart.pk).update(status=CartStatus.CONVERTED)
+    product.price_amount = Decimal("20.00")
+    product.save(update_fields=["price_amount", "updated_at"])
+
+    report = reprice_open_carts(product_ids=[product.id], chunk_size=1)
+
+    assert report.carts_scanned == 1
+    assert report.carts_updated == 1
+    assert report.items_updated == 1
+    cart.refresh_from_db()
+    assert cart.subtotal_amount == Decimal("40.00")
+    assert cart.items.get().unit_price_snapshot == Decimal("20.00")
+    closed_cart.refresh_from_db()
+    assert closed_cart.subtotal_amount == Decimal("12.50")
+
+
+@pytest.mark.skipif(django.VERSION < (5, 1), reason="Concurrent SQLite writers need Django 5.1+.")
+@pytest.mark.django_db(transaction=True)
+def test_reprice_carts_command_with_worker_processes():
+    # Committed data in the file-backed test database is visible to the forked workers.
+    product = ProductFactory()
+    carts = CartFactory.create_batch(3)
+    for cart in carts:
+        upsert_cart_item(cart, product.id, 1)
+    product.price_amount = Decimal("20.00")
+    product.save(update_fields=["price_amount", "updated_at"])
+
+    stdout = StringIO()
+
+    call_command(
+        "productory_reprice_carts",
+        "--product",
+        str(product.id),
+        "--chunk-size",
+        "1",
+        "--workers",
+        "2",
+        stdout=stdout,
+    )
+
+    assert "Repriced 3 carts (3 changed, 3 items)" in stdout.getvalue()
+    assert set(Cart.objects.values_list("subtotal_amount", flat=True)) == {Decimal("20.00")}
+
+
+def test_reprice_carts_command_refreshes_tax_policy(cart, product):
+    upsert_cart_item(cart, product.id, 2)
+    config = StoreConfig.objects.get(slug="default")
+    config.price_includes_vat = False
+    config.save(update_fields=["price_includes_vat", "updated_at"])
+    stdout = StringIO()
+
+    call_command("productory_reprice_carts", "--all", "--refresh-tax-policy", stdout=stdout)
+
+    cart.refresh_from_db()
+    assert cart.price_includes_vat is False
+    assert cart.total_excl_vat_amount == Decimal("25.00")
+    assert "carts/s" in stdout.getvalue()
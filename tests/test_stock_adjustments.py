@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from productory_catalog.models import StockRecord
+from productory_catalog.stock import StockAdjustment, coalesce_adjustments
+from productory_core.models import AuditEvent
+from tests.factories import ProductFactory
+
+
+def test_repeated_skus_coalesce_into_one_write():
+    plans = coalesce_adjustments(
+        [
+            StockAdjustment("A", delta=-1),
+            StockAdjustment("A", delta=-2),
+            StockAdjustment("B", delta=4),
+            StockAdjustment("B", quantity=10),
+            StockAdjustment("B", delta=-3, allow_backorder=True),
+        ]
+    )
+    assert plans == {"A": (None, -3, None), "B": (10, -3, True)}
+
+
+def test_stock_adjustment_api_applies_batched_conditional_updates(db):
+    stocked = ProductFactory()
+    StockRecord.objects.create(product=stocked, quantity=5)
+    low = ProductFactory()
+    StockRecord.objects.create(product=low, quantity=1)
+    fresh = ProductFactory()
+    client = APIClient()
+    payload = {
+        "adjustments": [
+            {"sku": stocked.sku, "delta": -2},
+            {"sku": stocked.sku, "delta": -1},
+            {"sku": low.sku, "delta": -2},
+            {"sku": fresh.sku, "quantity": 7, "allow_backorder": True},
+            {"sku": "MISSING", "delta": 1},
+        ]
+    }
+    assert client.post("/api/catalog/stock-adjustments/", payload, format="json").status_code == 403
+
+    client.force_authenticate(get_user_model().objects.create_user(username="ops", is_staff=True))
+    invalid = {"adjustments": [{"sku": stocked.sku, "quantity": 1, "delta": 1}]}
+    assert client.post("/api/catalog/stock-adjustments/", invalid, format="json").status_code == 400
+    response = client.post("/api/catalog/stock-adjustments/", payload, format="json")
+
+    assert response.status_code == 200
+    assert response.json()["results"] == [
+        {"sku": stocked.sku, "status": "ok", "quantity": 2},
+        {"sku": low.sku, "status": "insufficient_stock", "quantity": 1},
+        {"sku": fresh.sku, "status": "ok", "quantity": 7},
+        {"sku": "MISSING", "status": "unknown_sku", "quantity": None},
+    ]
+    assert StockRecord.objects.get(product=fresh).allow_backorder is True
+    event = AuditEvent.objects.get(action="bulk_updated")
+    assert event.changes == {"source": "api", "quantity": {stocked.sku: 2, fresh.sku: 7}}
+
+
+def test_stock_feed_ingester_resumes_from_offset(db, tmp_path):
+    product = ProductFactory()
+    StockRecord.objects.create(product=product, quantity=10)
+    feed = tmp_path / "stock.jsonl"
+    offsets = tmp_path / "stock.offset"
+    feed.write_text(
+        json.dumps({"sku": product.sku, "delta": -1})
+        + "\nnot json\n"
+        + json.dumps({"sku": product.sku, "delta": -1})
+        + "\n"
+    )
+
+    call_command(
+        "productory_ingest_stock_feed",
+        str(feed),
+        "--offset-file",
+        str(offsets),
+        "--batch-size",
+        "1",
+    )
+    assert StockRecord.objects.get(product=product).quantity == 8
+    assert int(offsets.read_text()) == feed.stat().st_size
+
+    with feed.open("a") as handle:
+        handle.write(json.dumps({"sku": product.sku, "quantity": 3}) + "\n")
+    call_command("productory_ingest_stock_feed", str(feed), "--offset-file", str(offsets))
+    assert StockRecord.objects.get(product=product).quantity == 3